@@ -0,0 +1,260 @@
+import os
+import csv
+import sys
+import json
+import time
+import types
+import argparse
+import multiprocessing
+from itertools import islice
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from dotenv import load_dotenv
+
+# Setup Environment
+load_dotenv(os.path.join(os.path.dirname(__file__), '.env'))
+# The CLI embeds its own queries in batches; skip the server's background cache warm-up
+os.environ.setdefault("QUERY_CACHE_WARMUP", "0")
+
+sys.path.append(os.path.dirname(__file__))
+
+from embedding_file import EmbeddingFileError, open_embeddings
+from job_matcher import JobMatcher
+from job_vector_store import DEFAULT_CACHE_PATH
+from occupation_catalog import OccupationCatalog
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), "data", "Occupation Data.txt")
+
+REQUIRED_FIELDS = ("life_goal", "mbti_code", "riasec_code", "education_level")
+COGNITIVE_FIELDS = ("reaction_time", "number_memory", "verbal_memory")
+
+# --- Input ---
+
+def read_records(path: str, fmt: str = None):
+    """
+    Streams profile records from a CSV (header row) or JSONL file ("-" reads stdin).
+    CSV cognitive scores come from reaction_time/number_memory/verbal_memory
+    columns or a JSON `cognitive_scores` column.
+    """
+    fmt = fmt or ("csv" if path.lower().endswith(".csv") else "jsonl")
+    f = sys.stdin if path == "-" else open(path, newline="", encoding="utf-8")
+    try:
+        if fmt == "csv":
+            for row in csv.DictReader(f):
+                yield {k.strip(): (v.strip() if isinstance(v, str) else v) for k, v in row.items() if k}
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+def parse_profile(record: dict):
+    """
+    Validates a record into a profile namespace shaped like main.UserProfile. Raises ValueError.
+    """
+    missing = [field for field in REQUIRED_FIELDS if not record.get(field)]
+    if missing:
+        raise ValueError(f"missing {', '.join(missing)}")
+
+    cognitive = record.get("cognitive_scores")
+    if isinstance(cognitive, str):
+        cognitive = json.loads(cognitive) if cognitive else None
+    if cognitive is None and any(record.get(field) not in (None, "") for field in COGNITIVE_FIELDS):
+        cognitive = {field: float(record[field]) for field in COGNITIVE_FIELDS if record.get(field) not in (None, "")}
+
+    return types.SimpleNamespace(
+        life_goal=str(record["life_goal"]),
+        mbti_code=str(record["mbti_code"]),
+        riasec_code=str(record["riasec_code"]),
+        education_level=str(record["education_level"]),
+        domain_interest=record.get("domain_interest") or None,
+        cognitive_scores=cognitive or None
+    )
+
+def profile_key(profile) -> str:
+    # Identical profiles (same answers) get identical recommendations
+    return json.dumps(vars(profile), sort_keys=True)
+
+# --- Rule scoring (process pool) ---
+
+# The parent's matcher, inherited by forked workers (set before the pool starts)
+_worker_matcher = None
+
+def _rank_task(task):
+    profile, ai_keywords, semantic_results = task
+    return _worker_matcher._rank(profile, ai_keywords, semantic_results)
+
+# --- Pipeline ---
+
+class BatchRecommender:
+    """
+    Chunked offline version of /recommend. Per chunk: deduplicate profiles, embed the
+    unique queries in batches, score them against the job matrix in one matrix
+    multiply, and rank the candidates in a process pool.
+    """
+
+    def __init__(self, catalog, service=None, processes: int = 0, expand_domain: bool = False,
+                 embed_batch_size: int = 100, memo_size: int = 10000):
+        self.catalog = catalog
+        self.service = service
+        self.expand_domain = expand_domain and service is not None
+        self.embed_batch_size = embed_batch_size
+        self.matcher = JobMatcher(catalog, gemini_service=service)
+        self.matcher.vector_store.init_thread.join()
+        self.processes = processes if processes and self._can_fork() else 0
+        self.pool = self._make_pool(self.processes) if self.processes else None
+        self._memo = OrderedDict() # profile key -> recommendations (bounded, spans chunks)
+        self._expansions = {} # domain interest -> AI keywords
+        self.memo_size = memo_size
+        self.stats = {"records": 0, "errors": 0, "unique_profiles": 0, "memo_hits": 0,
+                      "queries_embedded": 0, "semantic": 0, "rule_only": 0}
+
+    @staticmethod
+    def _can_fork() -> bool:
+        if "fork" in multiprocessing.get_all_start_methods():
+            return True
+        print("⚠️  Worker processes need fork(); ranking in-process.", file=sys.stderr)
+        return False
+
+    def _make_pool(self, processes: int):
+        """
+        Workers are forked from this process and inherit its matcher (catalog,
+        keyword index, rule vectors) copy-on-write: none of them reloads the data,
+        starts a vector store or writes a cache file of its own.
+        """
+        global _worker_matcher
+        _worker_matcher = self.matcher
+        return ProcessPoolExecutor(processes, mp_context=multiprocessing.get_context("fork"))
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+
+    def _domain_keywords(self, profile):
+        if not (self.expand_domain and profile.education_level == "Undergrad" and profile.domain_interest):
+            return None
+        key = " ".join(profile.domain_interest.lower().split())
+        if key not in self._expansions:
+            self._expansions[key] = self.service.expand_domain(profile.domain_interest)
+        return self._expansions[key] or None
+
+    def _semantic_results(self, profiles) -> list[list[dict]]:
+        # Without a service the store may still load the cache, but queries cannot be embedded
+        if self.service is None or not self.matcher.vector_store.is_ready:
+            return [[] for _ in profiles]
+        queries = [
+            self.matcher.build_query_text(p.life_goal, p.mbti_code, p.riasec_code, domain_interest=p.domain_interest)
+            for p in profiles
+        ]
+        embeddings = self.service.get_query_embeddings(queries, batch_size=self.embed_batch_size)
+        self.stats["queries_embedded"] += len(queries)
+        return self.matcher.vector_store.search_embeddings(embeddings, top_k=100)
+
+    def _rank(self, tasks) -> list:
+        if self.pool is None:
+            return [self.matcher._rank(*task) for task in tasks]
+        chunksize = max(1, len(tasks) // (4 * self.processes))
+        return list(self.pool.map(_rank_task, tasks, chunksize=chunksize))
+
+    def process_chunk(self, records: list[dict]) -> list[dict]:
+        outputs = [None] * len(records)
+        pending = OrderedDict() # profile key -> (profile, [output positions])
+        for i, record in enumerate(records):
+            record_id = record.get("id", self.stats["records"] + i + 1)
+            try:
+                profile = parse_profile(record)
+            except (ValueError, TypeError) as e:
+                outputs[i] = {"id": record_id, "error": str(e)}
+                self.stats["errors"] += 1
+                continue
+
+            key = profile_key(profile)
+            if key in self._memo:
+                self._memo.move_to_end(key)
+                outputs[i] = {"id": record_id, "recommendations": self._memo[key]}
+                self.stats["memo_hits"] += 1
+            else:
+                pending.setdefault(key, (profile, []))[1].append((i, record_id))
+        self.stats["records"] += len(records)
+
+        if pending:
+            profiles = [profile for profile, _ in pending.values()]
+            semantic = self._semantic_results(profiles)
+            tasks = [(p, self._domain_keywords(p), s) for p, s in zip(profiles, semantic)]
+            ranked = self._rank(tasks)
+
+            self.stats["unique_profiles"] += len(profiles)
+            self.stats["semantic"] += sum(1 for s in semantic if s)
+            self.stats["rule_only"] += sum(1 for s in semantic if not s)
+            for (key, (_, positions)), recommendations in zip(pending.items(), ranked):
+                for i, record_id in positions:
+                    outputs[i] = {"id": record_id, "recommendations": recommendations}
+                self._memo[key] = recommendations
+                if len(self._memo) > self.memo_size:
+                    self._memo.popitem(last=False)
+        return outputs
+
+def run(input_path: str, output_path: str, fmt: str = None, chunk_size: int = 1000, processes: int = 0,
+        expand_domain: bool = False, embed_batch_size: int = 100, use_ai: bool = True):
+    print("--- 📦 Batch Recommendations ---", file=sys.stderr)
+    catalog = OccupationCatalog.from_file(DATA_PATH)
+    print(f"Loaded {len(catalog)} jobs.", file=sys.stderr)
+
+    service = None
+    if use_ai:
+        try:
+            open_embeddings(os.getenv("EMBEDDINGS_CACHE_PATH") or DEFAULT_CACHE_PATH,
+                            data_hash=catalog.content_hash, rows=len(catalog))
+            from gemini_service import GeminiService
+            service = GeminiService()
+            if not service.is_configured:
+                print("⚠️  Gemini Service NOT configured; rule-based recommendations only.", file=sys.stderr)
+                service = None
+        except (OSError, EmbeddingFileError) as e:
+            print(f"⚠️  No usable embedding cache ({e}); run build_embeddings.py first. Rule-based only.",
+                  file=sys.stderr)
+
+    recommender = BatchRecommender(catalog, service=service, processes=processes, expand_domain=expand_domain,
+                                   embed_batch_size=embed_batch_size)
+    start = time.time()
+    out = sys.stdout if output_path == "-" else open(output_path, "w", encoding="utf-8")
+    try:
+        records = read_records(input_path, fmt)
+        while True:
+            chunk = list(islice(records, chunk_size))
+            if not chunk:
+                break
+            for result in recommender.process_chunk(chunk):
+                out.write(json.dumps(result, ensure_ascii=False) + "\n")
+            out.flush()
+            print(f"Processed {recommender.stats['records']} records...", file=sys.stderr)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        recommender.close()
+        if service is not None:
+            service.query_cache.save()
+
+    elapsed = time.time() - start
+    print(f"✅ {recommender.stats} in {elapsed:.1f}s "
+          f"({recommender.stats['records'] / max(elapsed, 1e-9):.0f} records/s)", file=sys.stderr)
+    return recommender.stats
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recommend jobs for a cohort of profiles (CSV or JSONL).")
+    parser.add_argument("input", help="CSV/JSONL of UserProfile records ('-' for stdin).")
+    parser.add_argument("output", help="JSONL output, one line per input record ('-' for stdout).")
+    parser.add_argument("--format", choices=("csv", "jsonl"), help="Input format (default: from the extension).")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Records held in memory at a time.")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1,
+                        help="Rule-scoring worker processes (0 = in-process).")
+    parser.add_argument("--embed-batch-size", type=int, default=100, help="Queries per embedding request.")
+    parser.add_argument("--expand-domain", action="store_true",
+                        help="Use AI domain expansion for Undergrad profiles (one call per distinct domain).")
+    parser.add_argument("--no-ai", action="store_true", help="Rule-based recommendations only.")
+    args = parser.parse_args()
+    run(args.input, args.output, fmt=args.format, chunk_size=args.chunk_size, processes=args.processes,
+        expand_domain=args.expand_domain, embed_batch_size=args.embed_batch_size, use_ai=not args.no_ai)
@@ -0,0 +1,130 @@
+"""
+Result files and baseline comparison shared by micro.py and load_test.py.
+
+A result file is JSON: {"suite", "python", "machine", "results": {name: {metric: value}}}.
+Metrics are compared to the stored baseline by suffix: *_us / *_ms are
+latencies (lower is better), *_per_s / *_rps are throughputs (higher is
+better) and *error_rate is compared in absolute terms. Anything else is
+informational.
+
+Per-call metrics (*_us, *_per_s) of microsecond-scale benchmarks move by more
+than any sensible tolerance on timer and scheduler jitter alone, so a change
+smaller than the benchmark's noise floor (the larger of a fixed minimum and
+the p50 spread across repeats, "p50_range", recorded in either run) is never
+a regression.
+"""
+import os
+import sys
+import json
+import platform
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_DIR = os.path.join(BENCHMARKS_DIR, "baselines")
+
+
+def make_results(suite: str, results: dict, **extra) -> dict:
+    return dict({
+        "suite": suite,
+        "python": sys.version.split()[0],
+        "machine": f"{platform.machine()} x{os.cpu_count()}",
+        "results": results
+    }, **extra)
+
+
+def save(path: str, data: dict):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def load(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def default_path(suite: str) -> str:
+    return os.path.join(BASELINE_DIR, f"{suite}.json")
+
+
+def _direction(metric: str):
+    if metric.endswith("error_rate"):
+        return "error"
+    if metric.endswith(("_us", "_ms")):
+        return "lower"
+    if metric.endswith(("_per_s", "_rps")):
+        return "higher"
+    return None
+
+
+def _per_call_us(metric: str, value: float):
+    if metric.endswith("_us"):
+        return value
+    if metric.endswith("_per_s") and value:
+        return 1e6 / value
+    return None
+
+
+def noise_floor(metrics: dict, base_metrics: dict, min_noise_us: float) -> float:
+    """
+    Per-call change in microseconds below which a benchmark's difference is noise.
+    """
+    return max(min_noise_us, metrics.get("p50_range", 0.0), base_metrics.get("p50_range", 0.0))
+
+
+def compare(current: dict, baseline: dict, tolerance: float = 0.25, error_margin: float = 0.01,
+            min_noise_us: float = 0.0):
+    """
+    Returns (rows, regressions). Each row is (name, metric, baseline, current,
+    relative change); a regression is a latency/throughput worse than the
+    baseline by more than `tolerance` (and, per call, by more than the
+    benchmark's noise floor), or an error rate up by more than `error_margin`.
+    """
+    rows, regressions = [], []
+    for name, base_metrics in sorted(baseline.get("results", {}).items()):
+        metrics = current.get("results", {}).get(name)
+        if metrics is None:
+            regressions.append(f"{name}: missing from the current run")
+            continue
+        floor = noise_floor(metrics, base_metrics, min_noise_us)
+        for metric, base in sorted(base_metrics.items()):
+            direction = _direction(metric)
+            value = metrics.get(metric)
+            if direction is None or not isinstance(value, (int, float)) or not isinstance(base, (int, float)):
+                continue
+            change = (value - base) / base if base else 0.0
+            rows.append((name, metric, base, value, change))
+
+            if direction == "error":
+                worse = value - base > error_margin
+            elif direction == "lower":
+                worse = change > tolerance
+            else:
+                worse = change < -tolerance
+            per_call = (_per_call_us(metric, value), _per_call_us(metric, base))
+            if worse and None not in per_call and abs(per_call[0] - per_call[1]) <= floor:
+                worse = False
+            if worse:
+                regressions.append(f"{name}.{metric}: {value:g} vs baseline {base:g} ({change:+.0%})")
+    return rows, regressions
+
+
+def report(current: dict, baseline_path: str, tolerance: float, min_noise_us: float = 0.0) -> list:
+    """
+    Prints the comparison table against `baseline_path` and returns the regressions.
+    """
+    if not os.path.exists(baseline_path):
+        print(f"No baseline at {baseline_path}; run with --update-baseline to create it.")
+        return []
+    baseline = load(baseline_path)
+    if baseline.get("machine") != current.get("machine"):
+        print(f"Note: baseline recorded on {baseline.get('machine')}, this run on {current.get('machine')}.")
+
+    rows, regressions = compare(current, baseline, tolerance, min_noise_us=min_noise_us)
+    print(f"\n{'benchmark':<28}{'metric':<16}{'baseline':>12}{'current':>12}{'change':>9}")
+    for name, metric, base, value, change in rows:
+        print(f"{name:<28}{metric:<16}{base:>12.4g}{value:>12.4g}{change:>+9.0%}")
+    for regression in regressions:
+        print(f"REGRESSION: {regression}")
+    print("OK" if not regressions else f"{len(regressions)} regression(s) beyond {tolerance:.0%}")
+    return regressions
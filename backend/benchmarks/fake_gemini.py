@@ -0,0 +1,235 @@
+"""
+Local stand-in for the Gemini generate/embed APIs, for load tests without an API key.
+
+FakeGenAI mimics the parts of the google.generativeai module GeminiService uses
+(configure, list_models, GenerativeModel.generate_content[_async] incl.
+streaming, embed_content[_async]). install() swaps it in through
+gemini_service._genai, so everything above the SDK (retries, deadlines, circuit
+breakers, caches, batching) runs as in production. It is an in-process fake
+rather than an HTTP one because the SDK's async client cannot talk REST.
+
+Each call sleeps for a configurable, jittered latency and can fail like the
+real API: ServiceUnavailable at a given error rate, ResourceExhausted (429)
+above a requests-per-second limit, DeadlineExceeded when the latency exceeds
+the request timeout. Embeddings are deterministic per text.
+
+Settings (environment or keyword arguments):
+    FAKE_GEMINI_GENERATE_MS   mean generate latency (default 800)
+    FAKE_GEMINI_EMBED_MS      mean embed latency (default 60)
+    FAKE_GEMINI_JITTER        lognormal sigma of the latency (default 0.3)
+    FAKE_GEMINI_ERROR_RATE    share of calls failing with 503 (default 0)
+    FAKE_GEMINI_RATE_LIMIT    requests/s before 429s, 0 = unlimited (default 0)
+    FAKE_GEMINI_DIM           embedding dimension (default 768)
+
+Usage (from backend/), serves the API on PORT with the fake in place:
+    python benchmarks/fake_gemini.py
+    FAKE_GEMINI_ERROR_RATE=0.2 PORT=8001 python benchmarks/fake_gemini.py
+"""
+import os
+import re
+import sys
+import time
+import random
+import asyncio
+import hashlib
+import threading
+import types
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from embedding_builder import TokenBucket # noqa: E402
+
+MODELS = ["gemini-1.5-flash", "gemini-2.0-flash-lite", "text-embedding-004"]
+
+DOMAIN_TITLES = ["Data Scientist", "Software Developer", "Research Analyst", "Project Manager", "Consultant"]
+
+
+class FakeGenAI:
+    def __init__(self, generate_ms: float = None, embed_ms: float = None, jitter: float = None,
+                 error_rate: float = None, rate_limit: float = None, dim: int = None, seed: int = 0):
+        env = os.environ.get
+        self.generate_ms = generate_ms if generate_ms is not None else float(env("FAKE_GEMINI_GENERATE_MS", 800))
+        self.embed_ms = embed_ms if embed_ms is not None else float(env("FAKE_GEMINI_EMBED_MS", 60))
+        self.jitter = jitter if jitter is not None else float(env("FAKE_GEMINI_JITTER", 0.3))
+        self.error_rate = error_rate if error_rate is not None else float(env("FAKE_GEMINI_ERROR_RATE", 0))
+        rate_limit = rate_limit if rate_limit is not None else float(env("FAKE_GEMINI_RATE_LIMIT", 0))
+        self.dim = dim if dim is not None else int(env("FAKE_GEMINI_DIM", 768))
+
+        self.bucket = TokenBucket(rate_limit) if rate_limit > 0 else None
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "errors": 0, "throttled": 0, "timeouts": 0}
+
+    # --- google.generativeai surface ---
+
+    def configure(self, api_key: str = None, **kwargs):
+        pass
+
+    def list_models(self, request_options: dict = None):
+        self._admit(self.embed_ms, request_options)
+        return iter([types.SimpleNamespace(name=f"models/{name}") for name in MODELS])
+
+    def GenerativeModel(self, model_name: str):
+        return FakeModel(self, model_name)
+
+    def embed_content(self, model: str, content, task_type: str = None, title: str = None,
+                      request_options: dict = None):
+        self._admit(self.embed_ms, request_options)
+        return self._embedding(content)
+
+    async def embed_content_async(self, model: str, content, task_type: str = None, title: str = None,
+                                  request_options: dict = None):
+        await self._admit_async(self.embed_ms, request_options)
+        return self._embedding(content)
+
+    # --- Behaviour ---
+
+    def _latency(self, mean_ms: float) -> float:
+        with self._lock:
+            factor = self._random.lognormvariate(0, self.jitter) if self.jitter > 0 else 1.0
+        return mean_ms * factor / 1000
+
+    def _fault(self, latency: float, request_options: dict):
+        """
+        The exception this call ends with (or None) and how long it takes to get there.
+        """
+        from google.api_core import exceptions
+        with self._lock:
+            self.stats["calls"] += 1
+            failed = self._random.random() < self.error_rate
+        if self.bucket is not None and not self.bucket.try_acquire():
+            with self._lock:
+                self.stats["throttled"] += 1
+            return exceptions.ResourceExhausted("fake: 429 rate limit exceeded"), 0.005
+        timeout = (request_options or {}).get("timeout")
+        if timeout is not None and latency > timeout:
+            with self._lock:
+                self.stats["timeouts"] += 1
+            return exceptions.DeadlineExceeded("fake: deadline exceeded"), timeout
+        if failed:
+            with self._lock:
+                self.stats["errors"] += 1
+            return exceptions.ServiceUnavailable("fake: injected 503"), latency
+        return None, latency
+
+    def _admit(self, mean_ms: float, request_options: dict = None):
+        error, delay = self._fault(self._latency(mean_ms), request_options)
+        time.sleep(delay)
+        if error is not None:
+            raise error
+
+    async def _admit_async(self, mean_ms: float, request_options: dict = None):
+        error, delay = self._fault(self._latency(mean_ms), request_options)
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+
+    def _vector(self, text: str) -> list[float]:
+        seed = int.from_bytes(hashlib.sha256(str(text).encode("utf-8")).digest()[:8], "little")
+        vector = np.random.default_rng(seed).standard_normal(self.dim).astype(np.float32)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def _embedding(self, content) -> dict:
+        if isinstance(content, (list, tuple)):
+            return {"embedding": [self._vector(text) for text in content]}
+        return {"embedding": self._vector(content)}
+
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeStream:
+    """
+    Async iterator over response chunks, spreading the remaining latency across them.
+    """
+
+    def __init__(self, chunks: list[str], delay: float):
+        self.chunks = chunks
+        self.delay = delay
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for chunk in self.chunks:
+            await asyncio.sleep(self.delay)
+            yield FakeResponse(chunk)
+
+
+class FakeModel:
+    def __init__(self, genai: FakeGenAI, model_name: str):
+        self.genai = genai
+        self.model_name = model_name
+
+    @staticmethod
+    def _answer(prompt: str) -> str:
+        if "comma-separated" in prompt:
+            return ", ".join(DOMAIN_TITLES)
+        match = re.search(r"roadmap for '(.+?)' \(Level: (.+?)\)", prompt)
+        role, level = match.groups() if match else ("Professional", "General")
+        phases = "\n".join(
+            f"### Phase {i}: Step {i}\n- **Objective**: Grow as a {role}\n- **Skills**: Skill {i}a, Skill {i}b\n"
+            for i in range(1, 5)
+        )
+        return (f"# Roadmap: {role}\n**Strategic North Star**: Become a leading {role} ({level}).\n\n"
+                f"## 📊 Market Stats\n| Level | Income | Status |\n| :--- | :--- | :--- |\n"
+                f"| **Entry** | $50k | Growing |\n| **Senior** | $120k | High |\n\n## 🗺️ Strategy\n{phases}\n"
+                f"## 🛑 Risks\n- Competition -> Specialise early\n")
+
+    def generate_content(self, prompt, safety_settings=None, request_options: dict = None, stream: bool = False):
+        self.genai._admit(self.genai.generate_ms, request_options)
+        return FakeResponse(self._answer(prompt))
+
+    async def generate_content_async(self, prompt, safety_settings=None, request_options: dict = None,
+                                     stream: bool = False):
+        if not stream:
+            await self.genai._admit_async(self.genai.generate_ms, request_options)
+            return FakeResponse(self._answer(prompt))
+
+        # Time to first chunk is a fifth of the latency; the rest is spread over the chunks
+        latency = self.genai._latency(self.genai.generate_ms)
+        error, delay = self.genai._fault(latency / 5, request_options)
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        chunks = self._answer(prompt).splitlines(keepends=True)
+        return FakeStream(chunks, latency * 0.8 / max(1, len(chunks)))
+
+
+def write_job_embeddings(path: str, catalog, fake: FakeGenAI = None):
+    """
+    Writes the fake job embedding matrix for `catalog` to `path`, so a server or
+    benchmark using the fake starts with a ready vector store instead of building one.
+    """
+    from embedding_file import write_embeddings
+    from gemini_service import EMBEDDING_MODEL
+    fake = fake or FakeGenAI()
+    matrix = np.array([fake._vector(text) for text in catalog.embedding_texts()], dtype=np.float32)
+    write_embeddings(path, matrix, EMBEDDING_MODEL, catalog.content_hash, normalized=True)
+
+
+def install(fake: FakeGenAI = None) -> FakeGenAI:
+    """
+    Routes GeminiService's SDK calls to `fake` (a new FakeGenAI by default).
+    Call before the service is created.
+    """
+    import gemini_service
+    fake = fake or FakeGenAI()
+    gemini_service._genai = lambda: fake
+    if not os.getenv("GEMINI_API_KEY"):
+        os.environ["GEMINI_API_KEY"] = "fake"
+    return fake
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    os.chdir(BACKEND_DIR)
+    install()
+    import main
+    uvicorn.run(main.app, host="0.0.0.0", port=int(os.getenv("PORT", 8000)), log_level="warning")
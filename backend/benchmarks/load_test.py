@@ -0,0 +1,269 @@
+"""
+End-to-end load test for /recommend and /roadmap, compared against a stored baseline.
+
+Starts the API (uvicorn, one worker) with the fake Gemini from
+benchmarks/fake_gemini.py in place, so the AI paths (micro-batched query
+embeddings, domain expansion, roadmap generation, retries and circuit
+breakers) run against a local stand-in with controllable latency and faults.
+Each scenario then runs a closed loop of --concurrency clients for --duration
+seconds and reports throughput and p50/p95/p99 latency. Caches live in a
+temporary directory, so every run starts cold.
+
+Usage (from backend/):
+    python benchmarks/load_test.py                          # compare with baselines/load.json
+    python benchmarks/load_test.py --concurrency 32 --duration 20 --error-rate 0.1
+    python benchmarks/load_test.py --no-ai                  # rule-based server, no fake
+    python benchmarks/load_test.py --url http://127.0.0.1:8000 --output load.json
+    python benchmarks/load_test.py --update-baseline
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+import subprocess
+import http.client
+import urllib.parse
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import baseline # noqa: E402
+from startup import free_port # noqa: E402
+
+DATA_PATH = os.path.join(BACKEND_DIR, "data", "Occupation Data.txt")
+DOMAINS = ["Data Science", "Mechanical Engineering", "Graphic Design", "Finance", "Biology", "Law"]
+
+
+def recommend_payloads(n: int, seed: int = 0) -> list:
+    from job_matcher import JobMatcher
+    mappings = JobMatcher._initialize_mappings()
+    rng = random.Random(seed)
+    payloads = []
+    for _ in range(n):
+        profile = {
+            "life_goal": rng.choice(list(mappings["goals"])),
+            "mbti_code": rng.choice(list(mappings["mbti"])),
+            "riasec_code": rng.choice(list(mappings["riasec"])),
+            "education_level": rng.choice(["10th", "12th", "Undergrad"])
+        }
+        if profile["education_level"] == "Undergrad":
+            profile["domain_interest"] = rng.choice(DOMAINS)
+        if rng.random() < 0.5:
+            profile["cognitive_scores"] = {"reaction_time": rng.randint(150, 400), "number_memory": rng.randint(4, 14),
+                                           "verbal_memory": rng.randint(10, 90)}
+        payloads.append(profile)
+    return payloads
+
+
+def roadmap_payloads(n: int, seed: int = 0) -> list:
+    from occupation_catalog import OccupationCatalog
+    catalog = OccupationCatalog.from_file(DATA_PATH)
+    rng = random.Random(seed)
+    rows = rng.sample(range(len(catalog)), min(n, len(catalog)))
+    return [{"onet_code": catalog.codes[i], "title": catalog.titles[i],
+             "education_level": rng.choice(["10th", "12th", "Undergrad"])} for i in rows]
+
+
+def percentile(sorted_values: list, q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def run_scenario(url: str, path: str, payloads: list, concurrency: int, duration: float, warmup: float) -> dict:
+    """
+    Closed loop: `concurrency` clients, each sending its next request as soon as
+    the previous one completes (keep-alive). Requests completing during the first
+    `warmup` seconds are not counted.
+    """
+    target = urllib.parse.urlsplit(url)
+    start = time.perf_counter()
+    measure_from, stop_at = start + warmup, start + warmup + duration
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+
+    def client(worker: int):
+        rng = random.Random(worker)
+        conn = http.client.HTTPConnection(target.hostname, target.port, timeout=60)
+        local, failed = [], 0
+        while True:
+            sent = time.perf_counter()
+            if sent >= stop_at:
+                break
+            body = json.dumps(rng.choice(payloads))
+            try:
+                conn.request("POST", path, body=body, headers={"Content-Type": "application/json"})
+                response = conn.getresponse()
+                response.read()
+                ok = response.status == 200
+            except (OSError, http.client.HTTPException):
+                ok = False
+                conn.close()
+                conn = http.client.HTTPConnection(target.hostname, target.port, timeout=60)
+            done = time.perf_counter()
+            if sent >= measure_from:
+                local.append((done - sent) * 1000)
+                failed += not ok
+        conn.close()
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = max(1e-9, time.perf_counter() - measure_from)
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "error_rate": round(errors[0] / max(1, len(latencies)), 4),
+        "mean_ms": round(sum(latencies) / max(1, len(latencies)), 2),
+        "p50_ms": round(percentile(latencies, 0.50), 2),
+        "p95_ms": round(percentile(latencies, 0.95), 2),
+        "p99_ms": round(percentile(latencies, 0.99), 2)
+    }
+
+
+def get_json(url: str, path: str):
+    target = urllib.parse.urlsplit(url)
+    conn = http.client.HTTPConnection(target.hostname, target.port, timeout=5)
+    try:
+        conn.request("GET", path)
+        response = conn.getresponse()
+        return response.status, json.loads(response.read() or b"null")
+    finally:
+        conn.close()
+
+
+def start_server(tmp_dir: str, args) -> tuple:
+    port = free_port()
+    env = dict(os.environ)
+    env.update({
+        "PORT": str(port),
+        "WORKERS": "1",
+        "QUERY_CACHE_PATH": "",
+        "QUERY_CACHE_WARMUP": "0",
+        "RULE_VECTOR_CACHE_PATH": "",
+        "ROADMAP_CACHE_PATH": os.path.join(tmp_dir, "roadmap_cache.sqlite3"),
+        "ROADMAP_STORE_PATH": "",
+        "RECOMMENDATION_TABLE_PATH": "",
+        "EMBEDDINGS_CACHE_PATH": os.path.join(tmp_dir, "job_embeddings.bin"),
+        "PYTHONUNBUFFERED": "1"
+    })
+    if args.no_ai:
+        env["GEMINI_API_KEY"] = ""
+        command = [sys.executable, "main.py"]
+    else:
+        env.update({
+            "GEMINI_API_KEY": "fake",
+            "WARMUP_REQUIRE_EMBEDDINGS": "1",
+            "FAKE_GEMINI_GENERATE_MS": str(args.generate_ms),
+            "FAKE_GEMINI_EMBED_MS": str(args.embed_ms),
+            "FAKE_GEMINI_ERROR_RATE": str(args.error_rate),
+            "FAKE_GEMINI_RATE_LIMIT": str(args.rate_limit)
+        })
+        # Pre-built job embeddings, so the server does not build them at the background rate limit
+        import fake_gemini
+        from occupation_catalog import OccupationCatalog
+        fake_gemini.write_job_embeddings(env["EMBEDDINGS_CACHE_PATH"], OccupationCatalog.from_file(DATA_PATH))
+        command = [sys.executable, os.path.join("benchmarks", "fake_gemini.py")]
+
+    log = open(os.path.join(tmp_dir, "server.log"), "w")
+    proc = subprocess.Popen(command, cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"server exited with code {proc.returncode}; see {log.name}")
+        try:
+            if get_json(url, "/ready")[0] == 200:
+                return proc, url
+        except (OSError, http.client.HTTPException, ValueError):
+            pass
+        time.sleep(0.1)
+    proc.terminate()
+    raise RuntimeError("server not ready within 120s")
+
+
+def stop_server(proc):
+    proc.terminate()
+    try:
+        proc.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+
+def run(args) -> dict:
+    scenarios = {
+        "recommend": ("/recommend", recommend_payloads(args.profiles)),
+        "roadmap": ("/roadmap", roadmap_payloads(args.roadmaps))
+    }
+    config = {"concurrency": args.concurrency, "duration_s": args.duration, "ai": "off" if args.no_ai else "fake"}
+    if not args.no_ai and not args.url:
+        config.update(generate_ms=args.generate_ms, embed_ms=args.embed_ms, error_rate=args.error_rate,
+                      rate_limit=args.rate_limit)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        proc, url = (None, args.url) if args.url else start_server(tmp_dir, args)
+        try:
+            results = {}
+            for name in args.scenarios:
+                path, payloads = scenarios[name]
+                results[name] = run_scenario(url, path, payloads, args.concurrency, args.duration, args.warmup)
+            _, health = get_json(url, "/health")
+        finally:
+            if proc is not None:
+                stop_server(proc)
+
+    server = {key: health.get(key) for key in ("caches", "circuits", "query_batching", "worker") if key in health}
+    return baseline.make_results("load", results, config=config, server=server)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test /recommend and /roadmap (fake Gemini by default).")
+    parser.add_argument("--url", help="test an already running server instead of starting one")
+    parser.add_argument("--scenarios", nargs="+", choices=("recommend", "roadmap"), default=["recommend", "roadmap"])
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent clients")
+    parser.add_argument("--duration", type=float, default=10.0, help="measured seconds per scenario")
+    parser.add_argument("--warmup", type=float, default=2.0, help="unmeasured seconds before each scenario")
+    parser.add_argument("--profiles", type=int, default=500, help="distinct /recommend payloads")
+    parser.add_argument("--roadmaps", type=int, default=300, help="distinct /roadmap payloads")
+    parser.add_argument("--no-ai", action="store_true", help="start the server without AI (rule-based only)")
+    parser.add_argument("--generate-ms", type=float, default=800, help="fake generate latency")
+    parser.add_argument("--embed-ms", type=float, default=60, help="fake embed latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fake 503 rate")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="fake requests/s before 429s (0: none)")
+    parser.add_argument("--output", help="write the results JSON here")
+    parser.add_argument("--baseline", default=baseline.default_path("load"))
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative regression")
+    parser.add_argument("--update-baseline", action="store_true", help="store this run as the baseline")
+    args = parser.parse_args()
+
+    results = run(args)
+    print(f"{'scenario':<12}{'requests':>10}{'rps':>10}{'errors':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, r in results["results"].items():
+        print(f"{name:<12}{r['requests']:>10}{r['throughput_rps']:>10.1f}{r['error_rate']:>9.2%}"
+              f"{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}{r['p99_ms']:>10.1f}")
+
+    if args.output:
+        baseline.save(args.output, results)
+    if args.update_baseline:
+        baseline.save(args.baseline, results)
+        print(f"Baseline written to {args.baseline}")
+        return
+    if os.path.exists(args.baseline) and baseline.load(args.baseline).get("config") != results["config"]:
+        print("Note: baseline was recorded with different settings; comparison is indicative only.")
+    sys.exit(1 if baseline.report(results, args.baseline, args.tolerance) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""
+Micro-benchmarks for the request hot paths, compared against a stored baseline.
+
+  * recommend_rules      - JobMatcher.recommend without AI (rule scoring only)
+  * rank_hybrid          - JobMatcher._rank with 100 semantic candidates
+  * vector_search        - JobVectorStore.search, query embedding served from the cache
+  * vector_search_batch  - JobVectorStore.search_by_vectors, 32 queries per call (per-query time)
+  * roadmap_static       - RoadmapGenerator.generate
+
+Job and query embeddings come from the fake Gemini (benchmarks/fake_gemini.py,
+zero latency) and every cache lives in a temporary directory, so no API key or
+network is needed and nothing is read from or written to backend/.
+
+Each benchmark runs --repeats times, interleaved with the others so a burst of
+machine noise does not hit all repeats of one benchmark; the median of each
+metric is reported, and the p50 spread across repeats ("p50_range") widens the
+benchmark's noise floor in the baseline comparison (see baseline.py).
+
+Usage (from backend/):
+    python benchmarks/micro.py                      # compare with baselines/micro.json
+    python benchmarks/micro.py --output micro.json  # also write the results
+    python benchmarks/micro.py --update-baseline
+"""
+import os
+import sys
+import time
+import types
+import logging
+import argparse
+import tempfile
+import statistics
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import baseline # noqa: E402
+
+DATA_PATH = os.path.join(BACKEND_DIR, "data", "Occupation Data.txt")
+
+# Smallest per-call change (us) that counts as a regression, however large relative
+# to a microsecond-scale benchmark
+MIN_NOISE_US = 1.0
+
+
+def timed(fn, args_list: list, min_time: float, warmup: int = 20) -> dict:
+    """
+    Calls fn(*args) round-robin over args_list for at least `min_time` seconds,
+    timing each call. Returns latency percentiles in microseconds.
+    """
+    for i in range(warmup):
+        fn(*args_list[i % len(args_list)])
+
+    samples = []
+    start = time.perf_counter()
+    i = 0
+    while time.perf_counter() - start < min_time or len(samples) < 50:
+        args = args_list[i % len(args_list)]
+        t0 = time.perf_counter_ns()
+        fn(*args)
+        samples.append((time.perf_counter_ns() - t0) / 1000)
+        i += 1
+
+    samples.sort()
+    mean = statistics.fmean(samples)
+    return {
+        "p50_us": round(samples[len(samples) // 2], 2),
+        "p95_us": round(samples[int(len(samples) * 0.95)], 2),
+        "ops_per_s": round(1e6 / mean, 1),
+        "calls": len(samples)
+    }
+
+
+def per_query(result: dict, batch_size: int) -> dict:
+    return dict(result, p50_us=result["p50_us"] / batch_size, p95_us=result["p95_us"] / batch_size,
+                ops_per_s=result["ops_per_s"] * batch_size)
+
+
+def combine(repeats: list) -> dict:
+    """
+    Median of each metric over the repeats, plus the spread of their p50s.
+    """
+    p50s = [r["p50_us"] for r in repeats]
+    return {
+        "p50_us": round(statistics.median(p50s), 2),
+        "p95_us": round(statistics.median(r["p95_us"] for r in repeats), 2),
+        "ops_per_s": round(statistics.median(r["ops_per_s"] for r in repeats), 1),
+        "calls": sum(r["calls"] for r in repeats),
+        "p50_range": round(max(p50s) - min(p50s), 2)
+    }
+
+
+def sample_profiles(matcher, n: int = 200, seed: int = 0) -> list:
+    rng = np.random.default_rng(seed)
+    goals, mbti, riasec = (list(matcher.mappings[k]) for k in ("goals", "mbti", "riasec"))
+    profiles = []
+    for _ in range(n):
+        education = str(rng.choice(["10th", "12th", "Undergrad"]))
+        profiles.append(types.SimpleNamespace(
+            life_goal=str(rng.choice(goals)), mbti_code=str(rng.choice(mbti)), riasec_code=str(rng.choice(riasec)),
+            education_level=education,
+            domain_interest=str(rng.choice(["Data Science", "Design", "Finance"])) if education == "Undergrad" else None,
+            cognitive_scores={"reaction_time": int(rng.integers(150, 400)), "number_memory": int(rng.integers(4, 14)),
+                              "verbal_memory": int(rng.integers(10, 90))} if rng.random() < 0.5 else None
+        ))
+    return profiles
+
+
+def run(min_time: float, repeats: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.environ.update({
+            "EMBEDDINGS_CACHE_PATH": os.path.join(tmp_dir, "job_embeddings.bin"),
+            "QUERY_CACHE_PATH": "",
+            "QUERY_CACHE_WARMUP": "0",
+            "RULE_VECTOR_CACHE_PATH": os.path.join(tmp_dir, "rule_vectors.npz"),
+            "RECOMMENDATION_TABLE_PATH": os.path.join(tmp_dir, "recommendation_table.npz"),
+            "ROADMAP_CACHE_PATH": os.path.join(tmp_dir, "roadmap_cache.sqlite3"),
+            "ROADMAP_STORE_PATH": os.path.join(tmp_dir, "roadmap_store.sqlite3"),
+            "GEMINI_API_KEY": "fake"
+        })
+        import fake_gemini
+        fake = fake_gemini.install(fake_gemini.FakeGenAI(generate_ms=0, embed_ms=0, jitter=0))
+
+        from gemini_service import GeminiService
+        from job_matcher import JobMatcher
+        from occupation_catalog import OccupationCatalog
+        from roadmap_generator import RoadmapGenerator
+        logging.getLogger("job_vector_store").setLevel(logging.ERROR)
+
+        catalog = OccupationCatalog.from_file(DATA_PATH)
+        fake_gemini.write_job_embeddings(os.environ["EMBEDDINGS_CACHE_PATH"], catalog, fake)
+        rule_matcher = JobMatcher(catalog)
+        ai_matcher = JobMatcher(catalog, gemini_service=GeminiService())
+        store = ai_matcher.vector_store
+        store.init_thread.join()
+        if not store.is_ready:
+            raise RuntimeError(f"vector store not ready: {store.status}")
+
+        profiles = sample_profiles(rule_matcher)
+        queries = [
+            ai_matcher.build_query_text(p.life_goal, p.mbti_code, p.riasec_code, domain_interest=p.domain_interest)
+            for p in profiles
+        ]
+        semantic = store.search_many(queries, top_k=100)
+        vectors = np.asarray(store.gemini_service.get_query_embeddings(queries), dtype=np.float32)
+        batches = [(vectors[i:i + 32],) for i in range(0, len(vectors) - 31, 32)]
+        jobs = [(str(catalog.codes[i]), str(catalog.titles[i]), level)
+                for i, level in zip(range(0, len(catalog), 7), ["10th", "12th", "Undergrad"] * len(catalog))]
+
+        benchmarks = {
+            "recommend_rules": lambda: timed(rule_matcher.recommend, [(p,) for p in profiles], min_time),
+            "rank_hybrid": lambda: timed(ai_matcher._rank, [(p, None, s) for p, s in zip(profiles, semantic)],
+                                         min_time),
+            "vector_search": lambda: timed(lambda q: store.search(q, top_k=100), [(q,) for q in queries], min_time),
+            # Per query, so it compares directly with vector_search
+            "vector_search_batch": lambda: per_query(
+                timed(lambda v: store.search_by_vectors(v, top_k=100), batches, min_time), 32),
+            "roadmap_static": lambda: timed(RoadmapGenerator.generate, jobs, min_time)
+        }
+        runs = {name: [] for name in benchmarks}
+        for _ in range(repeats):
+            for name, bench in benchmarks.items():
+                runs[name].append(bench())
+        results = {name: combine(repeat_results) for name, repeat_results in runs.items()}
+        return baseline.make_results("micro", results, jobs=len(catalog), dim=int(vectors.shape[1]),
+                                     repeats=repeats)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for rule scoring, vector search and roadmaps.")
+    parser.add_argument("--min-time", type=float, default=0.3, help="seconds per benchmark and repeat")
+    parser.add_argument("--repeats", type=int, default=5, help="runs per benchmark (the median is reported)")
+    parser.add_argument("--output", help="write the results JSON here")
+    parser.add_argument("--baseline", default=baseline.default_path("micro"))
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown")
+    parser.add_argument("--update-baseline", action="store_true", help="store this run as the baseline")
+    args = parser.parse_args()
+
+    results = run(args.min_time, args.repeats)
+    print(f"{'benchmark':<22}{'p50 us':>10}{'p95 us':>10}{'ops/s':>12}{'p50 range':>11}")
+    for name, r in results["results"].items():
+        print(f"{name:<22}{r['p50_us']:>10.1f}{r['p95_us']:>10.1f}{r['ops_per_s']:>12.0f}{r['p50_range']:>11.2f}")
+
+    if args.output:
+        baseline.save(args.output, results)
+    if args.update_baseline:
+        baseline.save(args.baseline, results)
+        print(f"Baseline written to {args.baseline}")
+        return
+    sys.exit(1 if baseline.report(results, args.baseline, args.tolerance, min_noise_us=MIN_NOISE_US) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""
+Impact of int8 storage (VECTOR_STORAGE=int8) on search, on the final ranking
+JobMatcher returns, and on per-process memory and latency.
+
+Ranking: for every domain-free profile (life goal x MBTI x RIASEC) the semantic
+candidates are retrieved with the exact float32 index and with the quantized
+index, then ranked by JobMatcher._rank. Reports recall@100 of the candidates,
+overlap of the final top 20 and the largest score change. Uses the real
+embedding and query caches when present, else synthetic vectors over the real
+catalog.
+
+Memory/latency: for each matrix size (--sizes) a normalized float32 embedding
+file is written to a temporary directory, and each index is measured in a fresh
+process that memory-maps it, as a worker does. "private" is the anonymous
+memory the worker alone holds (int8 codes, buffers); "file" is RSS growth from
+mapped embedding pages, which are clean, shared by all workers and reclaimable
+(the kernel maps whole page-cache folios, so a few hundred scattered re-rank
+rows can fault in most of a small file).
+
+Usage (from backend/):
+    python benchmarks/quantization.py
+    python benchmarks/quantization.py --rerank 2 4 8 --min-overlap 0.99
+    python benchmarks/quantization.py --sizes 1000 50000 --output benchmarks/baselines/quantization.json
+"""
+import os
+import sys
+import json
+import time
+import types
+import argparse
+import tempfile
+import subprocess
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault("QUERY_CACHE_WARMUP", "0")
+
+from embedding_file import EmbeddingFileError, open_embeddings # noqa: E402
+from job_matcher import JobMatcher # noqa: E402
+from job_vector_store import DEFAULT_CACHE_PATH # noqa: E402
+from occupation_catalog import OccupationCatalog # noqa: E402
+from query_cache import DEFAULT_CACHE_PATH as QUERY_CACHE_PATH, QueryEmbeddingCache # noqa: E402
+from vector_index import ExactIndex, QuantizedIndex, l2_normalize, recall_at_k # noqa: E402
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import baseline # noqa: E402
+
+DATA_PATH = os.path.join(BACKEND_DIR, "data", "Occupation Data.txt")
+TOP_K = 100
+
+
+def load_vectors(catalog, dim: int):
+    try:
+        matrix, header = open_embeddings(DEFAULT_CACHE_PATH, data_hash=catalog.content_hash, rows=len(catalog))
+        return l2_normalize(matrix), f"{DEFAULT_CACHE_PATH} ({header['model']})"
+    except (OSError, EmbeddingFileError):
+        rng = np.random.default_rng(0)
+        centers = rng.standard_normal((40, dim)).astype(np.float32)
+        rows = centers[rng.integers(0, len(centers), len(catalog))] + rng.standard_normal((len(catalog), dim))
+        return l2_normalize(rows), "synthetic"
+
+
+def profile_queries(matcher: JobMatcher, vectors: np.ndarray):
+    cache = QueryEmbeddingCache(path=QUERY_CACHE_PATH if os.path.exists(QUERY_CACHE_PATH) else None)
+    rng = np.random.default_rng(1)
+    profiles, queries = [], []
+    for goal in matcher.mappings['goals']:
+        for mbti in matcher.mappings['mbti']:
+            for riasec in matcher.mappings['riasec']:
+                cached = cache.get(matcher.build_query_text(goal, mbti, riasec), count=False)
+                if cached is not None and len(cached) == vectors.shape[1]:
+                    query = cached
+                else: # near a random job, like a real profile query
+                    query = vectors[rng.integers(len(vectors))] + 0.05 * rng.standard_normal(vectors.shape[1])
+                profiles.append(types.SimpleNamespace(
+                    life_goal=goal, mbti_code=mbti, riasec_code=riasec,
+                    education_level="12th", domain_interest=None, cognitive_scores=None
+                ))
+                queries.append(query)
+    return profiles, l2_normalize(np.array(queries))
+
+
+def ranked(matcher, profiles, scores, indices):
+    results = []
+    for profile, row_scores, row_indices in zip(profiles, scores, indices):
+        semantic = [{"index": int(i), "score": float(s)} for s, i in zip(row_scores, row_indices) if i >= 0]
+        results.append(matcher._rank(profile, None, semantic))
+    return results
+
+
+def compare_rankings(exact, approx):
+    overlaps, deltas = [], [0.0]
+    for e, a in zip(exact, approx):
+        e_codes = [r["onet_code"] for r in e]
+        a_scores = {r["onet_code"]: r["match_score"] for r in a}
+        overlaps.append(len(set(e_codes) & set(a_scores)) / max(1, len(e_codes)))
+        deltas += [abs(r["match_score"] - a_scores[r["onet_code"]]) for r in e if r["onet_code"] in a_scores]
+    return float(np.mean(overlaps)), float(max(deltas))
+
+
+# --- Per-process memory and latency (child processes over a mapped file) ---
+
+def _measure_child(path: str, kind: str, rerank: int, queries: int):
+    """
+    Runs in a fresh process: maps the embedding file, opens the index and times
+    single queries and batches of 32. Prints the measurements as JSON.
+    """
+    from process_memory import process_memory
+
+    before = process_memory()
+    matrix, _ = open_embeddings(path)
+    if kind == "exact":
+        index = ExactIndex(matrix)
+    else:
+        index = QuantizedIndex.load(path + ".int8.npz", matrix, rerank_factor=rerank)
+    rng = np.random.default_rng(2)
+    picks = np.sort(rng.choice(len(matrix), queries, replace=False))
+    probe = l2_normalize(np.asarray(matrix[picks]) + 0.05 * rng.standard_normal((queries, matrix.shape[1])))
+
+    single = []
+    for query in probe:
+        start = time.perf_counter()
+        index.search(query[None, :], TOP_K)
+        single.append((time.perf_counter() - start) * 1000)
+    start = time.perf_counter()
+    for i in range(0, queries - 31, 32):
+        index.search(probe[i:i + 32], TOP_K)
+    batch_ms = (time.perf_counter() - start) * 1000 / max(1, queries // 32)
+
+    after = process_memory()
+    growth = {name: after.get(name, 0) - before.get(name, 0) for name in ("rss_mb", "private_dirty_mb")}
+    single.sort()
+    print(json.dumps({
+        "p50_ms": round(single[len(single) // 2], 3),
+        "batch32_ms": round(batch_ms, 3),
+        "private_growth_mb": round(growth["private_dirty_mb"], 1),
+        "file_growth_mb": round(growth["rss_mb"] - growth["private_dirty_mb"], 1)
+    }))
+
+
+def memory_latency(sizes: list, dim: int, rerank: int, queries: int = 128) -> dict:
+    from embedding_file import write_embeddings
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for rows in sizes:
+            path = os.path.join(tmp_dir, f"emb_{rows}.bin")
+            rng = np.random.default_rng(rows)
+            centers = rng.standard_normal((max(8, rows // 250), dim)).astype(np.float32)
+            matrix = l2_normalize(centers[rng.integers(0, len(centers), rows)] +
+                                  rng.standard_normal((rows, dim)).astype(np.float32))
+            write_embeddings(path, matrix, "synthetic", "synthetic", normalized=True)
+            QuantizedIndex.build(matrix, rerank_factor=rerank).save(path + ".int8.npz")
+            del matrix
+            if hasattr(os, "sync"): # freshly written pages would otherwise count as the child's dirty memory
+                os.sync()
+
+            for kind in ("exact", "int8"):
+                output = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), "--child", path, kind, str(rerank), str(queries)],
+                    check=True, capture_output=True, text=True, cwd=BACKEND_DIR
+                ).stdout
+                results[f"{kind}_{rows}"] = json.loads(output.strip().splitlines()[-1])
+    return results
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        path, kind, rerank, queries = sys.argv[2:6]
+        return _measure_child(path, kind, int(rerank), int(queries))
+
+    parser = argparse.ArgumentParser(description="Ranking, memory and latency impact of int8 embedding storage.")
+    parser.add_argument("--rerank", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--dim", type=int, default=768, help="dimension of synthetic vectors")
+    parser.add_argument("--sizes", type=int, nargs="*", default=[1000, 50000],
+                        help="matrix rows for the memory/latency runs (none: skip them)")
+    parser.add_argument("--min-overlap", type=float, default=None,
+                        help="exit 1 if any configuration's top-20 overlap with float32 falls below this")
+    parser.add_argument("--output", help="write the results JSON here")
+    args = parser.parse_args()
+
+    catalog = OccupationCatalog.from_file(DATA_PATH)
+    matcher = JobMatcher(catalog)
+    vectors, source = load_vectors(catalog, args.dim)
+    profiles, queries = profile_queries(matcher, vectors)
+
+    exact_index = ExactIndex(vectors)
+    exact_scores, exact_indices = exact_index.search(queries, TOP_K)
+    exact_ranked = ranked(matcher, profiles, exact_scores, exact_indices)
+
+    print(f"Data: {source} {vectors.shape}, {len(profiles)} profiles")
+    print(f"{'rerank':>7}{'recall@100':>12}{'top20 overlap':>15}{'max dscore':>12}")
+    worst, ranking = 1.0, {}
+    for factor in args.rerank:
+        index = QuantizedIndex.build(vectors, rerank_factor=factor)
+        scores, indices = index.search(queries, TOP_K)
+        overlap, delta = compare_rankings(exact_ranked, ranked(matcher, profiles, scores, indices))
+        recall = recall_at_k(indices, exact_indices)
+        worst = min(worst, overlap)
+        ranking[f"int8_rerank{factor}"] = {"recall": round(recall, 4), "top20_overlap": round(overlap, 4),
+                                           "max_score_delta": round(delta, 6)}
+        print(f"{factor:>7}{recall:>12.4f}{overlap:>15.4f}{delta:>12.4f}")
+
+    measured = {}
+    if args.sizes:
+        rerank = 4 if 4 in args.rerank else args.rerank[-1]
+        measured = memory_latency(args.sizes, args.dim, rerank)
+        print(f"\n{'index':<14}{'p50 ms':>9}{'batch32 ms':>12}{'private +MiB':>14}{'file +MiB':>11}")
+        for name, m in measured.items():
+            print(f"{name:<14}{m['p50_ms']:>9.3f}{m['batch32_ms']:>12.3f}{m['private_growth_mb']:>14.1f}"
+                  f"{m['file_growth_mb']:>11.1f}")
+
+    if args.output:
+        baseline.save(args.output, baseline.make_results("quantization", dict(ranking, **measured),
+                                                         source=source, dim=args.dim))
+    if args.min_overlap is not None and worst < args.min_overlap:
+        print(f"FAIL: top-20 overlap {worst:.4f} < {args.min_overlap}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+Cold-start benchmark for the backend process.
+
+Measures, over several fresh interpreter runs:
+  * import_ms         - `python -X importtime -c "import main"` (sum of top-level imports)
+  * listen_ms         - `python main.py` spawn -> first HTTP response on /health
+  * first_request_ms  - spawn -> first successful POST /recommend
+
+and checks them against startup_budget.json. Heavy modules that must stay off
+the import path (see "forbidden_imports" in the budget) fail the run as well.
+AI is disabled (empty GEMINI_API_KEY) so results do not depend on the network.
+
+Usage (from backend/):
+    python benchmarks/startup.py                 # check against the budget, exit 1 on regression
+    python benchmarks/startup.py --runs 10 --json
+"""
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import tempfile
+import statistics
+import subprocess
+import urllib.request
+import urllib.error
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BUDGET_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "startup_budget.json")
+
+SAMPLE_PROFILE = {
+    "life_goal": "Money",
+    "mbti_code": "ENTJ",
+    "riasec_code": "E",
+    "education_level": "Undergrad"
+}
+
+
+def benchmark_env(tmp_dir: str) -> dict:
+    env = dict(os.environ)
+    env.update({
+        "GEMINI_API_KEY": "", # offline, deterministic: rule-based path only
+        "QUERY_CACHE_PATH": "",
+        "QUERY_CACHE_WARMUP": "0",
+        # Every on-disk cache in a fresh directory: cold, and nothing written to backend/
+        "EMBEDDINGS_CACHE_PATH": os.path.join(tmp_dir, "job_embeddings.bin"),
+        "RULE_VECTOR_CACHE_PATH": os.path.join(tmp_dir, "rule_vectors.npz"),
+        "RECOMMENDATION_TABLE_PATH": os.path.join(tmp_dir, "recommendation_table.npz"),
+        "ROADMAP_CACHE_PATH": os.path.join(tmp_dir, "roadmap_cache.sqlite3"),
+        "ROADMAP_STORE_PATH": os.path.join(tmp_dir, "roadmap_store.sqlite3"),
+        "PYTHONUNBUFFERED": "1"
+    })
+    return env
+
+
+def parse_importtime(stderr: str):
+    """
+    Returns (total_ms, {module: cumulative_ms}) from -X importtime output.
+    Top-level imports (no indentation) are summed for the total.
+    """
+    total_us = 0
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        cumulative = int(cumulative)
+        modules[name.strip()] = cumulative / 1000
+        if name[1:2] != " ": # " name" is top level, "   name" is nested
+            total_us += cumulative
+    return total_us / 1000, modules
+
+
+def measure_imports(env: dict, module: str = "main"):
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    return parse_importtime(proc.stderr)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _request(url: str, payload: dict = None, timeout: float = 5.0) -> int:
+    data = json.dumps(payload).encode() if payload is not None else None
+    req = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            return resp.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def measure_first_request(env: dict, timeout: float = 60.0):
+    """
+    Spawns the production start command (`python main.py`) and times the first
+    HTTP response and the first successful recommendation.
+    """
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "main.py"], cwd=BACKEND_DIR, env=dict(env, PORT=str(port)),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    listen_ms = None
+    try:
+        while time.perf_counter() - start < timeout:
+            if proc.poll() is not None:
+                raise RuntimeError(f"server exited with code {proc.returncode}")
+            try:
+                if listen_ms is None:
+                    _request(f"{base}/health")
+                    listen_ms = (time.perf_counter() - start) * 1000
+                if _request(f"{base}/recommend", SAMPLE_PROFILE, timeout=timeout) == 200:
+                    return listen_ms, (time.perf_counter() - start) * 1000
+            except (urllib.error.URLError, ConnectionError, socket.timeout):
+                pass
+            time.sleep(0.01)
+        raise RuntimeError(f"no successful /recommend within {timeout}s")
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def run(runs: int):
+    samples = {"import_ms": [], "listen_ms": [], "first_request_ms": []}
+    imported = set()
+    slowest = {}
+    for _ in range(runs):
+        # A fresh directory per run, so no run starts from caches an earlier one wrote
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            env = benchmark_env(tmp_dir)
+            import_ms, modules = measure_imports(env)
+            listen_ms, first_ms = measure_first_request(env)
+            samples["import_ms"].append(import_ms)
+            samples["listen_ms"].append(listen_ms)
+            samples["first_request_ms"].append(first_ms)
+            imported.update(modules)
+            slowest = modules
+
+    result = {name: round(statistics.median(values), 1) for name, values in samples.items()}
+    result["runs"] = runs
+    result["python"] = sys.version.split()[0]
+    result["slowest_imports"] = dict(sorted(slowest.items(), key=lambda kv: -kv[1])[:10])
+    return result, imported
+
+
+def check_budget(result: dict, imported: set, budget: dict) -> list:
+    failures = []
+    for metric in ("import_ms", "listen_ms", "first_request_ms"):
+        limit = budget.get(metric)
+        if limit is not None and result[metric] > limit:
+            failures.append(f"{metric} {result[metric]:.0f}ms exceeds budget {limit}ms")
+    for module in budget.get("forbidden_imports", []):
+        if any(m == module or m.startswith(module + ".") for m in imported):
+            failures.append(f"'{module}' is imported at startup")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start benchmark with a regression budget.")
+    parser.add_argument("--runs", type=int, default=5, help="fresh processes to measure (median is reported)")
+    parser.add_argument("--budget", default=DEFAULT_BUDGET_PATH, help="budget JSON file")
+    parser.add_argument("--json", action="store_true", help="print the result as JSON")
+    args = parser.parse_args()
+
+    with open(args.budget) as f:
+        budget = json.load(f)
+
+    result, imported = run(args.runs)
+    failures = check_budget(result, imported, budget)
+
+    if args.json:
+        print(json.dumps(dict(result, failures=failures), indent=2))
+    else:
+        print(f"Cold start (median of {result['runs']} runs, Python {result['python']}):")
+        for metric in ("import_ms", "listen_ms", "first_request_ms"):
+            print(f"  {metric:<17} {result[metric]:>8.1f} ms   (budget {budget.get(metric, '-')} ms)")
+        print("  slowest imports: " + ", ".join(f"{m} {ms:.0f}ms" for m, ms in result["slowest_imports"].items()))
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        print("OK" if not failures else "Startup budget exceeded")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
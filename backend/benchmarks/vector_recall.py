@@ -0,0 +1,101 @@
+"""
+Recall@k / latency harness for the approximate vector index against exact search.
+
+Uses the real embedding cache when it exists, or a synthetic clustered matrix
+(--rows) to model the larger corpora. Without --rows and without a usable cache
+it falls back to a synthetic matrix of IVF_MIN_ROWS rows, the size at which
+VECTOR_INDEX=auto switches to IVF. Queries are held-out rows with noise
+added, which resembles profile queries landing near, but not on, a job.
+
+Usage (from backend/):
+    python benchmarks/vector_recall.py                          # job_embeddings.bin (else synthetic)
+    python benchmarks/vector_recall.py --rows 200000 --dim 768  # synthetic
+    python benchmarks/vector_recall.py --nprobe 1 4 8 16 32 --min-recall 0.95
+"""
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from embedding_file import EmbeddingFileError, open_embeddings # noqa: E402
+from job_vector_store import DEFAULT_CACHE_PATH, IVF_MIN_ROWS # noqa: E402
+from vector_index import ExactIndex, IVFIndex, l2_normalize, recall_at_k # noqa: E402
+
+
+def synthetic_matrix(rows: int, dim: int, clusters: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, rows)
+    return l2_normalize(centers[labels] + 0.6 * rng.standard_normal((rows, dim)).astype(np.float32))
+
+
+def make_queries(vectors: np.ndarray, n: int, noise: float, seed: int = 1) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    picked = np.asarray(vectors[rng.choice(len(vectors), n, replace=False)], dtype=np.float32)
+    return l2_normalize(picked + noise * rng.standard_normal(picked.shape).astype(np.float32))
+
+
+def timed_search(index, queries, top_k, **kwargs):
+    start = time.perf_counter()
+    _, indices = index.search(queries, top_k, **kwargs)
+    return indices, (time.perf_counter() - start) * 1000 / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall@k of the IVF index vs exact search.")
+    parser.add_argument("--rows", type=int, default=0, help="synthetic rows (0: use the embedding cache)")
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--clusters", type=int, default=200, help="synthetic topic clusters")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--noise", type=float, default=0.3)
+    parser.add_argument("--top-k", type=int, default=100)
+    parser.add_argument("--lists", type=int, default=0, help="IVF lists (0: ~sqrt(rows))")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--min-recall", type=float, default=None, help="exit 1 if the best nprobe falls below this")
+    args = parser.parse_args()
+
+    vectors = None
+    if not args.rows:
+        try:
+            matrix, header = open_embeddings(DEFAULT_CACHE_PATH)
+            vectors = l2_normalize(matrix)
+            source = f"{DEFAULT_CACHE_PATH} {vectors.shape} ({header['model']})"
+        except (OSError, EmbeddingFileError) as e:
+            print(f"No usable embedding cache ({e}); using a synthetic matrix (--rows to choose its size).")
+    if vectors is None:
+        vectors = synthetic_matrix(args.rows or IVF_MIN_ROWS, args.dim, args.clusters)
+        source = f"synthetic {vectors.shape}"
+    queries = make_queries(vectors, min(args.queries, len(vectors)), args.noise)
+    top_k = min(args.top_k, len(vectors))
+
+    exact_indices, exact_ms = timed_search(ExactIndex(vectors), queries, top_k)
+
+    start = time.perf_counter()
+    ivf = IVFIndex.build(vectors, n_lists=args.lists or None)
+    build_s = time.perf_counter() - start
+
+    print(f"Data: {source}, {len(queries)} queries, recall@{top_k}")
+    print(f"IVF: {ivf.n_lists} lists, built in {build_s:.1f}s")
+    print(f"{'index':<16}{'recall':>8}{'ms/query':>10}{'speedup':>9}")
+    print(f"{'exact':<16}{1.0:>8.3f}{exact_ms:>10.3f}{1.0:>9.1f}")
+    best = 0.0
+    for nprobe in args.nprobe:
+        if nprobe > ivf.n_lists:
+            continue
+        indices, ms = timed_search(ivf, queries, top_k, nprobe=nprobe)
+        recall = recall_at_k(indices, exact_indices)
+        best = max(best, recall)
+        print(f"{f'ivf nprobe={nprobe}':<16}{recall:>8.3f}{ms:>10.3f}{exact_ms / ms:>9.1f}")
+
+    if args.min_recall is not None and best < args.min_recall:
+        print(f"FAIL: best recall {best:.3f} < {args.min_recall}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
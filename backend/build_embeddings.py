@@ -1,7 +1,5 @@
 import os
-import pandas as pd
-import pickle
-import numpy as np
+import argparse
 import time
 from dotenv import load_dotenv
 
@@ -15,62 +13,77 @@ import sys
 sys.path.append(os.path.dirname(__file__))
 
 from gemini_service import GeminiService
+from embedding_file import SUPPORTED_DTYPES, write_embeddings
+from job_vector_store import DEFAULT_CACHE_PATH, l2_normalize
+from occupation_catalog import OccupationCatalog
+from embedding_builder import EmbeddingBuilder, load_previous
 
 DATA_PATH = os.path.join(os.path.dirname(__file__), "data", "Occupation Data.txt")
-CACHE_PATH = os.path.join(os.path.dirname(__file__), "job_embeddings.pkl")
+CACHE_PATH = DEFAULT_CACHE_PATH
+CHECKPOINT_PATH = CACHE_PATH + ".ckpt.npz"
 
-def build():
+def build(dtype: str = "float32", batch_size: int = 50, workers: int = 4, rate: float = 2.0,
+          full: bool = False, backend=None, model: str = None):
+    """
+    `backend` defaults to GeminiService; any object with embed_batch(texts) can be
+    plugged in (e.g. a local fake service) together with the `model` name it reports.
+    """
     print("--- 🏗️  Building Embeddings for Production ---")
-    
+
     if not os.path.exists(DATA_PATH):
         print(f"❌ Data file not found at: {DATA_PATH}")
         return
 
     print("Loading data...")
-    df = pd.read_csv(DATA_PATH, sep="\t")
-    print(f"Loaded {len(df)} jobs.")
-    
-    print("Initializing Gemini Service...")
-    gemini = GeminiService()
-    if not gemini.is_configured:
-        print("❌ Gemini Service NOT configured. Check GEMINI_API_KEY.")
-        return
+    catalog = OccupationCatalog.from_file(DATA_PATH)
+    print(f"Loaded {len(catalog)} jobs.")
+
+    if backend is None:
+        print("Initializing Gemini Service...")
+        backend = GeminiService()
+        if not backend.is_configured:
+            print("❌ Gemini Service NOT configured. Check GEMINI_API_KEY.")
+            return
+    model = model or getattr(backend, 'embedding_model', None)
+
+    texts = catalog.embedding_texts()
+    previous = None if full else load_previous(CACHE_PATH, model)
 
-    texts = (
-        "Title: " + df['Title'].astype(str) + 
-        "; Description: " + df['Description'].astype(str)
-    ).tolist()
-    
-    embeddings = []
-    print(f"Starting embedding generation for {len(texts)} items...")
-    print("Estimated time: ~5-10 minutes.")
-    
-    for i, text in enumerate(texts):
-        if i % 20 == 0: 
-            print(f"Processed {i}/{len(texts)}...")
-        
-        try:
-            emb = gemini.get_embedding(text)
-            if emb:
-                embeddings.append(emb)
-            else:
-                print(f"⚠️ Empty embedding for index {i}")
-                embeddings.append([0.0] * 768)
-        except Exception as e:
-            print(f"❌ Error at index {i}: {e}")
-            embeddings.append([0.0] * 768)
-        
-        # Rate limit handling
-        time.sleep(0.3)
+    builder = EmbeddingBuilder(
+        backend,
+        batch_size=batch_size,
+        max_workers=workers,
+        requests_per_second=rate,
+        checkpoint_path=CHECKPOINT_PATH,
+        on_progress=lambda done, total: print(f"Processed {done}/{total}..."),
+        model=model
+    )
+    print(f"Starting embedding generation for {len(texts)} items ({workers} workers, batches of {batch_size})...")
+    start = time.time()
+    embeddings = builder.build(texts, previous=previous)
+    print(f"Stats: {builder.stats} in {time.time() - start:.1f}s")
 
-    embeddings = np.array(embeddings)
+    if builder.stats["failed"]:
+        print(f"❌ {builder.stats['failed']} rows failed. Progress is checkpointed; re-run to resume.")
+        return
+
+    embeddings = l2_normalize(embeddings)
     print(f"✅ Finished. Shape: {embeddings.shape}")
-    
-    print(f"Saving to {CACHE_PATH}...")
-    with open(CACHE_PATH, 'wb') as f:
-        pickle.dump(embeddings, f)
-        
-    print("🎉 Done! Commit 'job_embeddings.pkl' to the repo for instant startup.")
+
+    print(f"Saving to {CACHE_PATH} ({dtype})...")
+    write_embeddings(CACHE_PATH, embeddings, model, catalog.content_hash,
+                     dtype=dtype, normalized=True, row_hashes=builder.row_hashes)
+
+    print(f"🎉 Done! Commit '{os.path.basename(CACHE_PATH)}' to the repo for instant startup.")
 
 if __name__ == "__main__":
-    build()
+    parser = argparse.ArgumentParser(description="Build the job embedding cache.")
+    parser.add_argument("--dtype", choices=SUPPORTED_DTYPES, default="float32",
+                        help="On-disk precision of the embedding matrix.")
+    parser.add_argument("--batch-size", type=int, default=50, help="Texts per embedding request.")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent embedding requests.")
+    parser.add_argument("--rate", type=float, default=2.0, help="Max embedding requests per second.")
+    parser.add_argument("--full", action="store_true",
+                        help="Re-embed every row instead of reusing unchanged rows from the last build.")
+    args = parser.parse_args()
+    build(dtype=args.dtype, batch_size=args.batch_size, workers=args.workers, rate=args.rate, full=args.full)
@@ -0,0 +1,166 @@
+import os
+import time
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    """
+    Raised instead of calling an upstream operation whose circuit is open.
+    """
+
+
+class CircuitBreaker:
+    """
+    Failure-rate circuit breaker for one upstream operation.
+
+    Closed: calls go through and their outcomes fill a sliding window of the
+    last `window` calls. Once the window holds at least `min_calls` outcomes and
+    the share of failures reaches `failure_rate`, the circuit opens.
+    Open: calls are rejected with CircuitOpenError for `reset_timeout` seconds.
+    Half-open: up to `half_open_calls` probe calls go through; a successful
+    probe closes the circuit, a failed one opens it again.
+    """
+
+    def __init__(self, name: str, failure_rate: float = 0.5, min_calls: int = 5, window: int = 20,
+                 reset_timeout: float = 30.0, half_open_calls: int = 1, clock=time.monotonic):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.reset_timeout = reset_timeout
+        self.half_open_calls = half_open_calls
+        self.clock = clock
+
+        self._outcomes = deque(maxlen=window) # True for a failed call
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes = 0 # probe calls in flight while half-open
+        self._lock = threading.Lock()
+        self.opened = 0 # times the circuit has opened
+        self.rejected = 0 # calls short-circuited while open
+
+    @classmethod
+    def from_env(cls, name: str):
+        """
+        CIRCUIT_FAILURE_RATE, CIRCUIT_MIN_CALLS, CIRCUIT_WINDOW,
+        CIRCUIT_RESET_TIMEOUT (seconds), CIRCUIT_HALF_OPEN_CALLS.
+        """
+        return cls(
+            name,
+            failure_rate=float(os.getenv("CIRCUIT_FAILURE_RATE", 0.5)),
+            min_calls=int(os.getenv("CIRCUIT_MIN_CALLS", 5)),
+            window=int(os.getenv("CIRCUIT_WINDOW", 20)),
+            reset_timeout=float(os.getenv("CIRCUIT_RESET_TIMEOUT", 30)),
+            half_open_calls=int(os.getenv("CIRCUIT_HALF_OPEN_CALLS", 1))
+        )
+
+    def _refresh(self):
+        if self._state == OPEN and self.clock() - self._opened_at >= self.reset_timeout:
+            self._state = HALF_OPEN
+            self._probes = 0
+
+    def _open(self):
+        self._state = OPEN
+        self._opened_at = self.clock()
+        self._outcomes.clear()
+        self.opened += 1
+        logger.warning(f"Circuit '{self.name}' opened; failing fast for {self.reset_timeout:g}s.")
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._refresh()
+            return self._state
+
+    def rejecting(self) -> bool:
+        """
+        Whether a call made now would be rejected, for callers that skip straight
+        to a fallback. Counted as a rejection when true; never reserves a probe slot.
+        """
+        with self._lock:
+            self._refresh()
+            rejecting = self._state == OPEN or (self._state == HALF_OPEN and self._probes >= self.half_open_calls)
+            if rejecting:
+                self.rejected += 1
+            return rejecting
+
+    def acquire(self) -> bool:
+        """
+        Admits one call (reserving a probe slot when half-open). Every admitted
+        call must be followed by record() or release().
+        """
+        with self._lock:
+            self._refresh()
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and self._probes < self.half_open_calls:
+                self._probes += 1
+                return True
+            self.rejected += 1
+            return False
+
+    def release(self):
+        """
+        Gives back an admitted call that ended without an outcome (e.g. cancelled).
+        """
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probes = max(0, self._probes - 1)
+
+    def record(self, success: bool):
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probes = max(0, self._probes - 1)
+                if success:
+                    self._state = CLOSED
+                    self._outcomes.clear()
+                    logger.info(f"Circuit '{self.name}' closed.")
+                else:
+                    self._open()
+            elif self._state == CLOSED:
+                self._outcomes.append(not success)
+                failures = sum(self._outcomes)
+                if len(self._outcomes) >= self.min_calls and failures >= self.failure_rate * len(self._outcomes):
+                    self._open()
+            # Outcomes of calls admitted before the circuit opened are dropped
+
+    @contextmanager
+    def guard(self):
+        """
+        Runs the body as one call through the breaker: raises CircuitOpenError
+        when rejected, and records an exception from the body as a failure.
+        Works around awaits too, so sync and async callers share one breaker.
+        """
+        if not self.acquire():
+            raise CircuitOpenError(f"Circuit '{self.name}' is open.")
+        try:
+            yield
+        except Exception:
+            self.record(False)
+            raise
+        except BaseException:
+            self.release()
+            raise
+        else:
+            self.record(True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._refresh()
+            window = len(self._outcomes)
+            stats = {
+                "state": self._state,
+                "window_calls": window,
+                "window_failure_rate": round(sum(self._outcomes) / window, 3) if window else 0.0,
+                "opened": self.opened,
+                "rejected": self.rejected
+            }
+            if self._state == OPEN:
+                stats["retry_in_s"] = round(max(0.0, self.reset_timeout - (self.clock() - self._opened_at)), 1)
+            return stats
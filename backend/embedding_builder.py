@@ -0,0 +1,258 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from embedding_file import EmbeddingFileError, open_embeddings
+
+logger = logging.getLogger(__name__)
+
+
+def row_hash(text: str) -> str:
+    return hashlib.sha1(str(text).encode("utf-8")).hexdigest()[:16]
+
+
+def _is_throttled(error: Exception) -> bool:
+    """
+    Back-pressure from the embedding API (google.api_core ResourceExhausted / HTTP 429),
+    detected without importing a specific client library.
+    """
+    return type(error).__name__ in ("ResourceExhausted", "TooManyRequests") or getattr(error, "code", None) == 429
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. `rate` tokens are added per second, up to `capacity`.
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def acquire(self, tokens: float = 1.0):
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        """
+        Non-blocking acquire(): False if the tokens are not available yet.
+        """
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def set_rate(self, rate: float):
+        with self._lock:
+            self._refill()
+            self.rate = rate
+
+
+class EmbeddingBuilder:
+    """
+    Embeds a list of texts in batches through a bounded worker pool.
+
+    - `backend` is anything with `embed_batch(texts) -> list[list[float]]` that raises on failure
+      (GeminiService in production, a local fake in tests/benchmarks).
+    - Requests are paced by a token bucket (one token per batch). Throttling errors halve the
+      rate; successful batches slowly raise it back (AIMD).
+    - Progress is checkpointed to `checkpoint_path` so an interrupted build resumes, and rows
+      whose text is unchanged since a previous build are reused instead of re-embedded.
+    """
+
+    def __init__(self, backend, batch_size: int = 50, max_workers: int = 4, requests_per_second: float = 2.0,
+                 min_requests_per_second: float = 0.1, max_retries: int = 6, checkpoint_path: str = None,
+                 checkpoint_every: int = 5, on_progress=None, model: str = None):
+        self.backend = backend
+        self.model = model or getattr(backend, "embedding_model", None) or ""
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.max_rate = requests_per_second
+        self.min_rate = min_requests_per_second
+        self.max_retries = max_retries
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_every = checkpoint_every
+        self.on_progress = on_progress
+        self.bucket = TokenBucket(requests_per_second)
+
+        self._lock = threading.Lock()
+        self._vectors = None
+        self._done = None
+        self._hashes = None
+        self._batches_since_checkpoint = 0
+        self.stats = {"total": 0, "reused": 0, "embedded": 0, "failed": 0, "throttled": 0}
+
+    # --- Public API ---
+
+    def build(self, texts: list[str], previous=None) -> np.ndarray:
+        """
+        Returns a float32 matrix (len(texts) x dim). Rows that could not be embedded are zero.
+        `previous` is an optional (row_hashes, matrix) pair from the last successful build.
+        """
+        self._hashes = [row_hash(t) for t in texts]
+        self._done = np.zeros(len(texts), dtype=bool)
+        self._vectors = None
+        self.stats.update(total=len(texts), reused=0, embedded=0, failed=0, throttled=0)
+
+        self._reuse(self._load_checkpoint())
+        self._reuse(previous)
+
+        pending = np.flatnonzero(~self._done).tolist()
+        logger.info(f"Embedding build: {len(texts)} rows, {self.stats['reused']} reused, {len(pending)} to embed.")
+        self._report()
+
+        batches = [pending[i:i + self.batch_size] for i in range(0, len(pending), self.batch_size)]
+        if batches:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                for _ in pool.map(lambda rows: self._embed_rows(rows, texts), batches):
+                    pass
+
+        self.stats["failed"] = int((~self._done).sum())
+        if self.stats["failed"]:
+            logger.warning(f"Embedding build: {self.stats['failed']} rows failed; they stay zero until the next build.")
+            self._save_checkpoint()
+        elif self.checkpoint_path and os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+
+        if self._vectors is None:
+            return np.zeros((len(texts), 0), dtype=np.float32)
+        return self._vectors
+
+    @property
+    def row_hashes(self) -> list[str]:
+        return self._hashes
+
+    # --- Internals ---
+
+    def _ensure_matrix(self, dim: int):
+        if self._vectors is None:
+            self._vectors = np.zeros((len(self._hashes), dim), dtype=np.float32)
+        elif self._vectors.shape[1] != dim:
+            raise ValueError(f"Embedding dimension changed mid-build ({self._vectors.shape[1]} -> {dim})")
+
+    def _reuse(self, source):
+        if not source:
+            return
+        hashes, matrix = source
+        lookup = {h: i for i, h in enumerate(hashes)}
+        with self._lock:
+            for row, h in enumerate(self._hashes):
+                src = lookup.get(h)
+                if self._done[row] or src is None or not np.any(matrix[src]):
+                    continue
+                self._ensure_matrix(matrix.shape[1])
+                self._vectors[row] = matrix[src]
+                self._done[row] = True
+                self.stats["reused"] += 1
+
+    def _embed_rows(self, rows: list[int], texts: list[str]):
+        batch = [texts[i] for i in rows]
+        for attempt in range(self.max_retries):
+            self.bucket.acquire()
+            try:
+                vectors = self.backend.embed_batch(batch)
+                if len(vectors) != len(batch):
+                    raise ValueError(f"Backend returned {len(vectors)} embeddings for {len(batch)} texts")
+            except Exception as e:
+                backoff = min(30.0, 2 ** attempt)
+                if _is_throttled(e):
+                    with self._lock:
+                        self.stats["throttled"] += 1
+                    self.bucket.set_rate(max(self.min_rate, self.bucket.rate / 2))
+                    logger.warning(f"Embedding API throttled; rate -> {self.bucket.rate:.2f} req/s, retrying in {backoff}s")
+                else:
+                    logger.error(f"Embedding batch failed (attempt {attempt + 1}/{self.max_retries}): {e}")
+                time.sleep(backoff)
+                continue
+
+            self._store(rows, vectors)
+            # Additive increase back towards the configured rate
+            self.bucket.set_rate(min(self.max_rate, self.bucket.rate + 0.1 * self.max_rate))
+            return
+
+    def _store(self, rows: list[int], vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        with self._lock:
+            self._ensure_matrix(vectors.shape[1])
+            self._vectors[rows] = vectors
+            self._done[rows] = True
+            self.stats["embedded"] += len(rows)
+            self._batches_since_checkpoint += 1
+            checkpoint = self._batches_since_checkpoint >= self.checkpoint_every
+            if checkpoint:
+                self._batches_since_checkpoint = 0
+        if checkpoint:
+            self._save_checkpoint()
+        self._report()
+
+    def _report(self):
+        if self.on_progress:
+            self.on_progress(int(self._done.sum()), len(self._done))
+
+    def _load_checkpoint(self):
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return None
+        try:
+            with np.load(self.checkpoint_path, allow_pickle=False) as data:
+                if str(data["model"]) != self.model:
+                    logger.info("Ignoring checkpoint from a different embedding model.")
+                    return None
+                done = data["done"]
+                hashes = [h if d else "" for h, d in zip(data["row_hashes"].tolist(), done)]
+                logger.info(f"Resuming embedding build from checkpoint ({int(done.sum())} rows done).")
+                return hashes, data["vectors"]
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable checkpoint {self.checkpoint_path}: {e}")
+            return None
+
+    def _save_checkpoint(self):
+        if not self.checkpoint_path or self._vectors is None:
+            return
+        with self._lock:
+            vectors = self._vectors.copy()
+            done = self._done.copy()
+        tmp_path = f"{self.checkpoint_path}.tmp.{os.getpid()}"
+        try:
+            with open(tmp_path, "wb") as f:
+                np.savez(f, model=np.array(self.model), row_hashes=np.array(self._hashes), vectors=vectors, done=done)
+            os.replace(tmp_path, self.checkpoint_path)
+        except Exception as e:
+            logger.warning(f"Could not write checkpoint: {e}")
+
+
+def load_previous(path: str, model: str = None):
+    """
+    (row_hashes, matrix) from an existing embedding file built with `model`, for
+    incremental rebuilds. Returns None if there is nothing reusable.
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        matrix, header = open_embeddings(path, model=model)
+    except (EmbeddingFileError, OSError) as e:
+        logger.info(f"Previous embeddings not reusable: {e}")
+        return None
+    hashes = header.get("row_hashes")
+    if not hashes or len(hashes) != matrix.shape[0]:
+        return None
+    return hashes, matrix
@@ -0,0 +1,142 @@
+"""
+Versioned on-disk format for the job embedding matrix.
+
+Layout:
+    MAGIC (8 bytes) | header length (uint32, little endian) | JSON header | padding | matrix
+
+The matrix is stored row-major as raw float32/float16 and starts on a
+64-byte boundary so it can be opened with np.memmap. Worker processes that
+map the same file share its pages through the OS page cache instead of each
+holding a private, unpickled copy.
+"""
+
+import hashlib
+import json
+import os
+import struct
+import time
+
+import numpy as np
+
+MAGIC = b"CNXEMB\x00\x01"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+SUPPORTED_DTYPES = ("float32", "float16")
+
+
+class EmbeddingFileError(ValueError):
+    """Raised when an embedding file is malformed or does not match the current data/model."""
+
+
+def dataset_hash(texts) -> str:
+    """
+    Stable hash of the rows that were embedded, in order.
+    """
+    digest = hashlib.sha256()
+    for text in texts:
+        digest.update(str(text).encode("utf-8"))
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+
+def matrix_digest(matrix) -> str:
+    """
+    sha256 of the matrix bytes. Identifies the exact rows an index was built from,
+    so a rewritten file (refilled rows, another dtype) invalidates its indexes.
+    """
+    return hashlib.sha256(np.ascontiguousarray(matrix).data).hexdigest()
+
+
+def write_embeddings(path: str, matrix, model: str, data_hash: str, dtype: str = "float32",
+                     normalized: bool = False, row_hashes: list = None):
+    """
+    Atomically writes `matrix` (rows x dim) with its header to `path`.
+    `normalized` records that every row is already L2-normalized; `row_hashes`
+    (one per row) lets the next build reuse rows whose text did not change.
+    The header records the matrix digest (`matrix_sha256`) as written.
+    """
+    if dtype not in SUPPORTED_DTYPES:
+        raise EmbeddingFileError(f"Unsupported dtype '{dtype}', expected one of {SUPPORTED_DTYPES}")
+
+    matrix = np.ascontiguousarray(matrix, dtype=dtype)
+    if matrix.ndim != 2:
+        raise EmbeddingFileError(f"Expected a 2-D matrix, got shape {matrix.shape}")
+
+    header = {
+        "format_version": FORMAT_VERSION,
+        "model": model,
+        "dtype": dtype,
+        "rows": int(matrix.shape[0]),
+        "dim": int(matrix.shape[1]),
+        "data_hash": data_hash,
+        "normalized": bool(normalized),
+        "created_at": int(time.time()),
+        "matrix_sha256": matrix_digest(matrix),
+    }
+    if row_hashes is not None:
+        header["row_hashes"] = list(row_hashes)
+    header_bytes = json.dumps(header, sort_keys=True).encode("utf-8")
+    prefix_len = len(MAGIC) + 4 + len(header_bytes)
+    padding = (-prefix_len) % ALIGNMENT
+
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<I", len(header_bytes)))
+        f.write(header_bytes)
+        f.write(b"\x00" * padding)
+        f.write(matrix.tobytes(order="C"))
+    os.replace(tmp_path, path)
+    return header
+
+
+def read_header(path: str) -> tuple[dict, int]:
+    """
+    Returns (header, offset of the matrix in bytes).
+    """
+    with open(path, "rb") as f:
+        magic = f.read(len(MAGIC))
+        if magic != MAGIC:
+            raise EmbeddingFileError(f"{path} is not an embedding file (bad magic)")
+        (header_len,) = struct.unpack("<I", f.read(4))
+        try:
+            header = json.loads(f.read(header_len).decode("utf-8"))
+        except ValueError as e:
+            raise EmbeddingFileError(f"Corrupt header in {path}: {e}")
+
+    if header.get("format_version") != FORMAT_VERSION:
+        raise EmbeddingFileError(f"Unsupported format version {header.get('format_version')}")
+    if header.get("dtype") not in SUPPORTED_DTYPES:
+        raise EmbeddingFileError(f"Unsupported dtype {header.get('dtype')}")
+
+    prefix_len = len(MAGIC) + 4 + header_len
+    offset = prefix_len + (-prefix_len) % ALIGNMENT
+    return header, offset
+
+
+def open_embeddings(path: str, model: str = None, data_hash: str = None, rows: int = None):
+    """
+    Memory-maps the matrix in `path` read-only after validating its header.
+
+    Any expectation that is passed (model, data hash, row count) must match,
+    otherwise EmbeddingFileError is raised so that a stale cache is rebuilt
+    instead of serving embeddings for the wrong rows.
+    """
+    header, offset = read_header(path)
+
+    if model is not None and header.get("model") != model:
+        raise EmbeddingFileError(f"Embedding model changed ({header.get('model')} -> {model})")
+    if data_hash is not None and header.get("data_hash") != data_hash:
+        raise EmbeddingFileError("Occupation data changed since embeddings were built")
+    if rows is not None and header.get("rows") != rows:
+        raise EmbeddingFileError(f"Row count mismatch ({header.get('rows')} != {rows})")
+
+    shape = (header["rows"], header["dim"])
+    if not shape[0] or not shape[1]:
+        raise EmbeddingFileError(f"{path} holds an empty matrix")
+    expected_size = offset + shape[0] * shape[1] * np.dtype(header["dtype"]).itemsize
+    if os.path.getsize(path) != expected_size:
+        raise EmbeddingFileError(f"{path} is truncated or has trailing data")
+
+    matrix = np.memmap(path, dtype=header["dtype"], mode="r", offset=offset, shape=shape)
+    return matrix, header
@@ -0,0 +1,39 @@
+import os
+import logging
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError: # Windows: no cross-process coordination, every process works alone
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+@contextmanager
+def exclusive_lock(path: str, blocking: bool = True):
+    """
+    Cross-process exclusive lock on `path` (flock), e.g. so only one worker
+    builds a shared cache file.
+
+    Yields True while the lock is held. With blocking=False it yields False
+    immediately if another process holds it. The kernel releases the lock when
+    the holder exits, so a crashed builder never leaves it stuck.
+    """
+    if fcntl is None:
+        yield True
+        return
+
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+    finally:
+        os.close(fd)
@@ -1,23 +1,78 @@
 import os
-import google.generativeai as genai
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
-from google.api_core import exceptions
+import time
+import asyncio
+from tenacity import retry, stop_after_attempt, wait_exponential, wait_random_exponential, retry_if_exception
 import logging
 
 # Fallback generator
 from roadmap_generator import RoadmapGenerator
+from query_cache import QueryEmbeddingCache
+from roadmap_cache import RoadmapCache
+from roadmap_store import RoadmapStore
+from singleflight import SingleFlight
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+import metrics
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+EMBEDDING_MODEL = "models/text-embedding-004"
+
+# Bump whenever _roadmap_prompt changes so cached roadmaps are regenerated
+ROADMAP_PROMPT_VERSION = 1
+
+SAFETY_SETTINGS = [
+    {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_ONLY_HIGH"},
+    {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_ONLY_HIGH"},
+]
+
+def _genai():
+    """
+    The Gemini SDK takes about a second to import, so it is loaded on first use
+    (only when an API key is configured) instead of on the startup path.
+    """
+    import google.generativeai as genai
+    return genai
+
+def _is_retryable(error: BaseException) -> bool:
+    # Only SDK calls raise these, so google.api_core is already loaded by the time this runs
+    from google.api_core import exceptions
+    return isinstance(error, (exceptions.ResourceExhausted, exceptions.ServiceUnavailable))
+
+def _past_deadline(retry_state) -> bool:
+    # Stop retrying when the backoff sleep would overrun the call's deadline
+    deadline = retry_state.kwargs.get("deadline")
+    return deadline is not None and time.monotonic() + (retry_state.upcoming_sleep or 0) >= deadline
+
 class GeminiService:
     def __init__(self):
         api_key = os.getenv("GEMINI_API_KEY")
         self.is_configured = False
         self.model = None
+        self.embedding_model = EMBEDDING_MODEL
+        self.query_cache = QueryEmbeddingCache.from_env(model=self.embedding_model)
+        self.roadmap_cache = RoadmapCache.from_env()
+        # Pre-generated roadmaps (pregenerate_roadmaps.py), served without a model call
+        self.roadmap_store = RoadmapStore.from_env()
+        # Concurrent identical LLM/embedding calls (sync or async) share one upstream request
+        self.flights = SingleFlight()
+
+        # Async path: per-call timeout and a cap on concurrent in-flight LLM calls
+        self.call_timeout = float(os.getenv("GEMINI_CALL_TIMEOUT", 30))
+        self.max_concurrency = int(os.getenv("GEMINI_MAX_CONCURRENCY", 256))
+        self._semaphores = {} # event loop -> asyncio.Semaphore
+
+        # Time budget per operation, retries and backoff included
+        self.deadlines = {
+            "generate": float(os.getenv("GEMINI_GENERATE_DEADLINE", 20)),
+            "embed": float(os.getenv("GEMINI_EMBED_DEADLINE", 5)),
+            "list_models": self.call_timeout
+        }
+        # Per-operation breakers: when an upstream keeps failing, callers go straight to their fallbacks
+        self.breakers = {name: CircuitBreaker.from_env(name) for name in self.deadlines}
 
         if api_key:
-            genai.configure(api_key=api_key)
+            _genai().configure(api_key=api_key)
             self.model = self._configure_model()
             if self.model:
                 self.is_configured = True
@@ -37,47 +92,173 @@ class GeminiService:
         
         # 1. Try to list models and find an exact match
         try:
-            available_models = [m.name.replace('models/', '') for m in genai.list_models()]
+            with self.breakers["list_models"].guard(), metrics.upstream_call("list_models"):
+                available_models = [
+                    m.name.replace('models/', '')
+                    for m in _genai().list_models(request_options={"timeout": self.deadlines["list_models"]})
+                ]
             logger.info(f"Available models: {available_models}")
             
             for candidate in candidate_models:
                 if candidate in available_models:
                     logger.info(f"Selected model: {candidate}")
-                    return genai.GenerativeModel(candidate)
+                    return _genai().GenerativeModel(candidate)
         except Exception as e:
             logger.warning(f"Failed to list models: {e}. Falling back to trial.")
 
         # 2. If listing fails or no match, just try instantiating the first preferred one
         # defaulting to 1.5-flash as it's the current standard
-        return genai.GenerativeModel("gemini-1.5-flash")
+        return _genai().GenerativeModel("gemini-1.5-flash")
+
+    def _deadline(self, operation: str) -> float:
+        return time.monotonic() + self.deadlines[operation]
+
+    def _attempt_timeout(self, deadline: float) -> float:
+        # Each attempt gets the per-call timeout, cut short by what is left of the deadline
+        return max(0.1, min(self.call_timeout, deadline - time.monotonic()))
+
+    def circuit_stats(self) -> dict:
+        return {name: breaker.stats() for name, breaker in self.breakers.items()}
 
     @retry(
-        retry=retry_if_exception_type((exceptions.ResourceExhausted, exceptions.ServiceUnavailable)),
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=2, max=10)
+        retry=retry_if_exception(_is_retryable),
+        stop=stop_after_attempt(3) | _past_deadline,
+        wait=wait_exponential(multiplier=1, min=2, max=10),
+        before_sleep=metrics.count_retry("generate")
     )
-    def _call_ai(self, prompt):
-        return self.model.generate_content(
-            prompt,
-            safety_settings=[
-                {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_ONLY_HIGH"},
-                {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_ONLY_HIGH"},
-            ]
-        )
+    def _call_ai(self, prompt, deadline: float):
+        with self.breakers["generate"].guard(), metrics.upstream_call("generate"):
+            return self.model.generate_content(
+                prompt,
+                safety_settings=SAFETY_SETTINGS,
+                request_options={"timeout": self._attempt_timeout(deadline)}
+            )
 
-    from functools import lru_cache
+    def _semaphore(self) -> asyncio.Semaphore:
+        """
+        Concurrency limiter for the running event loop (semaphores are loop-bound).
+        """
+        loop = asyncio.get_running_loop()
+        sem = self._semaphores.get(loop)
+        if sem is None:
+            sem = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return sem
 
-    @lru_cache(maxsize=100)
-    def generate_roadmap(self, role: str, level: str) -> str:
+    async def _bounded(self, coro, timeout: float = None):
+        """
+        Awaits an upstream call under the concurrency cap and the per-call timeout.
+        """
+        async with self._semaphore():
+            return await asyncio.wait_for(coro, timeout=timeout or self.call_timeout)
+
+    @retry(
+        retry=retry_if_exception(_is_retryable),
+        stop=stop_after_attempt(3) | _past_deadline,
+        wait=wait_random_exponential(multiplier=1, min=1, max=10), # jitter spreads out retry bursts
+        before_sleep=metrics.count_retry("generate")
+    )
+    async def _call_ai_async(self, prompt, deadline: float):
+        timeout = self._attempt_timeout(deadline)
+        with self.breakers["generate"].guard(), metrics.upstream_call("generate"):
+            return await self._bounded(self.model.generate_content_async(
+                prompt,
+                safety_settings=SAFETY_SETTINGS,
+                request_options={"timeout": timeout}
+            ), timeout)
+
+    @property
+    def model_name(self) -> str:
+        return getattr(self.model, 'model_name', None) or ""
+
+    def _roadmap_key(self, role: str, level: str) -> tuple:
+        return (role, level, ROADMAP_PROMPT_VERSION, self.model_name)
+
+    def stored_roadmap(self, role: str, level: str):
+        """
+        (digest, compressed body) of a pre-generated roadmap for the current prompt, or None.
+        """
+        return self.roadmap_store.get(role, level, ROADMAP_PROMPT_VERSION)
+
+    async def stored_roadmap_async(self, role: str, level: str):
+        # SQLite may wait up to its busy timeout for a writer: keep it off the event loop
+        return await asyncio.to_thread(self.stored_roadmap, role, level)
+
+    def generate_roadmap_text(self, role: str, level: str) -> str:
+        """
+        One live roadmap generation that bypasses the caches and the static
+        fallback and raises on failure. Used by the offline pre-generation job.
+        """
+        if not self.is_configured or not self.model:
+            raise RuntimeError("Gemini Service not configured")
+        response = self._call_ai(self._roadmap_prompt(role, level), deadline=self._deadline("generate"))
+        if not response.text:
+            raise ValueError("empty roadmap")
+        return response.text
+
+    @staticmethod
+    def _static_roadmap(role: str, level: str) -> str:
         # Static Roadmap Fallback Helper
-        def get_static_roadmap():
-            logger.info("Generating static roadmap fallback.")
-            return RoadmapGenerator.generate("00-0000", role, level)
+        logger.info("Generating static roadmap fallback.")
+        return RoadmapGenerator.generate("00-0000", role, level)
 
+    @staticmethod
+    def _domain_key(domain_interest: str) -> tuple:
+        return ("expand", " ".join(domain_interest.lower().split()))
+
+    def generate_roadmap(self, role: str, level: str) -> str:
         if not self.is_configured or not self.model:
-            return get_static_roadmap()
+            return self._static_roadmap(role, level)
+
+        key = self._roadmap_key(role, level)
+        cached = self.roadmap_cache.get(*key)
+        if cached is not None:
+            return cached
+        if self.roadmap_cache.recently_failed(*key) or self.breakers["generate"].rejecting():
+            return self._static_roadmap(role, level)
+
+        return self.flights.do(("roadmap", self.roadmap_cache.make_key(*key)), self._generate_roadmap_live, role, level)
+
+    def _generate_roadmap_live(self, role: str, level: str) -> str:
+        key = self._roadmap_key(role, level)
+        prompt = self._roadmap_prompt(role, level)
         
-        prompt = f"""
+        try:
+            response = self._call_ai(prompt, deadline=self._deadline("generate"))
+            self.roadmap_cache.put(*key, response.text)
+            return response.text
+        except CircuitOpenError:
+            return self._static_roadmap(role, level)
+        except Exception as e:
+            logger.error(f"AI Generation failed: {e}")
+            self.roadmap_cache.mark_failed(*key)
+            return self._static_roadmap(role, level)
+
+    def expand_domain(self, domain_interest: str) -> list[str]:
+        """
+        Uses AI to find diverse job titles related to a study domain.
+        Example: "Data Science" -> ["Data Scientist", "Machine Learning Engineer", "Data Analyst"]
+        """
+        if not self.is_configured or not self.model or not domain_interest or self.breakers["generate"].rejecting():
+            return []
+
+        return list(self.flights.do(self._domain_key(domain_interest), self._expand_domain_live, domain_interest))
+
+    def _expand_domain_live(self, domain_interest: str) -> list[str]:
+        prompt = self._domain_prompt(domain_interest)
+        try:
+            response = self._call_ai(prompt, deadline=self._deadline("generate"))
+            keywords = self._parse_titles(response.text)
+            logger.info(f"AI Expanded '{domain_interest}' to: {keywords}")
+            return keywords
+        except CircuitOpenError:
+            return []
+        except Exception as e:
+            logger.error(f"Domain expansion failed: {e}")
+            return []
+
+    @staticmethod
+    def _roadmap_prompt(role: str, level: str) -> str:
+        return f"""
         Act as a Senior Career Strategist. Create a detailed career roadmap for '{role}' (Level: {level}).
         Format: Markdown.
         
@@ -103,53 +284,326 @@ class GeminiService:
         ## 🛑 Risks
         - [Bottleneck] -> [Solution]
         """
-        
+
+    @staticmethod
+    def _domain_prompt(domain_interest: str) -> str:
+        return f"""
+        List 5 distinct, professional job titles for a student specializing in '{domain_interest}'.
+        Return ONLY a comma-separated list of titles. No numbering or extra text.
+        """
+
+    @staticmethod
+    def _parse_titles(text: str) -> list[str]:
+        text = text.replace('\n', '')
+        # Clean and split
+        return [k.strip() for k in text.split(',') if k.strip()]
+
+    def get_embedding(self, text: str) -> list[float]:
+        """
+        Generates embeddings using the Gemini API.
+        """
+        if not self.is_configured:
+            logger.warning("Gemini Service not configured, returning empty embedding.")
+            return []
+        if self.breakers["embed"].rejecting():
+            return []
+            
         try:
-            response = self._call_ai(prompt)
+            # Using the new text-embedding-004 model
+            with self.breakers["embed"].guard(), metrics.upstream_call("embed"):
+                result = _genai().embed_content(
+                    model=self.embedding_model,
+                    content=text,
+                    task_type="retrieval_document",
+                    title="Job Description",
+                    request_options={"timeout": self.deadlines["embed"]}
+                )
+            return result['embedding']
+        except CircuitOpenError:
+            return []
+        except Exception as e:
+            logger.error(f"Embedding generation failed: {e}")
+            return []
+
+    def embed_batch(self, texts: list[str]) -> list[list[float]]:
+        """
+        Embeds several documents in one request. Unlike get_embedding(), errors are raised
+        so the caller (EmbeddingBuilder) can back off and retry.
+        """
+        if not self.is_configured:
+            raise RuntimeError("Gemini Service not configured.")
+
+        with self.breakers["embed"].guard(), metrics.upstream_call("embed"):
+            result = _genai().embed_content(
+                model=self.embedding_model,
+                content=list(texts),
+                task_type="retrieval_document",
+                title="Job Description",
+                request_options={"timeout": self.call_timeout}
+            )
+        return result['embedding']
+
+    def get_query_embedding(self, text: str) -> list[float]:
+        """
+        get_embedding() behind the query embedding cache.
+        Failed (empty) embeddings are not cached.
+        """
+        cached = self.query_cache.get(text)
+        if cached is not None:
+            return cached.tolist()
+
+        key = ("embed", self.query_cache.normalize(text))
+        embedding = self.flights.do(key, self.get_embedding, text)
+        if embedding:
+            self.query_cache.put(text, embedding)
+        return embedding
+
+    def get_query_embeddings(self, texts: list[str], batch_size: int = 100) -> list[list[float]]:
+        """
+        Batched get_query_embedding() for offline jobs: cache hits are served locally and
+        the distinct misses are embedded `batch_size` per request. Failed rows are empty.
+        """
+        results = [[] for _ in texts]
+        missing = {} # normalized text -> positions in `texts`
+        for i, text in enumerate(texts):
+            cached = self.query_cache.get(text)
+            if cached is not None:
+                results[i] = cached.tolist()
+            else:
+                missing.setdefault(self.query_cache.normalize(text), []).append(i)
+
+        pending = list(missing.values())
+        for start in range(0, len(pending), batch_size):
+            chunk = pending[start:start + batch_size]
+            try:
+                embeddings = self.embed_batch([texts[positions[0]] for positions in chunk])
+            except Exception as e:
+                logger.error(f"Batch embedding generation failed: {e}")
+                continue
+            for positions, embedding in zip(chunk, embeddings):
+                self.query_cache.put(texts[positions[0]], embedding)
+                for i in positions:
+                    results[i] = embedding
+        return results
+
+    # --- Async variants (used by the async FastAPI endpoints) ---
+
+    async def generate_roadmap_async(self, role: str, level: str) -> str:
+        if not self.is_configured or not self.model:
+            return self._static_roadmap(role, level)
+
+        key = self._roadmap_key(role, level)
+        cached = await asyncio.to_thread(self.roadmap_cache.get, *key)
+        if cached is not None:
+            return cached
+        if self.roadmap_cache.recently_failed(*key) or self.breakers["generate"].rejecting():
+            return self._static_roadmap(role, level)
+
+        return await self.flights.do_async(
+            ("roadmap", self.roadmap_cache.make_key(*key)), self._generate_roadmap_live_async, role, level
+        )
+
+    async def _generate_roadmap_live_async(self, role: str, level: str) -> str:
+        key = self._roadmap_key(role, level)
+        try:
+            response = await self._call_ai_async(self._roadmap_prompt(role, level), deadline=self._deadline("generate"))
+            await asyncio.to_thread(self.roadmap_cache.put, *key, response.text)
             return response.text
+        except CircuitOpenError:
+            return self._static_roadmap(role, level)
         except Exception as e:
             logger.error(f"AI Generation failed: {e}")
-            return get_static_roadmap()
+            self.roadmap_cache.mark_failed(*key)
+            return self._static_roadmap(role, level)
 
-    def expand_domain(self, domain_interest: str) -> list[str]:
+    async def stream_roadmap_async(self, role: str, level: str, onet_code: str = "00-0000"):
         """
-        Uses AI to find diverse job titles related to a study domain.
-        Example: "Data Science" -> ["Data Scientist", "Machine Learning Engineer", "Data Analyst"]
+        Async generator of Markdown chunks for a roadmap, relayed from the model's
+        streaming generation as they arrive. Stored and cached roadmaps are sent in one chunk.
+        If the model is unavailable before the first chunk, the static roadmap is
+        streamed line by line instead. Complete AI output is stored in the roadmap cache.
+        Identical concurrent requests share one model stream.
         """
-        if not self.is_configured or not self.model or not domain_interest:
-            return []
-            
-        prompt = f"""
-        List 5 distinct, professional job titles for a student specializing in '{domain_interest}'.
-        Return ONLY a comma-separated list of titles. No numbering or extra text.
+        stored = await self.stored_roadmap_async(role, level)
+        if stored is not None:
+            yield RoadmapStore.decode(stored[1])
+            return
+
+        key = self._roadmap_key(role, level)
+        if self.is_configured and self.model:
+            cached = await asyncio.to_thread(self.roadmap_cache.get, *key)
+            if cached is not None:
+                yield cached
+                return
+
+        if (self.is_configured and self.model and not self.roadmap_cache.recently_failed(*key)
+                and not self.breakers["generate"].rejecting()):
+            relayed = 0
+            try:
+                async for chunk in self.flights.stream_async(
+                        ("roadmap", self.roadmap_cache.make_key(*key)), self._stream_roadmap_live, role, level):
+                    relayed += 1
+                    yield chunk
+                return
+            except Exception:
+                if relayed:
+                    raise # Partial output was already sent; let the caller report the error
+                # Circuit opened or the model failed before its first chunk: static roadmap below
+
+        logger.info("Streaming static roadmap fallback.")
+        for line in RoadmapGenerator.generate(onet_code, role, level).splitlines(keepends=True):
+            yield line
+
+    async def _stream_roadmap_live(self, emit, role: str, level: str):
         """
+        Passes each chunk of the model's streaming generation to `emit`. Runs as
+        the SingleFlight producer task, which never waits for a client, so the
+        concurrency slot and a half-open probe are released as soon as the model
+        is done. Every chunk must arrive within the generate deadline.
+        """
+        key = self._roadmap_key(role, level)
+        deadline = self._deadline("generate")
+        parts = []
+        try:
+            with self.breakers["generate"].guard(), metrics.upstream_call("generate_stream"):
+                async with self._semaphore():
+                    response = await asyncio.wait_for(
+                        self.model.generate_content_async(
+                            self._roadmap_prompt(role, level),
+                            safety_settings=SAFETY_SETTINGS,
+                            stream=True,
+                            request_options={"timeout": self._attempt_timeout(deadline)}
+                        ),
+                        timeout=self._attempt_timeout(deadline)
+                    )
+                    chunks = response.__aiter__()
+                    while True:
+                        # A stalled stream times out instead of hanging on to the slot
+                        remaining = min(self.call_timeout, deadline - time.monotonic())
+                        try:
+                            chunk = await asyncio.wait_for(chunks.__anext__(), timeout=remaining)
+                        except StopAsyncIteration:
+                            break
+                        if chunk.text:
+                            parts.append(chunk.text)
+                            emit(chunk.text)
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            logger.error(f"AI streaming failed after {len(parts)} chunks: {e!r}")
+            self.roadmap_cache.mark_failed(*key)
+            raise
+        await asyncio.to_thread(self.roadmap_cache.put, *key, "".join(parts))
+
+    async def expand_domain_async(self, domain_interest: str) -> list[str]:
+        if not self.is_configured or not self.model or not domain_interest or self.breakers["generate"].rejecting():
+            return []
+
+        keywords = await self.flights.do_async(
+            self._domain_key(domain_interest), self._expand_domain_live_async, domain_interest
+        )
+        return list(keywords)
+
+    async def _expand_domain_live_async(self, domain_interest: str) -> list[str]:
         try:
-            response = self._call_ai(prompt)
-            text = response.text.replace('\n', '')
-            # Clean and split
-            keywords = [k.strip() for k in text.split(',') if k.strip()]
+            response = await self._call_ai_async(self._domain_prompt(domain_interest), deadline=self._deadline("generate"))
+            keywords = self._parse_titles(response.text)
             logger.info(f"AI Expanded '{domain_interest}' to: {keywords}")
             return keywords
+        except CircuitOpenError:
+            return []
         except Exception as e:
             logger.error(f"Domain expansion failed: {e}")
             return []
-    def get_embedding(self, text: str) -> list[float]:
-        """
-        Generates embeddings using the Gemini API.
-        """
+
+    async def get_embedding_async(self, text: str) -> list[float]:
         if not self.is_configured:
             logger.warning("Gemini Service not configured, returning empty embedding.")
             return []
-            
+        if self.breakers["embed"].rejecting():
+            return []
+
+        timeout = self.deadlines["embed"]
         try:
-            # Using the new text-embedding-004 model
-            result = genai.embed_content(
-                model="models/text-embedding-004",
-                content=text,
-                task_type="retrieval_document",
-                title="Job Description" 
-            )
+            with self.breakers["embed"].guard(), metrics.upstream_call("embed"):
+                result = await self._bounded(_genai().embed_content_async(
+                    model=self.embedding_model,
+                    content=text,
+                    task_type="retrieval_document",
+                    title="Job Description",
+                    request_options={"timeout": timeout}
+                ), timeout)
             return result['embedding']
+        except CircuitOpenError:
+            return []
         except Exception as e:
             logger.error(f"Embedding generation failed: {e}")
             return []
+
+    async def get_query_embedding_async(self, text: str) -> list[float]:
+        cached = self.query_cache.get(text)
+        if cached is not None:
+            return cached.tolist()
+
+        key = ("embed", self.query_cache.normalize(text))
+        embedding = await self.flights.do_async(key, self.get_embedding_async, text)
+        if embedding:
+            self.query_cache.put(text, embedding)
+        return embedding
+
+    async def embed_batch_async(self, texts: list[str]) -> list[list[float]]:
+        """
+        Embeds several texts in one request. Returns an empty embedding per text on failure.
+        """
+        if not self.is_configured:
+            logger.warning("Gemini Service not configured, returning empty embeddings.")
+            return [[] for _ in texts]
+        if self.breakers["embed"].rejecting():
+            return [[] for _ in texts]
+
+        timeout = self.deadlines["embed"]
+        try:
+            with self.breakers["embed"].guard(), metrics.upstream_call("embed"):
+                result = await self._bounded(_genai().embed_content_async(
+                    model=self.embedding_model,
+                    content=list(texts),
+                    task_type="retrieval_document",
+                    title="Job Description",
+                    request_options={"timeout": timeout}
+                ), timeout)
+            return result['embedding']
+        except CircuitOpenError:
+            return [[] for _ in texts]
+        except Exception as e:
+            logger.error(f"Batch embedding generation failed: {e}")
+            return [[] for _ in texts]
+
+    async def get_query_embeddings_async(self, texts: list[str]) -> list[list[float]]:
+        """
+        Batched get_query_embedding_async(): cache hits are served locally and the
+        distinct misses are embedded in a single request.
+        """
+        results = [[] for _ in texts]
+        missing = {} # normalized text -> positions in `texts`
+        for i, text in enumerate(texts):
+            cached = self.query_cache.get(text)
+            if cached is not None:
+                results[i] = cached.tolist()
+            else:
+                missing.setdefault(self.query_cache.normalize(text), []).append(i)
+
+        if len(missing) == 1:
+            # A lone miss can still coalesce with identical in-flight get_query_embedding_async() calls
+            key, positions = next(iter(missing.items()))
+            embeddings = [await self.flights.do_async(("embed", key), self.get_embedding_async, texts[positions[0]])]
+        elif missing:
+            embeddings = await self.embed_batch_async([texts[p[0]] for p in missing.values()])
+        else:
+            embeddings = []
+
+        for positions, embedding in zip(missing.values(), embeddings):
+            if len(embedding):
+                self.query_cache.put(texts[positions[0]], embedding)
+            for i in positions:
+                results[i] = embedding
+        return results
@@ -0,0 +1,32 @@
+# Multi-worker deployment: `WORKERS=4 python main.py` or `gunicorn -c gunicorn.conf.py main:app`
+#
+# The app is imported and the read-only state (occupation catalog, keyword
+# index) is built once in the master, then shared copy-on-write by the forked
+# workers. Each worker creates its own Gemini client after the fork and opens
+# the embedding cache as a memory map, so those pages are shared through the
+# page cache. If the cache must be built, one worker builds it under a file
+# lock while the others serve rule-based results and load it when done.
+import gc
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 8000)}"
+workers = int(os.environ.get("WORKERS", os.environ.get("WEB_CONCURRENCY", 2)))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = int(os.environ.get("WORKER_TIMEOUT", 120))
+graceful_timeout = 30
+keepalive = 5
+
+
+def when_ready(server):
+    # Runs in the master after the app is imported and before any worker is forked
+    import main
+    main.preload()
+    # Keep the garbage collector from touching (and so copying) the preloaded objects in workers
+    gc.freeze()
+    server.log.info(f"Preloaded {len(main.catalog)} jobs for {workers} workers.")
+
+
+def post_worker_init(worker):
+    from process_memory import process_memory
+    worker.log.info(f"Worker {worker.pid} memory after fork: {process_memory()}")
@@ -1,23 +1,87 @@
-import pandas as pd
 import re
+import os
+import time
+import asyncio
+import logging
+import threading
+
+import numpy as np
 
 from job_vector_store import JobVectorStore
+from keyword_index import KeywordIndex
+from rule_scores import FacetRuleScores
+from recommendation_table import RecommendationTable, LOOKUPS, DEFAULT_CACHE_PATH as TABLE_CACHE_PATH
+from file_lock import exclusive_lock
+from micro_batcher import MicroBatcher
+import metrics
+from occupation_catalog import OccupationCatalog
+
+logger = logging.getLogger(__name__)
+
+class ScoringConfig:
+    """
+    Weights of the hybrid score and the result filter:
+    score = semantic_weight * cosine + domain_weight * [domain keyword hit] + keyword_weight * #keyword hits.
+    """
+
+    def __init__(self, semantic_weight: float = 10.0, domain_weight: float = 3.0, keyword_weight: float = 0.5,
+                 min_score: float = 2.5, limit: int = 20):
+        self.semantic_weight = semantic_weight
+        self.domain_weight = domain_weight
+        self.keyword_weight = keyword_weight
+        self.min_score = min_score
+        self.limit = limit
+
+    @classmethod
+    def from_env(cls):
+        """
+        SCORE_SEMANTIC_WEIGHT, SCORE_DOMAIN_WEIGHT, SCORE_KEYWORD_WEIGHT, SCORE_MIN, RECOMMENDATION_LIMIT.
+        """
+        return cls(
+            semantic_weight=float(os.getenv("SCORE_SEMANTIC_WEIGHT", 10.0)),
+            domain_weight=float(os.getenv("SCORE_DOMAIN_WEIGHT", 3.0)),
+            keyword_weight=float(os.getenv("SCORE_KEYWORD_WEIGHT", 0.5)),
+            min_score=float(os.getenv("SCORE_MIN", 2.5)),
+            limit=int(os.getenv("RECOMMENDATION_LIMIT", 20))
+        )
 
 class JobMatcher:
-    def __init__(self, data: pd.DataFrame, gemini_service=None):
-        self.data = data
+    def __init__(self, catalog: OccupationCatalog, gemini_service=None, keyword_index: KeywordIndex = None):
+        self.catalog = catalog
         self.gemini_service = gemini_service
         self.mappings = self._initialize_mappings()
-        
-        # Precompute lower case titles for speed
-        self.data['title_lower'] = self.data['Title'].astype(str).str.lower()
-        self.data['desc_lower'] = self.data['Description'].astype(str).str.lower()
+        self.scoring = ScoringConfig.from_env()
+
+        # Keyword -> job bitmap over the fixed rule vocabulary (built once, or shared from a pre-fork master)
+        self.keyword_index = keyword_index if keyword_index is not None else self.build_keyword_index(catalog)
+        # Keyword hit counts per facet value (MBTI, RIASEC, goal, cognitive bucket), summed per request
+        self.facet_scores = FacetRuleScores.from_env(self.keyword_index, self.mappings, catalog.content_hash)
         
         # Initialize Vector Store (RAG)
         print("Initializing Semantic Vector Store...")
-        self.vector_store = JobVectorStore(data, gemini_service=gemini_service)
+        self.vector_store = JobVectorStore(catalog, gemini_service=gemini_service)
+
+        # Concurrent requests' query embeddings are fetched and scored together
+        self.search_batcher = MicroBatcher(
+            self._search_batch,
+            max_batch_size=int(os.getenv("QUERY_BATCH_SIZE", 32)),
+            max_wait=float(os.getenv("QUERY_BATCH_WAIT_MS", 5)) / 1000
+        )
+
+        # Seconds the pipeline waits for AI domain expansion before ranking without it
+        self.expansion_budget = float(os.getenv("EXPANSION_BUDGET_SECONDS", 2.5))
+
+        # Precomputed results for domain-free profiles, set by materialize_table() ("" keeps it in memory only)
+        self.table = None
+        self.table_path = os.getenv("RECOMMENDATION_TABLE_PATH", TABLE_CACHE_PATH) or None
+
+        # Precompute query embeddings for every domain-free profile in the background
+        if gemini_service is not None and gemini_service.is_configured and os.getenv("QUERY_CACHE_WARMUP", "1") != "0":
+            self.warmup_thread = threading.Thread(target=self.warm_query_cache, daemon=True)
+            self.warmup_thread.start()
 
-    def _initialize_mappings(self):
+    @staticmethod
+    def _initialize_mappings():
         # ... (Same as before, simplified for this snippet to focus on logic changes) ...
         return {
             "mbti": {
@@ -54,13 +118,46 @@ class JobMatcher:
                 "Money": ["chief", "executive", "manage", "finance", "invest", "bank", "surgeon", "lawyer", "corporate", "director"],
                 "Power": ["politic", "chief", "executive", "judge", "director", "officer", "manage", "admin", "lead"],
                 "Achievement": ["research", "scien", "professor", "engineer", "architect", "invent", "doctor", "specialist"]
+            },
+            "cognitive": {
+                "fast_reaction": ["pilot", "gamer", "emergency", "fire", "driver", "surgeon", "trade"],
+                "slow_reaction": ["research", "writer", "architect", "strategy", "analy", "planning"],
+                "high_number": ["backend", "data", "math", "cyber", "statistic", "physic"],
+                "mid_number": ["account", "finance", "code", "logistic"],
+                "high_verbal": ["law", "medic", "history", "linguist", "profess", "edit"],
+                "low_verbal": ["sport", "trade", "art", "perform"]
             }
         }
 
+    @classmethod
+    def build_keyword_index(cls, catalog: OccupationCatalog) -> KeywordIndex:
+        """
+        Pure data (no threads or clients), so a pre-fork master can build it once for all workers.
+        """
+        return KeywordIndex(catalog.search_text, cls._rule_vocabulary(cls._initialize_mappings()))
+
+    @staticmethod
+    def _rule_vocabulary(mappings: dict):
+        """
+        Every keyword the rule engine can target, apart from open-ended domain terms.
+        """
+        vocabulary = set()
+        for group in mappings.values():
+            for keywords in group.values():
+                vocabulary.update(keywords)
+        return vocabulary
+
     def _get_cognitive_keywords(self, scores: dict):
         keywords = []
+        for bucket in self._cognitive_buckets(scores):
+            keywords.extend(self.mappings['cognitive'][bucket])
+        return keywords
+
+    @staticmethod
+    def _cognitive_buckets(scores: dict) -> list[str]:
+        buckets = []
         if not scores:
-            return keywords
+            return buckets
             
         rt = scores.get("reaction_time", 300)
         nm = scores.get("number_memory", 5)
@@ -68,25 +165,218 @@ class JobMatcher:
 
         # Reaction Time logic
         if rt < 210:
-             keywords.extend(["pilot", "gamer", "emergency", "fire", "driver", "surgeon", "trade"])
+             buckets.append("fast_reaction")
         elif rt > 280:
-             keywords.extend(["research", "writer", "architect", "strategy", "analy", "planning"])
+             buckets.append("slow_reaction")
         
         # Number Memory Logic
         if nm >= 12:
-            keywords.extend(["backend", "data", "math", "cyber", "statistic", "physic"])
+            buckets.append("high_number")
         elif nm >= 8:
-            keywords.extend(["account", "finance", "code", "logistic"])
+            buckets.append("mid_number")
             
         # Verbal Memory Logic
         if vm > 60:
-            keywords.extend(["law", "medic", "history", "linguist", "profess", "edit"])
+            buckets.append("high_verbal")
         elif vm < 30:
-            keywords.extend(["sport", "trade", "art", "perform"])
+            buckets.append("low_verbal")
 
-        return keywords
+        return buckets
+
+    def _profile_facets(self, profile) -> list[tuple]:
+        """
+        The discrete (group, value) facets a profile's rule keywords come from.
+        """
+        facets = [
+            ("mbti", profile.mbti_code.upper()),
+            ("riasec", profile.riasec_code.upper()),
+            ("goals", profile.life_goal)
+        ]
+        facets += [("cognitive", bucket) for bucket in self._cognitive_buckets(profile.cognitive_scores)]
+        return facets
+
+    @staticmethod
+    def build_query_text(life_goal: str, mbti_code: str, riasec_code: str, domain_interest: str = None,
+                         ai_keywords: list = None) -> str:
+        """
+        The semantic search query for a profile.
+        """
+        query_text = f"{life_goal} career for {mbti_code} {riasec_code} person."
+        if domain_interest:
+            query_text += f" specializing in {domain_interest}."
+        if ai_keywords:
+             query_text += f" Interested in {', '.join(ai_keywords)}."
+        return query_text
+
+    def warm_query_cache(self, delay: float = 0.3):
+        """
+        Embeds the query of every domain-free profile (life goal x MBTI x RIASEC)
+        that is not cached yet, so most requests need no embedding call.
+        With several workers only one of them embeds; the others pick up its saved cache.
+        """
+        cache = self.gemini_service.query_cache
+        if not cache.path:
+            return self._warm_query_cache(delay)
+
+        with exclusive_lock(cache.path + ".lock", blocking=False) as owner:
+            if owner:
+                return self._warm_query_cache(delay)
+        with exclusive_lock(cache.path + ".lock"):
+            cache.load()
+        logger.info(f"Query cache warm-up done by another worker ({len(cache)} entries).")
+
+    def _warm_query_cache(self, delay: float):
+        cache = self.gemini_service.query_cache
+        queries = [
+            self.build_query_text(goal, mbti, riasec)
+            for goal in self.mappings['goals']
+            for mbti in self.mappings['mbti']
+            for riasec in self.mappings['riasec']
+        ]
+        missing = [q for q in queries if q not in cache]
+        logger.info(f"Query cache warm-up: {len(queries) - len(missing)}/{len(queries)} profiles already cached.")
+
+        for i, query in enumerate(missing):
+            if not self.gemini_service.get_query_embedding(query):
+                logger.warning("Query cache warm-up stopped: embedding call failed.")
+                break
+            if i % 50 == 0:
+                logger.info(f"Query cache warm-up: embedded {i + 1}/{len(missing)}...")
+            time.sleep(delay) # Stay well under the embedding rate limit
+
+        cache.save()
+        logger.info(f"Query cache warm-up finished ({len(cache)} entries).")
+
+    def materialize_table(self):
+        """
+        Loads or builds the recommendation table for domain-free profiles. Semantic
+        if the vector store is usable, else rule-based, matching what live scoring
+        would do. Returns the table, or None if it could not be built.
+        """
+        semantic = self._semantic_available()
+        try:
+            table = RecommendationTable.for_matcher(self, semantic, self.table_path)
+        except Exception as e:
+            logger.warning(f"Recommendation table unavailable, scoring every profile live: {e}")
+            return None
+        self.table = table
+        logger.info(f"Recommendation table ready: {len(table)} profiles, "
+                    f"{'semantic' if table.semantic else 'rule-based'}, {table.nbytes / 1024:.0f} KiB.")
+        return table
+
+    def _semantic_available(self) -> bool:
+        return (self.vector_store.is_ready and self.gemini_service is not None
+                and self.gemini_service.is_configured)
+
+    def _table_lookup(self, profile, ai_keywords) -> list:
+        """
+        Precomputed results for a domain-free profile, or None to score it live.
+        """
+        table = self.table
+        if table is None or ai_keywords or profile.domain_interest:
+            return None
+        # A rule-based table must not answer once semantic search is up (and vice versa)
+        results = table.lookup(profile, self._cognitive_buckets) if table.semantic == self._semantic_available() else None
+        LOOKUPS.inc(result="miss" if results is None else "hit")
+        return results
 
     def recommend(self, profile, ai_keywords: list = None):
+        results = self._table_lookup(profile, ai_keywords)
+        if results is not None:
+            return results
+
+        # 2. Semantic Search (RAG)
+        # Construct a rich query string
+        query_text = self.build_query_text(
+            profile.life_goal, profile.mbti_code, profile.riasec_code,
+            domain_interest=profile.domain_interest, ai_keywords=ai_keywords
+        )
+             
+        # Get semantic matches (Top 100 candidates)
+        if hasattr(self, 'vector_store'):
+            with metrics.span("semantic_search"):
+                semantic_results = self.vector_store.search(query_text, top_k=100)
+        else:
+            print("WARNING: Vector Store not initialized. Using fallback.")
+            semantic_results = []
+
+        with metrics.span("rank"):
+            return self._rank(profile, ai_keywords, semantic_results)
+
+    async def recommend_async(self, profile, ai_keywords: list = None, expand_domain: bool = False):
+        """
+        Staged async variant of recommend().
+
+        With `expand_domain`, AI domain expansion for Undergrad profiles runs concurrently with
+        the semantic search for the base profile query. The expanded keywords are then only used
+        to re-rank the candidates, and if they do not arrive within `expansion_budget` seconds
+        the ranking proceeds without them.
+        """
+        results = self._table_lookup(profile, ai_keywords)
+        if results is not None:
+            return results
+
+        start = time.monotonic()
+        expansion = None
+        if (expand_domain and not ai_keywords and self.gemini_service is not None
+                and profile.education_level == "Undergrad" and profile.domain_interest):
+            expansion = asyncio.ensure_future(self._expand_domain_async(profile.domain_interest))
+
+        try:
+            # Stage 1: Semantic Search (RAG) on the base profile query
+            query_text = self.build_query_text(
+                profile.life_goal, profile.mbti_code, profile.riasec_code,
+                domain_interest=profile.domain_interest, ai_keywords=ai_keywords
+            )
+            with metrics.span("semantic_search"):
+                semantic_results = await self._semantic_search_async(query_text)
+
+            # Stage 2: Domain expansion, bounded by what is left of the latency budget
+            if expansion is not None:
+                remaining = max(0.0, self.expansion_budget - (time.monotonic() - start))
+                try:
+                    # Only the part of the expansion not hidden behind the search adds latency
+                    with metrics.span("expand_domain_wait"):
+                        ai_keywords = await asyncio.wait_for(asyncio.shield(expansion), timeout=remaining)
+                except asyncio.TimeoutError:
+                    logger.warning(f"Domain expansion exceeded {self.expansion_budget}s budget; ranking without it.")
+                except Exception as e:
+                    logger.warning(f"Domain expansion failed, falling back: {e}")
+        finally:
+            if expansion is not None and not expansion.done():
+                expansion.cancel()
+
+        # Stage 3: Hybrid re-rank of the candidates with whatever keywords we have
+        with metrics.span("rank"):
+            return self._rank(profile, ai_keywords, semantic_results)
+
+    async def _expand_domain_async(self, domain_interest: str) -> list[str]:
+        with metrics.span("expand_domain"):
+            return await self.gemini_service.expand_domain_async(domain_interest)
+
+    async def _semantic_search_async(self, query_text: str) -> list[dict]:
+        if not self.vector_store.is_ready or self.gemini_service is None:
+            logger.warning("Vector Store NOT ready. Using rule-based fallback.")
+            return []
+
+        # A cached query embedding needs no API call, so it skips the batching window;
+        # only misses wait to share one embedding request (membership test first: a
+        # miss is counted once, by the batch)
+        cache = self.gemini_service.query_cache
+        cached = cache.get(query_text) if query_text in cache else None
+        if cached is not None:
+            with metrics.span("similarity"):
+                return self.vector_store.search_embeddings([cached], top_k=100)[0]
+        return await self.search_batcher.submit(query_text)
+
+    async def _search_batch(self, query_texts: list[str]) -> list[list[dict]]:
+        # One (batched) embedding request and one matrix multiply for the whole micro-batch
+        with metrics.span("query_embedding"):
+            embeddings = await self.gemini_service.get_query_embeddings_async(query_texts)
+        with metrics.span("similarity"):
+            return self.vector_store.search_embeddings(embeddings, top_k=100)
+
+    def _rank(self, profile, ai_keywords, semantic_results):
         # 1. Aggregate Rule-Based Keywords (Legacy Logic - kept for Boosting)
         target_keywords = set()
         match_reasons = {} # kw -> source
@@ -119,75 +409,76 @@ class JobMatcher:
             cog_kws = self._get_cognitive_keywords(profile.cognitive_scores)
             for k in cog_kws: target_keywords.add(k); match_reasons[k] = "Cognitive"
 
-        # 2. Semantic Search (RAG)
-        # Construct a rich query string
-        query_text = f"{profile.life_goal} career for {profile.mbti_code} {profile.riasec_code} person."
-        if profile.domain_interest:
-            query_text += f" specializing in {profile.domain_interest}."
-        if ai_keywords:
-             query_text += f" Interested in {', '.join(ai_keywords)}."
-             
-        # Get semantic matches (Top 100 candidates)
-        if hasattr(self, 'vector_store'):
-            semantic_results = self.vector_store.search(query_text, top_k=100)
+        # 3. Hybrid Scoring, vectorized over the candidate indices
+        cfg = self.scoring
+
+        # Rule scores for every job: a domain keyword lookup plus the cached facet vectors
+        # Domain Boost (Super Critical): one hit is enough for the boost
+        other_keywords = [kw for kw in match_reasons if kw not in domain_keywords]
+        rule_scores = (
+            cfg.domain_weight * self.keyword_index.any(domain_keywords)
+            + cfg.keyword_weight * self.facet_scores.count(self._profile_facets(profile), exclude=domain_keywords)
+        )
+
+        # Only the (distinct) semantic candidates are ranked; all jobs, with semantic score 0, in fallback
+        if semantic_results:
+            candidates = np.fromiter((res['index'] for res in semantic_results), dtype=np.int64,
+                                     count=len(semantic_results))
+            semantic_scores = np.fromiter((res['score'] for res in semantic_results), dtype=np.float64,
+                                          count=len(semantic_results))
         else:
-            print("WARNING: Vector Store not initialized. Using fallback.")
-            semantic_results = []
+            candidates = np.arange(len(self.catalog))
+            semantic_scores = np.zeros(len(candidates))
 
-        # 3. Hybrid Scoring
+        # Vector Score is 0.0 to 1.0 (usually ~0.3 to 0.7 for good matches), Rule Score 0.0 to 10.0+
+        hybrid_scores = semantic_scores * cfg.semantic_weight + rule_scores[candidates]
+
+        # Filter low quality matches
+        passing = np.flatnonzero(hybrid_scores >= cfg.min_score)
+        top = self._top_positions(hybrid_scores, passing, cfg.limit)
+
+        # Reasons and records are only built for the returned jobs
         final_results = []
-        
-        # Map indices to semantic scores
-        semantic_map = {res['index']: res['score'] for res in semantic_results}
-        
-        # Iterate only through candidates (or all if fallback)
-        candidates_indices = semantic_map.keys() if semantic_map else range(len(self.data))
-        
-        for idx in candidates_indices:
-            row = self.data.iloc[idx]
-            
-            # --- Rule Score Calculation ---
-            rule_score = 0
-            text_total = (str(row['Title']) + " " + str(row['Description'])).lower()
-            
-            matched_rules = []
-            
-            # Domain Boost (Super Critical)
-            for dk in domain_keywords:
-                if dk in text_total:
-                    rule_score += 3.0
-                    matched_rules.append(f"Major/Degree ({dk})")
-                    break # One hit is enough for boost
-            
-            # Other Keywords
-            for kw in target_keywords:
-                if kw not in domain_keywords and kw.lower() in text_total:
-                    rule_score += 0.5
-                    # Tracking source 
-                    src = match_reasons.get(kw, "Match")
-                    if f"{src}" not in str(matched_rules): # Simple dedup
-                        matched_rules.append(f"{src} ({kw})")
-
-            # --- Final Combination ---
-            # Vector Score is 0.0 to 1.0 (usually ~0.3 to 0.7 for good matches)
-            # Rule Score can be 0.0 to 10.0+
-            
-            semantic_score = semantic_map.get(idx, 0.0)
-            
-            # Normalization heuristic: Semantic * 10 + Rule Score
-            hybrid_score = (semantic_score * 10) + rule_score
-            
-            # Filter low quality matches
-            # Filter low quality matches
-            if hybrid_score < 2.5: continue
-            
-            final_results.append({
-                "onet_code": row['O*NET-SOC Code'],
-                "title": row['Title'],
-                "description": row['Description'],
-                "match_score": hybrid_score,
-                "reasoning": matched_rules[:3] if matched_rules else ["AI Semantic Match"]
-            })
-            
-        final_results.sort(key=lambda x: x['match_score'], reverse=True)
-        return final_results[:20]
+        for pos in top:
+            idx = int(candidates[pos])
+            matched_rules = self._matched_rules(idx, domain_keywords, other_keywords, match_reasons)
+
+            result = self.catalog.record(idx)
+            result["match_score"] = float(hybrid_scores[pos])
+            result["reasoning"] = matched_rules[:3] if matched_rules else ["AI Semantic Match"]
+            final_results.append(result)
+        return final_results
+
+    @staticmethod
+    def _top_positions(scores: np.ndarray, positions: np.ndarray, limit: int) -> np.ndarray:
+        """
+        The `limit` best of `positions` by score, best first. Ties keep candidate
+        order: argpartition finds the cut-off score, then only the rows at or above
+        it are stably sorted.
+        """
+        if len(positions) > limit:
+            kth = np.partition(scores[positions], len(positions) - limit)[len(positions) - limit]
+            positions = positions[scores[positions] >= kth]
+        return positions[np.argsort(-scores[positions], kind="stable")][:limit]
+
+    def _matched_rules(self, idx, domain_keywords, other_keywords, match_reasons):
+        """
+        Human readable reasons for a single job, read back from the keyword index.
+        """
+        matched_rules = []
+
+        for dk in domain_keywords:
+            if self.keyword_index.mask(dk)[idx]:
+                matched_rules.append(f"Major/Degree ({dk})")
+                break
+
+        seen_sources = set()
+        for kw in other_keywords:
+            if self.keyword_index.mask(kw)[idx]:
+                # Tracking source (one reason per source)
+                src = match_reasons.get(kw, "Match")
+                if src not in seen_sources:
+                    seen_sources.add(src)
+                    matched_rules.append(f"{src} ({kw})")
+
+        return matched_rules
@@ -1,20 +1,47 @@
-import pandas as pd
 import numpy as np
-import pickle
 import os
 # Lazy imports for heavy libraries
 import logging
 
+from embedding_file import EmbeddingFileError, matrix_digest, open_embeddings, write_embeddings
+from embedding_builder import EmbeddingBuilder, load_previous
+from file_lock import exclusive_lock
+from vector_index import ExactIndex, IVFIndex, IndexFileError, QuantizedIndex, l2_normalize
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(__file__), "job_embeddings.bin")
+
+# "auto" switches from exact search to IVF once the matrix has this many rows
+IVF_MIN_ROWS = 50000
+
 class JobVectorStore:
-    def __init__(self, jobs_df: pd.DataFrame, gemini_service, cache_path="job_embeddings.pkl"):
-        self.jobs_df = jobs_df
-        self.cache_path = cache_path
+    def __init__(self, catalog, gemini_service, cache_path=None):
+        self.catalog = catalog
+        # EMBEDDINGS_CACHE_PATH keeps test/benchmark runs away from the real cache
+        self.cache_path = cache_path or os.getenv("EMBEDDINGS_CACHE_PATH") or DEFAULT_CACHE_PATH
         self.gemini_service = gemini_service
         self.is_ready = False
+        self.status = "starting" # starting -> loading -> (building | waiting ->) ready | unavailable
+        self.progress = (0, len(catalog))
         self.embeddings = None
+        self.normalized = None # L2-normalized matrix used for scoring (the mapped file itself)
+        self.index = None # ExactIndex / IVFIndex / QuantizedIndex over `normalized`
+        self.embeddings_digest = None # identifies `normalized`; saved indexes are only reused for it
+        self.index_kind = os.getenv("VECTOR_INDEX", "auto").lower() # auto | exact | ivf
+        self.ivf_lists = int(os.getenv("IVF_NLISTS", 0)) or None
+        self.ivf_nprobe = int(os.getenv("IVF_NPROBE", 16))
+        # First pass over int8 codes, shortlist re-ranked from the mapped file (float32: plain GEMM)
+        self.storage = os.getenv("VECTOR_STORAGE", "float32").lower()
+        if self.storage == "float16":
+            # numpy scores float16 no faster than float32; a float16 *file* (build_embeddings.py --dtype) halves it on disk
+            logger.warning("VECTOR_STORAGE=float16 is not an in-memory option; using int8.")
+            self.storage = "int8"
+        self.rerank_factor = int(os.getenv("VECTOR_RERANK_FACTOR", 4))
+        self.texts = catalog.embedding_texts()
+        self.data_hash = catalog.content_hash
+        self.embedding_model = getattr(gemini_service, 'embedding_model', None)
         
         # Start background initialization
         import threading
@@ -27,87 +54,233 @@ class JobVectorStore:
         Runs in a background thread to load or compute embeddings.
         """
         logger.info("Background initialization of JobVectorStore started...")
+        self.status = "loading"
         
-        # 1. Try Load
-        if os.path.exists(self.cache_path):
-            try:
-                with open(self.cache_path, 'rb') as f:
-                    self.embeddings = pickle.load(f)
-                    self.is_ready = True
-                    logger.info("✅ Loaded cached embeddings. Vector Store is READY.")
-                    return
-            except Exception as e:
-                logger.warning(f"Failed to load cache: {e}")
+        # 1. Try Load (memory-mapped, validated against data + model)
+        if self._load_cache():
+            return
         
-        # 2. Compute if not loaded
+        # 2. Compute if not loaded (batched, rate limited, resumable)
+        if not getattr(self.gemini_service, 'is_configured', False):
+            logger.warning("Gemini Service not configured; Vector Store stays in rule-based fallback.")
+            self.status = "unavailable"
+            return
+
+        # Only one process (worker) builds the cache; the rest serve rule-based results meanwhile
+        lock_path = self.cache_path + ".lock"
+        with exclusive_lock(lock_path, blocking=False) as owner:
+            if owner:
+                self._build_embeddings()
+                return
+
+        logger.info("Another process is building the embedding cache; waiting for it (rule-based fallback meanwhile).")
+        self.status = "waiting"
+        with exclusive_lock(lock_path):
+            # The builder released the lock: it either wrote the cache or gave up/died
+            if not self._load_cache():
+                self._build_embeddings()
+
+    def _load_cache(self) -> bool:
+        if not os.path.exists(self.cache_path):
+            return False
+        try:
+            embeddings, header = open_embeddings(
+                self.cache_path,
+                model=self.embedding_model,
+                data_hash=self.data_hash,
+                rows=len(self.texts)
+            )
+        except EmbeddingFileError as e:
+            logger.warning(f"Ignoring stale embedding cache: {e}")
+            return False
+        except Exception as e:
+            logger.warning(f"Failed to load cache: {e}")
+            return False
+
+        if not header.get("normalized", False):
+            embeddings, header = self._normalize_cache(embeddings, header)
+        self._set_embeddings(embeddings, header.get("matrix_sha256"))
+        self.is_ready = True
+        self.status = "ready"
+        self.progress = (len(self.texts), len(self.texts))
+        logger.info(f"✅ Loaded cached embeddings {self.embeddings.shape} ({header['dtype']}). Vector Store is READY.")
+        return True
+
+    def _build_embeddings(self):
         logger.info("Computing embeddings via Gemini API (Background Process)...")
+        self.status = "building"
         
-        texts = (
-            "Title: " + self.jobs_df['Title'].astype(str) + 
-            "; Description: " + self.jobs_df['Description'].astype(str)
-        ).tolist()
-        
-        embeddings = []
-        import time
-        
-        for i, text in enumerate(texts):
-            if i % 10 == 0: logger.info(f"Embedded {i}/{len(texts)} jobs...")
+        builder = EmbeddingBuilder(
+            self.gemini_service,
+            max_workers=2, # Gentler rate limit for background task
+            requests_per_second=1.0,
+            checkpoint_path=self.cache_path + ".ckpt.npz",
+            on_progress=self._on_build_progress
+        )
+        embeddings = builder.build(self.texts, previous=load_previous(self.cache_path, self.embedding_model))
+        if not embeddings.size:
+            logger.error("Embedding build produced no vectors; staying in rule-based fallback.")
+            self.status = "unavailable"
+            return
             
+        embeddings = l2_normalize(embeddings)
+
+        # 3. Save (before the lock is released, so waiting workers find it) and serve
+        # the mapped file, whose pages are shared with them, rather than this copy
+        digest = None
+        if builder.stats["failed"]:
+            # A cache with zero rows under a valid data hash would never be re-embedded;
+            # the checkpoint keeps the finished rows, so the next start resumes from it
+            logger.warning(f"{builder.stats['failed']} jobs could not be embedded; serving the rest "
+                           "without saving the cache. The next start resumes from the checkpoint.")
+        else:
             try:
-                emb = self.gemini_service.get_embedding(text)
-                if emb:
-                    embeddings.append(emb)
-                else:
-                    embeddings.append([0.0] * 768)
+                write_embeddings(self.cache_path, embeddings, self.embedding_model, self.data_hash,
+                                 normalized=True, row_hashes=builder.row_hashes)
+                embeddings, header = open_embeddings(self.cache_path)
+                digest = header.get("matrix_sha256")
             except Exception as e:
-                logger.error(f"Error embedding job {i}: {e}")
-                embeddings.append([0.0] * 768)
-                
-            time.sleep(0.5) # Gentler rate limit for background task
-            
-        self.embeddings = np.array(embeddings)
+                logger.warning(f"Could not save cache: {e}")
+
+        self._set_embeddings(embeddings, digest)
         self.is_ready = True
-        logger.info("✅ Computed and stored embeddings. Vector Store is READY.")
-        
-        # 3. Save
+        self.status = "ready"
+        logger.info("✅ Computed embeddings. Vector Store is READY.")
+
+    def _on_build_progress(self, done: int, total: int):
+        self.progress = (done, total)
+        logger.info(f"Embedded {done}/{total} jobs...")
+
+    def _normalize_cache(self, embeddings, header: dict):
+        """
+        One-time upgrade of a cache written before rows were normalized at write
+        time: rewrites it normalized (same dtype and row hashes) and maps the new
+        file. Concurrent workers write identical files atomically, so this needs
+        no lock. If the file cannot be rewritten, this process scores a private copy.
+        Returns (embeddings, header).
+        """
+        logger.info("Embedding cache is not normalized; rewriting it once.")
+        normalized = l2_normalize(embeddings)
         try:
-            with open(self.cache_path, 'wb') as f:
-                pickle.dump(self.embeddings, f)
+            write_embeddings(self.cache_path, normalized, header["model"], header["data_hash"],
+                             dtype=header["dtype"], normalized=True, row_hashes=header.get("row_hashes"))
+            return open_embeddings(self.cache_path, model=self.embedding_model,
+                                   data_hash=self.data_hash, rows=len(self.texts))
         except Exception as e:
-            logger.warning(f"Could not save cache: {e}")
+            logger.warning(f"Could not rewrite the embedding cache ({e}); scoring a private normalized copy.")
+            return normalized, dict(header, dtype="float32", matrix_sha256=None)
+
+    def _set_embeddings(self, embeddings, digest: str = None):
+        """
+        `embeddings` is already L2-normalized (the file header records it) and is
+        scored as-is, float32 or float16, so a memory-mapped file's pages stay
+        shared between workers instead of each holding a private copy.
+        `digest` is the matrix digest from the file header; it is computed when
+        the header predates it or the matrix is a private copy.
+        """
+        self.embeddings = embeddings
+        self.normalized = embeddings
+        self.embeddings_digest = digest or matrix_digest(embeddings)
+        self.index = self._make_index()
+
+    def _make_index(self):
+        kind = self.index_kind
+        if kind == "auto":
+            kind = "ivf" if len(self.normalized) >= IVF_MIN_ROWS else "exact"
+        if kind == "ivf":
+            return self._load_or_build_index(
+                IVFIndex, self.cache_path + ".ivf.npz",
+                lambda: IVFIndex.build(self.normalized, n_lists=self.ivf_lists, nprobe=self.ivf_nprobe),
+                nprobe=self.ivf_nprobe
+            )
+        # numpy has no fast float16 GEMM: a float16 file is scanned through int8 codes
+        # and only the shortlist is read (and widened) from the mapping
+        if self.storage == "int8" or self.normalized.dtype != np.float32:
+            return self._load_or_build_index(
+                QuantizedIndex, self.cache_path + ".int8.npz",
+                lambda: QuantizedIndex.build(self.normalized, rerank_factor=self.rerank_factor),
+                rerank_factor=self.rerank_factor
+            )
+        return ExactIndex(self.normalized)
+
+    def _load_or_build_index(self, index_cls, index_path: str, build, **options):
+        """
+        Loads the index saved next to the embedding file if it was built from this
+        exact matrix (a rewritten file has another digest), else builds and saves it.
+        """
+        if os.path.exists(index_path):
+            try:
+                index = index_cls.load(index_path, self.normalized, data_hash=self.data_hash, model=self.embedding_model,
+                                       embeddings_digest=self.embeddings_digest, **options)
+                logger.info(f"Loaded {index.kind} index {index.params()}")
+                return index
+            except (IndexFileError, OSError, KeyError, ValueError) as e:
+                logger.warning(f"Rebuilding {index_cls.kind} index: {e}")
+
+        index = build()
+        logger.info(f"Built {index.kind} index {index.params()}")
+        try:
+            index.save(index_path, data_hash=self.data_hash, model=self.embedding_model,
+                       embeddings_digest=self.embeddings_digest)
+        except OSError as e:
+            logger.warning(f"Could not save {index.kind} index: {e}")
+        return index
 
     def search(self, query: str, top_k: int = 50) -> list[dict]:
         """
         Returns a list of dicts: {'index': int, 'score': float}
         """
-        if not self.is_ready or self.embeddings is None:
+        return self.search_many([query], top_k=top_k)[0]
+
+    def search_many(self, queries: list[str], top_k: int = 50) -> list[list[dict]]:
+        """
+        Embeds each query and scores all of them against the job matrix in one GEMM.
+        Returns one result list per query (empty if its embedding failed).
+        """
+        if not self.is_ready or self.normalized is None or self.gemini_service is None:
              logger.warning("Vector Store NOT ready. Returning empty results (Fallback).")
-             return []
-             
-        query_embedding = self.gemini_service.get_embedding(query)
-        if not query_embedding:
-            return []
-            
-        query_embedding = np.array([query_embedding])
-        
-        # Cosine Similarity
-        from sklearn.metrics.pairwise import cosine_similarity
-        
+             return [[] for _ in queries]
+
+        embeddings = [self.gemini_service.get_query_embedding(q) for q in queries]
+        return self.search_embeddings(embeddings, top_k=top_k)
+
+    def search_embeddings(self, embeddings, top_k: int = 50) -> list[list[dict]]:
+        """
+        search_by_vectors() for a batch that may contain failed (empty) embeddings;
+        those get an empty result. All valid rows are scored in one GEMM.
+        """
+        valid = [i for i, emb in enumerate(embeddings) if len(emb)]
+        results = [[] for _ in embeddings]
+        if not valid:
+            return results
+
+        matches = self.search_by_vectors([embeddings[i] for i in valid], top_k=top_k)
+        for i, match in zip(valid, matches):
+            results[i] = match
+        return results
+
+    def search_by_vectors(self, vectors, top_k: int = 50) -> list[list[dict]]:
+        """
+        Cosine top-k for a batch of query vectors (N x dim).
+        """
+        if not self.is_ready or self.normalized is None:
+             return [[] for _ in vectors]
+
+        queries = l2_normalize(np.atleast_2d(np.asarray(vectors, dtype=np.float32)))
+
         # Ensure dimensions match
-        if query_embedding.shape[1] != self.embeddings.shape[1]:
+        if queries.shape[1] != self.normalized.shape[1]:
              logger.error("Dimension mismatch between query and database!")
-             return []
+             return [[] for _ in range(len(queries))]
+
+        # Cosine similarity == dot product of normalized vectors
+        scores, indices = self.index.search(queries, top_k)
 
-        scores = cosine_similarity(query_embedding, self.embeddings)[0]
-        
-        # Get top K indices
-        top_indices = np.argsort(scores)[::-1][:top_k]
-        
         results = []
-        for idx in top_indices:
-            results.append({
-                "index": idx,
-                "score": float(scores[idx])
-            })
-            
+        for row_scores, row_indices in zip(scores, indices):
+            results.append([
+                {"index": int(idx), "score": float(score)}
+                for score, idx in zip(row_scores, row_indices)
+                if idx >= 0
+            ])
         return results
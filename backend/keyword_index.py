@@ -0,0 +1,68 @@
+import numpy as np
+
+
+class KeywordIndex:
+    """
+    Inverted index from keyword -> bitmap of jobs whose text contains it.
+
+    The fixed vocabulary (personality, aptitude, goal and cognitive keywords)
+    is matched once at construction time, so scoring a request is a handful of
+    boolean row lookups instead of a substring scan over every job.
+    Open-ended keywords (e.g. domain terms from the AI expansion) are matched
+    on demand and memoized in a small bounded table.
+    """
+
+    MAX_EXTRA_KEYWORDS = 512
+
+    def __init__(self, texts, vocabulary):
+        """
+        `texts` is the lowercased StringColumn to match against (OccupationCatalog.search_text).
+        """
+        self.texts = texts
+        self.size = len(texts)
+
+        keywords = sorted({str(kw).lower() for kw in vocabulary})
+        self.vocabulary = {kw: i for i, kw in enumerate(keywords)}
+        self.matrix = np.zeros((len(keywords), self.size), dtype=bool)
+        for kw, row in self.vocabulary.items():
+            self.matrix[row] = self._scan(kw)
+
+        self._extra = {}
+
+    def _scan(self, keyword: str) -> np.ndarray:
+        return self.texts.contains(keyword)
+
+    def mask(self, keyword: str) -> np.ndarray:
+        """
+        Boolean vector (one entry per job) marking jobs that contain `keyword`.
+        """
+        keyword = keyword.lower()
+        row = self.vocabulary.get(keyword)
+        if row is not None:
+            return self.matrix[row]
+
+        mask = self._extra.get(keyword)
+        if mask is None:
+            if len(self._extra) >= self.MAX_EXTRA_KEYWORDS:
+                self._extra.clear()
+            mask = self._scan(keyword)
+            self._extra[keyword] = mask
+        return mask
+
+    def count(self, keywords) -> np.ndarray:
+        """
+        Number of distinct `keywords` found in each job.
+        """
+        counts = np.zeros(self.size, dtype=np.int32)
+        for kw in dict.fromkeys(k.lower() for k in keywords):
+            counts += self.mask(kw)
+        return counts
+
+    def any(self, keywords) -> np.ndarray:
+        """
+        True for jobs that contain at least one of `keywords`.
+        """
+        hits = np.zeros(self.size, dtype=bool)
+        for kw in keywords:
+            hits |= self.mask(kw)
+        return hits
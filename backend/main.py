@@ -1,12 +1,17 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional
-import pandas as pd
 import json
 import os
 import re
+import time
 from dotenv import load_dotenv
 
+import metrics
+from roadmap_store import RoadmapStore, content_digest
+
 # Load env vars immediately
 load_dotenv(os.path.join(os.path.dirname(__file__), '.env'))
 
@@ -21,29 +26,71 @@ app.add_middleware(
     allow_credentials=False,
     allow_methods=["*"],  # Allows all methods
     allow_headers=["*"],  # Allows all headers
+    expose_headers=["ETag"],  # Lets browser clients revalidate roadmaps with If-None-Match
 )
 
+@app.middleware("http")
+async def time_requests(request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Route templates, not raw paths, keep the label set bounded
+        route = getattr(request.scope.get("route"), "path", "unmatched")
+        metrics.HTTP_SECONDS.observe(time.perf_counter() - start, method=request.method, route=route, status=status)
+
 # --- Data Loading ---
 DATA_PATH = os.path.join(os.path.dirname(__file__), "data", "Occupation Data.txt")
 
-# Global variable to hold dataframe
-jobs_df = None
+# Global, immutable occupation catalog
+catalog = None
 
 def load_data():
-    global jobs_df
+    global catalog
+    from occupation_catalog import OccupationCatalog
     try:
-        # Assuming tab-separated or compatible format based on file view
-        # The file viewed had "O*NET-SOC Code\tTitle\tDescription" 
-        jobs_df = pd.read_csv(DATA_PATH, sep="\t")
-        print(f"Loaded {len(jobs_df)} jobs.")
+        # Tab-separated: "O*NET-SOC Code\tTitle\tDescription"
+        catalog = OccupationCatalog.from_file(DATA_PATH)
+        print(f"Loaded {len(catalog)} jobs ({catalog.nbytes / 1024:.0f} KiB).")
     except Exception as e:
         print(f"Error loading data: {e}")
-        jobs_df = pd.DataFrame() # Fallback
+        catalog = OccupationCatalog.empty() # Fallback
+
+# Read-only state built once by a pre-fork master (see gunicorn.conf.py) and shared copy-on-write
+shared_keyword_index = None
+
+def preload():
+    """
+    Builds the pure-data state (catalog, keyword index) before workers fork.
+    Must not start threads or create API clients: neither survives a fork.
+    """
+    global shared_keyword_index
+    load_data()
+    if len(catalog):
+        from job_matcher import JobMatcher
+        shared_keyword_index = JobMatcher.build_keyword_index(catalog)
+
+def _ensure_catalog():
+    if catalog is None: # already there when preloaded by the master
+        load_data()
 
 @app.on_event("startup")
 async def startup_event():
+    global warmup
     print("--- Startup Event Triggered ---")
-    load_data()
+    if WARMUP_MODE == "off":
+        _ensure_catalog()
+        return
+
+    # Load data, select the model, build indexes and open the embedding cache in parallel
+    warmup = build_warmup().start()
+    if WARMUP_MODE == "blocking":
+        # Do not accept traffic until every required component is warm
+        ready = await run_in_threadpool(warmup.wait_required)
+        print(f"Warm-up {'complete' if ready else 'finished with failures'}: {warmup.summary()}")
 
 @app.get("/")
 def read_root():
@@ -58,11 +105,50 @@ def health_check():
         ai_status = True
         message = "System Fully Operational (AI Ready)."
         
-    return {
+    health = {
         "status": "healthy",
         "ai_ready": ai_status,
         "message": message
     }
+    from process_memory import process_memory
+    health["worker"] = process_memory()
+    if gemini_service is not None:
+        health["caches"] = {
+            "query_embeddings": gemini_service.query_cache.stats(),
+            "roadmaps": gemini_service.roadmap_cache.stats(),
+            "roadmap_store": gemini_service.roadmap_store.stats()
+        }
+        # Open circuits mean AI calls are being skipped in favour of the rule-based/static fallbacks
+        health["circuits"] = gemini_service.circuit_stats()
+    if job_matcher is not None:
+        health["query_batching"] = job_matcher.search_batcher.stats()
+    return health
+
+@app.get("/ready")
+def readiness_check(response: Response):
+    """
+    Readiness probe for the load balancer: 200 once every required warm-up
+    component is ready, 503 (with per-component progress) until then.
+    """
+    if warmup is None:
+        ready = catalog is not None and len(catalog) > 0
+        status = {"ready": ready, "components": {}}
+    else:
+        status = warmup.status()
+        ready = status["ready"]
+
+    status["mode"] = WARMUP_MODE
+    if not ready:
+        response.status_code = 503
+    return status
+
+@app.get("/metrics")
+def metrics_endpoint():
+    """
+    Prometheus scrape endpoint: per-stage and upstream latency histograms, retry
+    counts, cache hit rates, circuit states and vector store / embedding build state.
+    """
+    return Response(metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
 # --- Pydantic Models for Input ---
 
@@ -91,63 +177,281 @@ class RoadmapRequest(BaseModel):
 # --- Logic Implementation ---
 # Imports moved to lazy loading inside endpoints
 
-job_matcher = None # Lazy init to ensure data is loaded first
-gemini_service = None # Lazy init
+job_matcher = None # Built by warm-up, or lazily on first use
+gemini_service = None # Built by warm-up, or lazily on first use
 
-@app.post("/recommend", response_model=List[JobRecommendation])
-def recommend_jobs(profile: UserProfile):
-    global job_matcher, gemini_service
+# --- Warm-up ---
+# "background": warm up after startup while serving (default), "blocking": finish the
+# required components before accepting traffic, "off": build services lazily on first request
+WARMUP_MODE = os.getenv("WARMUP_MODE", "background").lower()
+warmup = None
+
+def _init_gemini_service():
+    global gemini_service
+    from gemini_service import GeminiService
+    gemini_service = GeminiService()
+
+def _init_job_matcher():
+    global job_matcher
+    if catalog is None or len(catalog) == 0:
+        raise RuntimeError("Job data not loaded")
+    from job_matcher import JobMatcher
+    job_matcher = JobMatcher(catalog, gemini_service=gemini_service, keyword_index=shared_keyword_index)
+
+def _wait_for_embeddings():
+    store = job_matcher.vector_store
+    store.init_thread.join()
+    if not store.is_ready:
+        raise RuntimeError(f"Vector store {store.status}")
+
+def _wait_for_query_cache():
+    thread = getattr(job_matcher, 'warmup_thread', None)
+    if thread is not None:
+        thread.join()
+
+def _materialize_recommendations():
+    # Built once the vector store settles, so the table matches what live scoring would return
+    job_matcher.vector_store.init_thread.join()
+    if job_matcher.materialize_table() is None:
+        raise RuntimeError("Recommendation table could not be built")
+
+def _embedding_progress():
+    if job_matcher is None:
+        return {}
+    done, total = job_matcher.vector_store.progress
+    return {"state": job_matcher.vector_store.status, "done": done, "total": total}
+
+def _query_cache_progress():
+    if gemini_service is None:
+        return {}
+    return {"entries": len(gemini_service.query_cache)}
+
+def build_warmup():
+    from warmup import Warmup
+    require_embeddings = os.getenv("WARMUP_REQUIRE_EMBEDDINGS", "0") == "1"
+    plan = (
+        Warmup()
+        .add("catalog", _ensure_catalog)
+        .add("ai_client", _init_gemini_service) # model selection (network)
+        .add("matcher", _init_job_matcher, deps=("catalog", "ai_client")) # keyword index, starts vector store
+        .add("embeddings", _wait_for_embeddings, deps=("matcher",), required=require_embeddings,
+             progress=_embedding_progress)
+        .add("query_cache", _wait_for_query_cache, deps=("matcher",), required=False,
+             progress=_query_cache_progress)
+    )
+    if os.getenv("RECOMMENDATION_TABLE", "1") != "0":
+        plan.add("recommendation_table", _materialize_recommendations, deps=("matcher",), required=False)
+    return plan
+
+# --- Metrics read at scrape time ---
+
+def _cache_stats() -> dict:
+    if gemini_service is None:
+        return {}
+    return {"query_embeddings": gemini_service.query_cache.stats(), "roadmaps": gemini_service.roadmap_cache.stats(),
+            "roadmap_store": gemini_service.roadmap_store.stats()}
+
+def _per_cache(field: str):
+    return lambda: {(name,): stats.get(field) for name, stats in _cache_stats().items()}
+
+def _circuits(field: str):
+    if gemini_service is None:
+        return {}
+    return {(name,): stats[field] for name, stats in gemini_service.circuit_stats().items()}
+
+def _circuit_states():
+    if gemini_service is None:
+        return {}
+    return {
+        (name, state): int(stats["state"] == state)
+        for name, stats in gemini_service.circuit_stats().items()
+        for state in ("closed", "open", "half_open")
+    }
+
+def _vector_store(attr: str):
+    def read():
+        if job_matcher is None:
+            return None
+        store = job_matcher.vector_store
+        done, total = store.progress
+        return {"ready": int(store.is_ready), "done": done, "total": total,
+                "ratio": done / total if total else 0.0}[attr]
+    return read
+
+def _query_batching(field: str):
+    return lambda: job_matcher.search_batcher.stats()[field] if job_matcher is not None else None
+
+for _field, _kind, _help in (
+    ("hits", "counter", "Cache lookups served from the cache."),
+    ("misses", "counter", "Cache lookups that missed."),
+    ("hit_rate", "gauge", "Share of cache lookups served from the cache."),
+    ("entries", "gauge", "Entries held by the cache.")
+):
+    _name = f"careernexus_cache_{_field}" + ("_total" if _kind == "counter" else "")
+    metrics.REGISTRY.callback(_name, _help, _per_cache(_field), kind=_kind, labelnames=("cache",))
+
+metrics.REGISTRY.callback("careernexus_circuit_state", "1 for the current state of each Gemini circuit breaker.",
+                          _circuit_states, labelnames=("operation", "state"))
+metrics.REGISTRY.callback("careernexus_circuit_opened_total", "Times each circuit has opened.",
+                          lambda: _circuits("opened"), kind="counter", labelnames=("operation",))
+metrics.REGISTRY.callback("careernexus_circuit_rejected_total", "Calls short-circuited by an open circuit.",
+                          lambda: _circuits("rejected"), kind="counter", labelnames=("operation",))
+metrics.REGISTRY.callback("careernexus_vector_store_ready", "1 once job embeddings are loaded and searchable.",
+                          _vector_store("ready"))
+metrics.REGISTRY.callback("careernexus_embedding_build_rows_done", "Job embeddings built or loaded so far.",
+                          _vector_store("done"))
+metrics.REGISTRY.callback("careernexus_embedding_build_rows_total", "Job embeddings to build.",
+                          _vector_store("total"))
+metrics.REGISTRY.callback("careernexus_embedding_build_progress_ratio", "Share of job embeddings built.",
+                          _vector_store("ratio"))
+metrics.REGISTRY.callback("careernexus_query_batches_total", "Micro-batches of semantic searches run.",
+                          _query_batching("batches"), kind="counter")
+metrics.REGISTRY.callback("careernexus_query_batch_items_total", "Semantic searches run in micro-batches.",
+                          _query_batching("items"), kind="counter")
+
+async def _wait_for_component(name: str):
+    # Requests that arrive during warm-up wait for it instead of building duplicates
+    if warmup is not None:
+        await run_in_threadpool(warmup.wait_for, name)
+
+async def get_gemini_service():
+    # Construction lists models over the network, so keep it off the event loop
+    global gemini_service
+    await _wait_for_component("ai_client")
     if gemini_service is None:
         from gemini_service import GeminiService
-        gemini_service = GeminiService()
-        
-    if jobs_df is None or jobs_df.empty:
-         raise HTTPException(status_code=500, detail="Job data not loaded")
-    
+        service = await run_in_threadpool(GeminiService)
+        if gemini_service is None:
+            gemini_service = service
+    return gemini_service
+
+async def get_job_matcher():
+    global job_matcher
+    service = await get_gemini_service()
+    await _wait_for_component("matcher")
     if job_matcher is None:
         from job_matcher import JobMatcher
-        job_matcher = JobMatcher(jobs_df, gemini_service=gemini_service)
+        matcher = await run_in_threadpool(JobMatcher, catalog, gemini_service=service,
+                                          keyword_index=shared_keyword_index)
+        if job_matcher is None:
+            job_matcher = matcher
+    return job_matcher
+
+@app.post("/recommend", response_model=List[JobRecommendation])
+async def recommend_jobs(profile: UserProfile):
+    await _wait_for_component("catalog")
+    if catalog is None or len(catalog) == 0:
+         raise HTTPException(status_code=500, detail="Job data not loaded")
+
+    matcher = await get_job_matcher()
 
     print(f"Received Profile: {profile.life_goal} / {profile.mbti_code} / {profile.riasec_code}")
     
-    # --- AI Domain Expansion ---
-    ai_keywords = []
+    # AI Domain Expansion runs concurrently with the semantic search inside the pipeline
     if profile.education_level == "Undergrad" and profile.domain_interest:
         print(f"Expanding domain: {profile.domain_interest}")
-        try:
-            ai_keywords = gemini_service.expand_domain(profile.domain_interest)
-        except Exception as e:
-            print(f"Domain expansion failed, falling back: {e}")
             
-    results = job_matcher.recommend(profile, ai_keywords=ai_keywords)
+    results = await matcher.recommend_async(profile, expand_domain=True)
     return results
 
-@app.post("/roadmap")
-def get_roadmap(req: RoadmapRequest):
+def _not_modified(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    # If-None-Match uses weak comparison
+    return header.strip() == "*" or etag in (tag.strip().removeprefix("W/") for tag in header.split(","))
+
+def _roadmap_headers(digest: str) -> dict:
+    # Any cache may keep a roadmap but must revalidate it; unchanged ones come back as an empty 304
+    return {"ETag": f'"{digest}"', "Cache-Control": "public, no-cache"}
+
+async def _live_roadmap(service, onet_code: str, title: str, level: str) -> str:
     # Try Gemini first if configured
-    global gemini_service
-    if gemini_service is None:
-        from gemini_service import GeminiService
-        gemini_service = GeminiService()
+    if service.is_configured:
+        print(f"Generating AI Roadmap for {title}")
+        with metrics.span("roadmap"):
+            return await service.generate_roadmap_async(title, level)
+    print("Fallback to Static Roadmap")
+    from roadmap_generator import RoadmapGenerator
+    with metrics.span("roadmap_static"):
+        return RoadmapGenerator.generate(onet_code, title, level)
 
-    if gemini_service.is_configured:
-        print(f"Generating AI Roadmap for {req.title}")
-        roadmap = gemini_service.generate_roadmap(req.title, req.education_level)
+@app.get("/roadmap/{onet_code}")
+async def get_roadmap_by_code(onet_code: str, level: str, request: Request, response: Response):
+    """
+    Cacheable roadmap of a catalog occupation. Sent with its content digest as
+    ETag; a request whose If-None-Match still matches gets an empty 304.
+    """
+    await _wait_for_component("catalog")
+    i = catalog.get_index(onet_code) if catalog is not None else None
+    if i is None:
+        raise HTTPException(status_code=404, detail=f"Unknown occupation code {onet_code}")
+    title = str(catalog.titles[i])
+    service = await get_gemini_service()
+
+    # Pre-generated roadmaps are served as stored; a matching ETag skips even decompression
+    stored = await service.stored_roadmap_async(title, level)
+    if stored is not None:
+        digest, blob = stored
+        if _not_modified(request, f'"{digest}"'):
+            return Response(status_code=304, headers=_roadmap_headers(digest))
+        with metrics.span("roadmap_stored"):
+            roadmap = RoadmapStore.decode(blob)
     else:
-        print("Fallback to Static Roadmap")
-        from roadmap_generator import RoadmapGenerator
-        roadmap = RoadmapGenerator.generate(req.onet_code, req.title, req.education_level)
-        
+        roadmap = await _live_roadmap(service, onet_code, title, level)
+        digest = content_digest(roadmap)
+        if _not_modified(request, f'"{digest}"'):
+            return Response(status_code=304, headers=_roadmap_headers(digest))
+
+    response.headers.update(_roadmap_headers(digest))
     return {"roadmap": roadmap}
 
+@app.post("/roadmap")
+async def get_roadmap(req: RoadmapRequest):
+    """
+    Uncached variant for any title; clients that can should use GET /roadmap/{onet_code}.
+    """
+    service = await get_gemini_service()
+
+    stored = await service.stored_roadmap_async(req.title, req.education_level)
+    if stored is not None:
+        with metrics.span("roadmap_stored"):
+            return {"roadmap": RoadmapStore.decode(stored[1])}
+    return {"roadmap": await _live_roadmap(service, req.onet_code, req.title, req.education_level)}
+
+@app.post("/roadmap/stream")
+async def stream_roadmap(req: RoadmapRequest):
+    """
+    Server-Sent Events variant of /roadmap: `data: {"text": ...}` events as the
+    Markdown is generated, then `event: done` (or `event: error`).
+    """
+    service = await get_gemini_service()
+    print(f"Streaming Roadmap for {req.title}")
+
+    async def events():
+        try:
+            async for chunk in service.stream_roadmap_async(req.title, req.education_level, onet_code=req.onet_code):
+                yield f"data: {json.dumps({'text': chunk})}\n\n"
+            yield "event: done\ndata: {}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 if __name__ == "__main__":
+    import sys
     import uvicorn
     import os
-    
-    # Re-init service after loading env to catch key
-    # (Optional, but good for safety if run directly)
-    from gemini_service import GeminiService
-    gemini_service = GeminiService() 
-    
+
+    # WORKERS > 1: gunicorn with uvicorn workers forked from a preloaded master (gunicorn.conf.py)
+    if int(os.environ.get("WORKERS", 1)) > 1:
+        os.chdir(os.path.dirname(os.path.abspath(__file__)))
+        os.execvp(sys.executable, [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "main:app"])
+
+    # Services are built by the startup warm-up once the port is open, not here
     port = int(os.environ.get("PORT", 8000))
     uvicorn.run(app, host="0.0.0.0", port=port)
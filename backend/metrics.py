@@ -0,0 +1,231 @@
+import time
+import bisect
+import logging
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Seconds; spans range from sub-millisecond rule scoring to multi-second LLM calls
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, bool):
+        value = int(value)
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self):
+        """
+        Yields (sample name, labels dict, value).
+        """
+        return iter(())
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: tuple = ()):
+        super().__init__(name, help, labelnames)
+        self._values = {} # label values -> float
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = list(self._values.items())
+        for key, value in values:
+            yield self.name, dict(zip(self.labelnames, key)), value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {} # label values -> [per-bucket counts..., sum, count]
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        position = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            if position < len(self.buckets):
+                state[position] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def samples(self):
+        with self._lock:
+            values = [(key, list(state)) for key, state in self._values.items()]
+        for key, state in values:
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                yield f"{self.name}_bucket", dict(labels, le=_format_value(float(bound))), cumulative
+            yield f"{self.name}_bucket", dict(labels, le="+Inf"), state[-1]
+            yield f"{self.name}_sum", labels, state[-2]
+            yield f"{self.name}_count", labels, state[-1]
+
+
+class CallbackMetric(_Metric):
+    """
+    Counter or gauge whose values are read from `fn` at scrape time. `fn`
+    returns a number, or a dict of {label values tuple: number}; None skips it.
+    """
+
+    def __init__(self, name: str, help: str, fn, kind: str = "gauge", labelnames: tuple = ()):
+        super().__init__(name, help, labelnames)
+        self.fn = fn
+        self.kind = kind
+
+    def samples(self):
+        try:
+            values = self.fn()
+        except Exception as e:
+            logger.warning(f"Metric {self.name} failed: {e}")
+            return
+        if values is None:
+            return
+        if not isinstance(values, dict):
+            values = {(): values}
+        for key, value in values.items():
+            if value is not None:
+                yield self.name, dict(zip(self.labelnames, key)), value
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"Metric {metric.name} is already registered differently")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help: str, labelnames: tuple = ()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def callback(self, name: str, help: str, fn, kind: str = "gauge", labelnames: tuple = ()) -> CallbackMetric:
+        """
+        Registers (or replaces) a metric read from `fn` at scrape time.
+        """
+        metric = CallbackMetric(name, help, fn, kind, labelnames)
+        with self._lock:
+            self._metrics[name] = metric
+        return metric
+
+    def render(self) -> str:
+        """
+        All metrics in the Prometheus text exposition format (0.0.4).
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+# Values are per process: with WORKERS > 1, a scrape sees the worker that served it
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "careernexus_stage_seconds", "Time spent in each request pipeline stage.", ("stage", "outcome")
+)
+UPSTREAM_SECONDS = REGISTRY.histogram(
+    "careernexus_upstream_call_seconds", "Latency of each Gemini API attempt.", ("operation", "outcome")
+)
+UPSTREAM_RETRIES = REGISTRY.counter(
+    "careernexus_upstream_retries_total", "Gemini API retries scheduled after a retryable error.", ("operation",)
+)
+HTTP_SECONDS = REGISTRY.histogram(
+    "careernexus_http_request_seconds", "HTTP request latency until the response starts.", ("method", "route", "status")
+)
+
+
+@contextmanager
+def _timed(histogram: Histogram, **labels):
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        elapsed = time.perf_counter() - start
+        histogram.observe(elapsed, outcome=outcome, **labels)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"span {' '.join(f'{k}={v}' for k, v in labels.items())} outcome={outcome} "
+                         f"ms={elapsed * 1000:.2f}")
+
+
+def span(stage: str):
+    """
+    Times a pipeline stage into careernexus_stage_seconds{stage, outcome}.
+    A plain context manager, so it also works around awaits.
+    """
+    return _timed(STAGE_SECONDS, stage=stage)
+
+
+def upstream_call(operation: str):
+    """
+    Times one Gemini API attempt into careernexus_upstream_call_seconds{operation, outcome}.
+    """
+    return _timed(UPSTREAM_SECONDS, operation=operation)
+
+
+def count_retry(operation: str):
+    """
+    tenacity `before_sleep` hook counting retries of `operation`.
+    """
+    def before_sleep(retry_state):
+        UPSTREAM_RETRIES.inc(operation=operation)
+        logger.info(f"Retrying {operation} (attempt {retry_state.attempt_number + 1}) after: "
+                    f"{retry_state.outcome.exception()}")
+    return before_sleep
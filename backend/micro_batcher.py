@@ -0,0 +1,77 @@
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """
+    Collects items submitted by concurrent coroutines and processes them together.
+
+    A batch is flushed `max_wait` seconds after its first item arrives, or as
+    soon as it holds `max_batch_size` items. `process_batch(items)` is a
+    coroutine function returning one result per item; each caller gets its own
+    result back (or the batch's exception).
+    """
+
+    def __init__(self, process_batch, max_batch_size: int = 32, max_wait: float = 0.005):
+        self.process_batch = process_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait)
+        self._queues = {} # event loop -> [(item, future)] (futures are loop-bound)
+        self._timers = {} # event loop -> TimerHandle of the pending flush
+        self._tasks = set() # running batches, referenced until done
+        self.batches = 0
+        self.items = 0
+        self.largest_batch = 0
+
+    async def submit(self, item):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        queue = self._queues.setdefault(loop, [])
+        queue.append((item, future))
+
+        if len(queue) >= self.max_batch_size:
+            self._flush(loop)
+        elif len(queue) == 1:
+            self._timers[loop] = loop.call_later(self.max_wait, self._flush, loop)
+        return await future
+
+    def _flush(self, loop):
+        timer = self._timers.pop(loop, None)
+        if timer is not None:
+            timer.cancel()
+        batch = [(item, f) for item, f in self._queues.pop(loop, []) if not f.done()] # skip cancelled callers
+        if not batch:
+            return
+
+        self.batches += 1
+        self.items += len(batch)
+        self.largest_batch = max(self.largest_batch, len(batch))
+        task = loop.create_task(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch):
+        try:
+            results = await self.process_batch([item for item, _ in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"Batch of {len(batch)} produced {len(results)} results")
+        except Exception as e:
+            logger.error(f"Batch of {len(batch)} failed: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "largest_batch": self.largest_batch
+        }
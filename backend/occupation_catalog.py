@@ -0,0 +1,163 @@
+import csv
+import sys
+
+import numpy as np
+
+from embedding_file import dataset_hash
+
+
+class StringColumn:
+    """
+    Immutable column of strings stored as one UTF-8 buffer plus row offsets.
+
+    Holding a single bytes object (instead of ~1,000 str objects) keeps the
+    catalog compact and means forked workers never touch per-row refcounts, so
+    the pages stay shared copy-on-write.
+    """
+
+    SEPARATOR = b"\x00" # never part of a row, so substring matches cannot span rows
+
+    __slots__ = ("_buffer", "_offsets")
+
+    def __init__(self, values):
+        encoded = [str(v).encode("utf-8") for v in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(e) + 1 for e in encoded])
+        self._buffer = self.SEPARATOR.join(encoded) + self.SEPARATOR
+        self._offsets = offsets
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        if i < 0:
+            i += len(self)
+        start, end = self._offsets[i], self._offsets[i + 1] - 1
+        return self._buffer[start:end].decode("utf-8")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._buffer) + self._offsets.nbytes
+
+    def contains(self, substring: str) -> np.ndarray:
+        """
+        Boolean mask of rows containing `substring` (case-sensitive), found with
+        bytes.find over the whole buffer and at most one hit per row.
+        """
+        needle = substring.encode("utf-8")
+        mask = np.zeros(len(self), dtype=bool)
+        if not needle or self.SEPARATOR in needle:
+            return mask
+
+        pos = self._buffer.find(needle)
+        while pos != -1:
+            row = int(np.searchsorted(self._offsets, pos, side="right")) - 1
+            mask[row] = True
+            pos = self._buffer.find(needle, self._offsets[row + 1])
+        return mask
+
+
+class OccupationCatalog:
+    """
+    Immutable, columnar O*NET occupation table.
+
+    Codes are interned, titles/descriptions and their precomputed lowercased
+    search text live in compact StringColumns, major groups (the two-digit SOC
+    prefix) in an int8 array, and rows are addressable in O(1) by index or SOC code.
+    """
+
+    CODE_COLUMN = "O*NET-SOC Code"
+    TITLE_COLUMN = "Title"
+    DESCRIPTION_COLUMN = "Description"
+
+    def __init__(self, codes, titles, descriptions):
+        if not (len(codes) == len(titles) == len(descriptions)):
+            raise ValueError("Catalog columns must have the same length")
+
+        self.codes = tuple(sys.intern(str(c)) for c in codes)
+        self.titles = StringColumn(titles)
+        self.descriptions = StringColumn(descriptions)
+        # What the rule engine matches against (same as the former lowercased Title + " " + Description)
+        self.search_text = StringColumn(
+            f"{t} {d}".lower() for t, d in zip(titles, descriptions)
+        )
+        self.major_groups = np.array([self._major_group_number(c) for c in self.codes], dtype=np.int8)
+        self._code_index = {c: i for i, c in enumerate(self.codes)}
+        self._title_index = {}
+        for i, t in enumerate(titles):
+            self._title_index.setdefault(" ".join(str(t).lower().split()), i)
+        self.content_hash = dataset_hash(self.embedding_texts()) # identifies the data for caches built on it
+
+    @classmethod
+    def from_file(cls, path: str):
+        """
+        Loads the tab-separated `Occupation Data.txt` (O*NET-SOC Code, Title, Description).
+        """
+        codes, titles, descriptions = [], [], []
+        with open(path, newline="", encoding="utf-8") as f:
+            reader = csv.DictReader(f, delimiter="\t", quoting=csv.QUOTE_NONE)
+            for row in reader:
+                codes.append(row[cls.CODE_COLUMN])
+                titles.append(row[cls.TITLE_COLUMN])
+                descriptions.append(row[cls.DESCRIPTION_COLUMN])
+        return cls(codes, titles, descriptions)
+
+    @classmethod
+    def empty(cls):
+        return cls([], [], [])
+
+    def __len__(self):
+        return len(self.codes)
+
+    # --- Lookups ---
+
+    @staticmethod
+    def major_group(code: str) -> str:
+        """
+        Two-digit O*NET major group of a SOC code, e.g. "15" for 15-1252.00.
+        """
+        return code[:2] if code else "00"
+
+    @classmethod
+    def _major_group_number(cls, code: str) -> int:
+        prefix = cls.major_group(code)
+        return int(prefix) if prefix.isdigit() else 0
+
+    def index_of(self, code: str) -> int:
+        """
+        Row index of a SOC code. Raises KeyError if unknown.
+        """
+        return self._code_index[code]
+
+    def get_index(self, code: str, default=None):
+        return self._code_index.get(code, default)
+
+    def find_title(self, title: str):
+        """
+        Row index of an exact (case/whitespace-insensitive) title, or None.
+        """
+        return self._title_index.get(" ".join(str(title).lower().split()))
+
+    def record(self, i: int) -> dict:
+        return {
+            "onet_code": self.codes[i],
+            "title": self.titles[i],
+            "description": self.descriptions[i]
+        }
+
+    # --- Derived data ---
+
+    def embedding_texts(self) -> list[str]:
+        """
+        The exact text that is embedded for every job, in row order.
+        """
+        return [f"Title: {t}; Description: {d}" for t, d in zip(self.titles, self.descriptions)]
+
+    @property
+    def nbytes(self) -> int:
+        return (self.titles.nbytes + self.descriptions.nbytes + self.search_text.nbytes
+                + self.major_groups.nbytes)
@@ -0,0 +1,151 @@
+import os
+import sys
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from dotenv import load_dotenv
+
+# Setup Environment
+load_dotenv(os.path.join(os.path.dirname(__file__), '.env'))
+os.environ.setdefault("QUERY_CACHE_WARMUP", "0")
+
+sys.path.append(os.path.dirname(__file__))
+
+from circuit_breaker import CircuitOpenError
+from embedding_builder import TokenBucket
+from gemini_service import GeminiService, ROADMAP_PROMPT_VERSION
+from occupation_catalog import OccupationCatalog
+from roadmap_store import RoadmapStore
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), "data", "Occupation Data.txt")
+
+# The education levels RoadmapGenerator and the app distinguish
+LEVELS = ("10th", "12th", "Undergrad")
+
+# --- Planning ---
+
+def popularity_order(catalog: OccupationCatalog) -> list:
+    """
+    Catalog indices, most often recommended first: how many domain-free profiles
+    (the rule-based recommendation table) have each occupation in their top results.
+    Never-recommended occupations follow in catalog order.
+    """
+    from job_matcher import JobMatcher
+    from recommendation_table import RecommendationTable
+
+    matcher = JobMatcher(catalog)
+    table = RecommendationTable.build(matcher, semantic=False)
+    counts = np.bincount(table.indices[table.indices >= 0].astype(np.int64), minlength=len(catalog))
+    return [int(i) for i in np.argsort(-counts, kind="stable")]
+
+def plan(catalog: OccupationCatalog, store: RoadmapStore, model: str, levels: tuple, top: int = 0,
+         refresh_days: float = None, limit: int = 0) -> list:
+    """
+    (title, level) pairs to generate, most popular occupations first: missing
+    entries, plus (with `refresh_days`) entries older than that or made by another model.
+    """
+    order = popularity_order(catalog) if top else range(len(catalog))
+    if top:
+        order = order[:top]
+
+    existing = store.generated(ROADMAP_PROMPT_VERSION)
+    cutoff = time.time() - refresh_days * 86400 if refresh_days is not None else None
+    todo = []
+    for i in order:
+        for level in levels:
+            entry = existing.get(store.make_key(catalog.titles[i], level, ROADMAP_PROMPT_VERSION))
+            if entry is None or (cutoff is not None and (entry[1] < cutoff or entry[0] != model)):
+                todo.append((str(catalog.titles[i]), level))
+    return todo[:limit] if limit else todo
+
+# --- Generation ---
+
+def generate(service: GeminiService, store: RoadmapStore, todo: list, rate: float, workers: int) -> dict:
+    """
+    Generates and stores roadmaps at most `rate` requests/s. Stops early when the
+    generate circuit opens; everything stored so far is kept, so a rerun resumes.
+    """
+    bucket = TokenBucket(rate)
+    stop = threading.Event()
+    lock = threading.Lock()
+    counts = {"stored": 0, "failed": 0, "skipped": 0}
+
+    def run(task):
+        title, level = task
+        if stop.is_set():
+            outcome = "skipped"
+        else:
+            bucket.acquire()
+            try:
+                text = service.generate_roadmap_text(title, level)
+                store.put(title, level, ROADMAP_PROMPT_VERSION, service.model_name, text)
+                outcome = "stored"
+            except CircuitOpenError:
+                stop.set()
+                outcome = "skipped"
+            except Exception as e:
+                print(f"⚠️  {title} ({level}): {e}")
+                outcome = "failed"
+        with lock:
+            counts[outcome] += 1
+            done = counts["stored"] + counts["failed"]
+            if outcome != "skipped" and done % 25 == 0:
+                print(f"Processed {done}/{len(todo)}...")
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(run, todo))
+    if stop.is_set():
+        print("❌ Gemini circuit opened; stopped early. Rerun later to continue.")
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Pre-generate roadmaps into the content-addressed roadmap store served by /roadmap.")
+    parser.add_argument("--top", type=int, default=0,
+                        help="Only the N most often recommended occupations (default: all).")
+    parser.add_argument("--levels", nargs="+", choices=LEVELS, default=list(LEVELS))
+    parser.add_argument("--refresh-days", type=float,
+                        help="Also regenerate entries older than this or made by another model (scheduled refresh).")
+    parser.add_argument("--limit", type=int, default=0, help="Generate at most N roadmaps this run.")
+    parser.add_argument("--rate", type=float, default=0.5, help="Max generate requests per second.")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent generate requests.")
+    parser.add_argument("--prune", action="store_true", help="Delete stored bodies no entry points at any more.")
+    parser.add_argument("--dry-run", action="store_true", help="Only print what would be generated.")
+    args = parser.parse_args()
+
+    print("--- 🗺️  Pre-generating Roadmaps ---")
+    store = RoadmapStore.from_env()
+    if not store.path:
+        print("❌ Roadmap store disabled (ROADMAP_STORE_PATH).")
+        return 1
+
+    service = GeminiService()
+    if not service.is_configured and not args.dry_run:
+        print("❌ Gemini Service NOT configured. Check GEMINI_API_KEY.")
+        return 1
+
+    catalog = OccupationCatalog.from_file(DATA_PATH)
+    todo = plan(catalog, store, service.model_name, tuple(args.levels), top=args.top,
+                refresh_days=args.refresh_days, limit=args.limit)
+    print(f"{len(todo)} roadmaps to generate ({len(args.levels)} levels, "
+          f"{args.top or len(catalog)} occupations) -> {store.path}")
+
+    if todo and not args.dry_run:
+        start = time.time()
+        counts = generate(service, store, todo, args.rate, args.workers)
+        print(f"✅ Stored {counts['stored']}, failed {counts['failed']}, skipped {counts['skipped']} "
+              f"in {time.time() - start:.0f}s.")
+    if args.prune:
+        print(f"Pruned {store.prune()} unreferenced roadmaps.")
+
+    stats = store.stats()
+    if stats.get("raw_bytes"):
+        print(f"Store: {stats['entries']} entries, {stats['objects']} distinct roadmaps, "
+              f"{stats['stored_bytes'] / 1024:.0f} KiB compressed ({stats['raw_bytes'] / 1024:.0f} KiB raw).")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
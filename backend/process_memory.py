@@ -0,0 +1,42 @@
+import os
+
+SMAPS_ROLLUP = "/proc/self/smaps_rollup"
+
+# smaps_rollup field -> reported name
+_FIELDS = {
+    "Rss": "rss_mb", # resident, including pages shared with the master and other workers
+    "Pss": "pss_mb", # proportional share: sums to the real total across workers
+    "Shared_Clean": "shared_clean_mb",
+    "Shared_Dirty": "shared_dirty_mb",
+    "Private_Clean": "private_clean_mb",
+    "Private_Dirty": "private_dirty_mb", # memory this worker alone costs
+}
+
+
+def process_memory() -> dict:
+    """
+    Memory of the current process in MiB. On Linux this reads
+    /proc/self/smaps_rollup, which separates pages shared copy-on-write with
+    the pre-fork master from private ones; PSS is what to sum when sizing an
+    instance. Elsewhere only the peak RSS is available.
+    """
+    stats = {"pid": os.getpid()}
+    try:
+        with open(SMAPS_ROLLUP) as f:
+            for line in f:
+                parts = line.split()
+                name = parts[0].rstrip(":") if parts else ""
+                if name in _FIELDS:
+                    stats[_FIELDS[name]] = round(int(parts[1]) / 1024, 1) # kB -> MiB
+        return stats
+    except (OSError, ValueError, IndexError):
+        pass
+
+    try:
+        import resource
+    except ImportError: # Windows
+        return stats
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    stats["peak_rss_mb"] = round(peak / (1024 * 1024 if os.uname().sysname == "Darwin" else 1024), 1)
+    return stats
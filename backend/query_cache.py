@@ -0,0 +1,161 @@
+import os
+import threading
+import time
+import logging
+from collections import OrderedDict
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(__file__), "query_embeddings.npz")
+
+# Bumped when normalize() changes, so persisted entries under old keys are discarded
+KEY_VERSION = 2
+
+
+class QueryEmbeddingCache:
+    """
+    Bounded LRU + TTL cache of query embeddings, keyed on normalized query text.
+
+    Optionally persisted to an .npz file so a restarted process does not have
+    to re-embed the (small) space of profile queries.
+    """
+
+    def __init__(self, max_entries: int = 4096, ttl_seconds: float = 7 * 24 * 3600, path: str = None,
+                 model: str = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.path = path
+        self.model = model # persisted entries from another embedding model are discarded
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict() # key -> (created_at, np.ndarray)
+        self._lock = threading.Lock()
+        self._unsaved = 0
+
+        if self.path:
+            self.load()
+
+    @classmethod
+    def from_env(cls, model: str = None):
+        """
+        QUERY_CACHE_SIZE, QUERY_CACHE_TTL (seconds) and QUERY_CACHE_PATH
+        ("" disables on-disk persistence).
+        """
+        return cls(
+            max_entries=int(os.getenv("QUERY_CACHE_SIZE", 4096)),
+            ttl_seconds=float(os.getenv("QUERY_CACHE_TTL", 7 * 24 * 3600)),
+            path=os.getenv("QUERY_CACHE_PATH", DEFAULT_CACHE_PATH) or None,
+            model=model
+        )
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        # Whitespace only: the embedding model is case-sensitive, so "IT" and "it" are different queries
+        return " ".join(str(text).split())
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, text: str):
+        return self.get(text, count=False) is not None
+
+    def get(self, text: str, count: bool = True):
+        key = self.normalize(text)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry[0] > self.ttl_seconds:
+                del self._entries[key]
+                entry = None
+
+            if entry is None:
+                if count:
+                    self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            if count:
+                self.hits += 1
+            return entry[1]
+
+    def put(self, text: str, embedding):
+        if embedding is None or len(embedding) == 0:
+            return
+
+        key = self.normalize(text)
+        with self._lock:
+            self._entries[key] = (time.time(), np.asarray(embedding, dtype=np.float32))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._unsaved += 1
+            flush = self.path and self._unsaved >= 32
+
+        if flush:
+            self.save()
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                model = str(data["model"]) if "model" in data else None
+                key_version = int(data["key_version"]) if "key_version" in data else 1
+                keys, created, vectors = data["keys"], data["created_at"], data["vectors"]
+        except Exception as e:
+            logger.warning(f"Failed to load query embedding cache: {e}")
+            return
+
+        if self.model and model != self.model:
+            logger.info(f"Discarding query embedding cache built with {model}.")
+            return
+        if key_version != KEY_VERSION:
+            logger.info("Discarding query embedding cache with an older key format.")
+            return
+
+        now = time.time()
+        with self._lock:
+            for key, ts, vector in zip(keys.tolist(), created.tolist(), vectors):
+                if now - ts <= self.ttl_seconds:
+                    self._entries[key] = (ts, vector)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        logger.info(f"Loaded {len(self._entries)} cached query embeddings.")
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            entries = list(self._entries.items())
+            self._unsaved = 0
+        if not entries:
+            return
+
+        # Rows may differ in dimension only if the embedding model changed; keep the latest dimension
+        dim = len(entries[-1][1][1])
+        entries = [(k, v) for k, v in entries if len(v[1]) == dim]
+
+        tmp_path = f"{self.path}.tmp.{os.getpid()}"
+        try:
+            with open(tmp_path, "wb") as f:
+                np.savez(
+                    f,
+                    model=np.array(self.model or ""),
+                    key_version=np.array(KEY_VERSION),
+                    keys=np.array([k for k, _ in entries]),
+                    created_at=np.array([v[0] for _, v in entries], dtype=np.float64),
+                    vectors=np.stack([v[1] for _, v in entries])
+                )
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.warning(f"Could not save query embedding cache: {e}")
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / total) if total else 0.0
+        }
@@ -0,0 +1,273 @@
+import os
+import sys
+import json
+import types
+import hashlib
+import logging
+
+import numpy as np
+
+from file_lock import exclusive_lock
+import metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(__file__), "recommendation_table.npz")
+
+# Bump when the table layout or the meaning of a key changes
+FORMAT_VERSION = 1
+
+# Cognitive buckets per axis, in the order JobMatcher._cognitive_buckets emits them
+BUCKET_AXES = (
+    ("fast_reaction", "slow_reaction"),
+    ("high_number", "mid_number"),
+    ("high_verbal", "low_verbal")
+)
+# Scores that land in (no bucket, first bucket, second bucket) of each axis
+REPRESENTATIVE_SCORES = (
+    ("reaction_time", (250, 200, 300)),
+    ("number_memory", (5, 12, 8)),
+    ("verbal_memory", (45, 70, 20))
+)
+BUCKET_CODES = 3 ** len(BUCKET_AXES)
+
+LOOKUPS = metrics.REGISTRY.counter(
+    "careernexus_recommendation_table_lookups_total",
+    "Recommendations served from the materialized table (hit) or scored live (miss).", ("result",)
+)
+
+
+def bucket_code(buckets: list) -> int:
+    code = 0
+    for axis, values in enumerate(BUCKET_AXES):
+        position = next((i + 1 for i, value in enumerate(values) if value in buckets), 0)
+        code += position * 3 ** axis
+    return code
+
+
+def representative_scores(code: int) -> dict:
+    return {name: values[(code // 3 ** axis) % 3] for axis, (name, values) in enumerate(REPRESENTATIVE_SCORES)}
+
+
+class RecommendationTable:
+    """
+    Precomputed top results of JobMatcher for every domain-free profile: no
+    domain interest and no AI keywords, so the ranking depends only on life
+    goal x MBTI x RIASEC x cognitive buckets (a few thousand rows).
+
+    Each row holds catalog indices, scores and reason ids (into a small string
+    table) of up to `limit` results; a lookup is an index computation plus
+    `limit` catalog reads. The fingerprint covers the mappings and occupation
+    data, the scoring weights and, for a semantic table, the job embeddings,
+    embedding model and index, so any change rebuilds the table.
+    """
+
+    def __init__(self, catalog, axes: dict, indices: np.ndarray, scores: np.ndarray, reasons: np.ndarray,
+                 reason_strings: list, semantic: bool, fingerprint: str):
+        self.catalog = catalog
+        self.axes = axes # "goals"/"mbti"/"riasec" -> ordered values
+        self._positions = {name: {value: i for i, value in enumerate(values)} for name, values in axes.items()}
+        self.indices = indices
+        self.scores = scores
+        self.reasons = reasons
+        self.reason_strings = list(reason_strings)
+        self.semantic = semantic
+        self.fingerprint = fingerprint
+
+    def __len__(self):
+        return len(self.indices)
+
+    @property
+    def nbytes(self) -> int:
+        return self.indices.nbytes + self.scores.nbytes + self.reasons.nbytes
+
+    # --- Keys ---
+
+    @staticmethod
+    def axes_for(mappings: dict) -> dict:
+        return {name: list(mappings[name]) for name in ("goals", "mbti", "riasec")}
+
+    def row(self, profile, cognitive_buckets) -> int:
+        """
+        Table row for a domain-free profile, or None if it is not covered
+        (unknown codes, or codes not in canonical form).
+        """
+        goal = self._positions["goals"].get(profile.life_goal)
+        mbti = self._positions["mbti"].get(profile.mbti_code)
+        riasec = self._positions["riasec"].get(profile.riasec_code)
+        if goal is None or mbti is None or riasec is None:
+            return None
+        try:
+            code = bucket_code(cognitive_buckets(profile.cognitive_scores))
+        except (TypeError, AttributeError):
+            return None # Unusable scores; live scoring reports the error
+        return ((goal * len(self.axes["mbti"]) + mbti) * len(self.axes["riasec"]) + riasec) * BUCKET_CODES + code
+
+    def lookup(self, profile, cognitive_buckets) -> list:
+        row = self.row(profile, cognitive_buckets)
+        if row is None:
+            return None
+        results = []
+        for idx, score, reason_ids in zip(self.indices[row], self.scores[row], self.reasons[row]):
+            if idx < 0:
+                break
+            result = self.catalog.record(int(idx))
+            result["match_score"] = float(score)
+            result["reasoning"] = [self.reason_strings[r] for r in reason_ids if r >= 0]
+            results.append(result)
+        return results
+
+    # --- Build ---
+
+    @staticmethod
+    def make_fingerprint(matcher, semantic: bool) -> str:
+        payload = {
+            "version": FORMAT_VERSION,
+            "rules": matcher.facet_scores.fingerprint, # mappings + occupation data
+            "scoring": vars(matcher.scoring),
+            "semantic": None
+        }
+        if semantic:
+            store = matcher.vector_store
+            payload["semantic"] = {
+                "model": store.embedding_model,
+                "embeddings": store.embeddings_digest,
+                "index": store.index.params()
+            }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    @classmethod
+    def build(cls, matcher, semantic: bool):
+        """
+        Ranks every domain-free profile with matcher._rank. For a semantic table the
+        profile queries are embedded in batches and searched in one matrix multiply.
+        """
+        axes = cls.axes_for(matcher.mappings)
+        limit = matcher.scoring.limit
+        combos = [(g, m, r) for g in axes["goals"] for m in axes["mbti"] for r in axes["riasec"]]
+
+        if semantic:
+            queries = [matcher.build_query_text(g, m, r) for g, m, r in combos]
+            embeddings = matcher.gemini_service.get_query_embeddings(queries)
+            if any(not len(e) for e in embeddings):
+                raise RuntimeError("query embeddings unavailable")
+            semantic_results = matcher.vector_store.search_embeddings(embeddings, top_k=100)
+        else:
+            semantic_results = [[] for _ in combos]
+
+        bucket_profiles = []
+        for code in range(BUCKET_CODES):
+            scores = representative_scores(code)
+            if bucket_code(matcher._cognitive_buckets(scores)) != code:
+                raise RuntimeError("cognitive bucket thresholds changed; update REPRESENTATIVE_SCORES")
+            bucket_profiles.append(scores)
+
+        rows = len(combos) * BUCKET_CODES
+        index_dtype = np.int16 if len(matcher.catalog) < np.iinfo(np.int16).max else np.int32
+        indices = np.full((rows, limit), -1, dtype=index_dtype)
+        scores = np.zeros((rows, limit), dtype=np.float64) # exactly the live scores
+        reasons = np.full((rows, limit, 3), -1, dtype=np.int16)
+        reason_ids = {}
+
+        row = 0
+        for (goal, mbti, riasec), semantic_result in zip(combos, semantic_results):
+            for cognitive in bucket_profiles:
+                profile = types.SimpleNamespace(
+                    life_goal=goal, mbti_code=mbti, riasec_code=riasec, education_level="12th",
+                    domain_interest=None, cognitive_scores=cognitive
+                )
+                for j, result in enumerate(matcher._rank(profile, None, semantic_result)):
+                    indices[row, j] = matcher.catalog.index_of(result["onet_code"])
+                    scores[row, j] = result["match_score"]
+                    for k, reason in enumerate(result["reasoning"][:3]):
+                        reasons[row, j, k] = reason_ids.setdefault(reason, len(reason_ids))
+                row += 1
+
+        return cls(matcher.catalog, axes, indices, scores, reasons, list(reason_ids), semantic,
+                   cls.make_fingerprint(matcher, semantic))
+
+    # --- Persistence ---
+
+    @classmethod
+    def for_matcher(cls, matcher, semantic: bool, path: str = None):
+        """
+        The table from `path` if its fingerprint still matches, else a freshly built
+        (and saved) one. With several workers only one builds; the others wait and load it.
+        """
+        if not path:
+            return cls.build(matcher, semantic)
+
+        fingerprint = cls.make_fingerprint(matcher, semantic)
+        table = cls.load(path, matcher.catalog, fingerprint)
+        if table is not None:
+            return table
+
+        with exclusive_lock(path + ".lock"):
+            # Another worker may have built it while this one waited for the lock
+            table = cls.load(path, matcher.catalog, fingerprint)
+            if table is None:
+                table = cls.build(matcher, semantic)
+                table.save(path)
+        return table
+
+    @classmethod
+    def load(cls, path: str, catalog, fingerprint: str):
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                if str(data["fingerprint"]) != fingerprint:
+                    logger.info("Mappings, scoring, data or embeddings changed; rebuilding the recommendation table.")
+                    return None
+                axes = json.loads(str(data["axes"]))
+                return cls(catalog, axes, data["indices"], data["scores"], data["reasons"],
+                           data["reason_strings"].tolist(), bool(data["semantic"]), fingerprint)
+        except Exception as e:
+            logger.warning(f"Failed to load recommendation table: {e}")
+            return None
+
+    def save(self, path: str):
+        tmp_path = f"{path}.tmp.{os.getpid()}"
+        try:
+            with open(tmp_path, "wb") as f:
+                np.savez(
+                    f,
+                    fingerprint=np.array(self.fingerprint),
+                    axes=np.array(json.dumps(self.axes)),
+                    indices=self.indices,
+                    scores=self.scores,
+                    reasons=self.reasons,
+                    reason_strings=np.array(self.reason_strings or [""]),
+                    semantic=np.array(self.semantic)
+                )
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"Could not save recommendation table: {e}")
+
+
+if __name__ == "__main__":
+    import time
+    from dotenv import load_dotenv
+
+    load_dotenv(os.path.join(os.path.dirname(__file__), '.env'))
+    os.environ.setdefault("QUERY_CACHE_WARMUP", "0")
+    sys.path.append(os.path.dirname(__file__))
+
+    from gemini_service import GeminiService
+    from job_matcher import JobMatcher
+    from occupation_catalog import OccupationCatalog
+
+    print("--- 🧮 Materializing Recommendations for Domain-Free Profiles ---")
+    catalog = OccupationCatalog.from_file(os.path.join(os.path.dirname(__file__), "data", "Occupation Data.txt"))
+    service = GeminiService()
+    matcher = JobMatcher(catalog, gemini_service=service)
+    matcher.vector_store.init_thread.join()
+
+    start = time.time()
+    table = matcher.materialize_table()
+    if table is None:
+        print("❌ Could not build the recommendation table.")
+        sys.exit(1)
+    service.query_cache.save()
+    print(f"✅ {len(table)} profiles ({'semantic' if table.semantic else 'rule-based'}), "
+          f"{table.nbytes / 1024:.0f} KiB, in {time.time() - start:.1f}s -> {matcher.table_path or '(memory)'}")
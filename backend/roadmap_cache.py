@@ -0,0 +1,181 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(__file__), "roadmap_cache.sqlite3")
+
+
+class RoadmapCache:
+    """
+    Persistent roadmap cache keyed on (normalized role, level, prompt version, model).
+
+    Backed by SQLite in WAL mode so every uvicorn worker on the host shares it
+    and it survives restarts. Entries expire after `ttl_seconds`, and the least
+    recently used rows are evicted beyond `max_entries`. Only real LLM output
+    is stored. A failed generation is remembered per process for
+    `negative_ttl_seconds`, so a struggling upstream is not hammered, but the
+    static fallback is never pinned in the shared cache.
+    """
+
+    # Refresh accessed_at at most this often per entry, to keep reads mostly read-only
+    TOUCH_INTERVAL = 60
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, ttl_seconds: float = 30 * 24 * 3600,
+                 max_entries: int = 5000, negative_ttl_seconds: float = 30):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.metrics = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "negative_hits": 0, "errors": 0}
+        self._negative = {} # key -> failed_at
+        self._lock = threading.Lock()
+        self._init_db()
+
+    @classmethod
+    def from_env(cls):
+        """
+        ROADMAP_CACHE_PATH, ROADMAP_CACHE_TTL (seconds), ROADMAP_CACHE_SIZE, ROADMAP_NEGATIVE_TTL.
+        """
+        return cls(
+            path=os.getenv("ROADMAP_CACHE_PATH", DEFAULT_CACHE_PATH),
+            ttl_seconds=float(os.getenv("ROADMAP_CACHE_TTL", 30 * 24 * 3600)),
+            max_entries=int(os.getenv("ROADMAP_CACHE_SIZE", 5000)),
+            negative_ttl_seconds=float(os.getenv("ROADMAP_NEGATIVE_TTL", 30))
+        )
+
+    @staticmethod
+    def make_key(role: str, level: str, prompt_version, model: str) -> str:
+        role = " ".join(str(role).lower().split())
+        level = " ".join(str(level).lower().split())
+        return f"{role}|{level}|v{prompt_version}|{model or ''}"
+
+    # --- Storage ---
+
+    @contextmanager
+    def _connect(self):
+        # A short-lived connection per operation is fork- and thread-safe
+        conn = sqlite3.connect(self.path, timeout=5)
+        try:
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with conn: # commit on success, rollback on error
+                yield conn
+        finally:
+            conn.close()
+
+    def _init_db(self):
+        try:
+            with self._connect() as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS roadmaps (
+                        key TEXT PRIMARY KEY,
+                        body TEXT NOT NULL,
+                        created_at REAL NOT NULL,
+                        accessed_at REAL NOT NULL
+                    )
+                """)
+                conn.execute("CREATE INDEX IF NOT EXISTS roadmaps_accessed ON roadmaps (accessed_at)")
+        except sqlite3.Error as e:
+            logger.warning(f"Roadmap cache disabled, could not open {self.path}: {e}")
+            self.path = None
+
+    def get(self, role: str, level: str, prompt_version, model: str):
+        if not self.path:
+            return None
+        key = self.make_key(role, level, prompt_version, model)
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT body, created_at, accessed_at FROM roadmaps WHERE key = ?", (key,)
+                ).fetchone()
+                if row and now - row[1] > self.ttl_seconds:
+                    conn.execute("DELETE FROM roadmaps WHERE key = ?", (key,))
+                    row = None
+                if row and now - row[2] > self.TOUCH_INTERVAL:
+                    conn.execute("UPDATE roadmaps SET accessed_at = ? WHERE key = ?", (now, key))
+        except sqlite3.Error as e:
+            logger.warning(f"Roadmap cache read failed: {e}")
+            self._count("errors")
+            return None
+
+        self._count("hits" if row else "misses")
+        return row[0] if row else None
+
+    def put(self, role: str, level: str, prompt_version, model: str, body: str):
+        if not self.path or not body:
+            return
+        key = self.make_key(role, level, prompt_version, model)
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO roadmaps (key, body, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, body, now, now)
+                )
+                evicted = conn.execute(
+                    "DELETE FROM roadmaps WHERE created_at < ?", (now - self.ttl_seconds,)
+                ).rowcount
+                evicted += conn.execute(
+                    "DELETE FROM roadmaps WHERE key IN ("
+                    " SELECT key FROM roadmaps ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                ).rowcount
+        except sqlite3.Error as e:
+            logger.warning(f"Roadmap cache write failed: {e}")
+            self._count("errors")
+            return
+
+        with self._lock:
+            self._negative.pop(key, None)
+            self.metrics["stores"] += 1
+            self.metrics["evictions"] += max(0, evicted)
+
+    # --- Negative results (per process, short lived) ---
+
+    def mark_failed(self, role: str, level: str, prompt_version, model: str):
+        if self.negative_ttl_seconds <= 0:
+            return
+        key = self.make_key(role, level, prompt_version, model)
+        with self._lock:
+            self._negative[key] = time.time()
+            # Opportunistically drop expired markers
+            if len(self._negative) > 1000:
+                cutoff = time.time() - self.negative_ttl_seconds
+                self._negative = {k: t for k, t in self._negative.items() if t >= cutoff}
+
+    def recently_failed(self, role: str, level: str, prompt_version, model: str) -> bool:
+        key = self.make_key(role, level, prompt_version, model)
+        with self._lock:
+            failed_at = self._negative.get(key)
+            if failed_at is None:
+                return False
+            if time.time() - failed_at > self.negative_ttl_seconds:
+                del self._negative[key]
+                return False
+            self.metrics["negative_hits"] += 1
+            return True
+
+    # --- Metrics ---
+
+    def _count(self, name: str):
+        with self._lock:
+            self.metrics[name] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.metrics)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["hits"] / lookups) if lookups else 0.0
+        if self.path:
+            try:
+                with self._connect() as conn:
+                    stats["entries"] = conn.execute("SELECT COUNT(*) FROM roadmaps").fetchone()[0]
+            except sqlite3.Error:
+                pass
+        return stats
@@ -1,3 +1,5 @@
+from occupation_catalog import OccupationCatalog
+
 class RoadmapGenerator:
     @staticmethod
     def generate(job_code: str, job_title: str, level: str):
@@ -5,7 +7,7 @@ class RoadmapGenerator:
         Generates a roadmap string (Markdown) based on the specific job code or title.
         Uses heuristics on the O*NET code prefix (e.g. 15-xxxx is Computer).
         """
-        code_prefix = job_code[:2] if job_code else "00"
+        code_prefix = OccupationCatalog.major_group(job_code)
         
         roadmap = f"# Career Roadmap: {job_title}\n"
         roadmap += f"**Current Level:** {level}\n\n"
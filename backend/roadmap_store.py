@@ -0,0 +1,189 @@
+import os
+import time
+import zlib
+import sqlite3
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORE_PATH = os.path.join(os.path.dirname(__file__), "roadmap_store.sqlite3")
+
+
+def content_digest(body: str) -> str:
+    """
+    Content address (and HTTP ETag) of a roadmap: sha256 of its UTF-8 Markdown.
+    """
+    return hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+
+class RoadmapStore:
+    """
+    Pre-generated roadmaps, filled offline by pregenerate_roadmaps.py and served
+    as-is by /roadmap.
+
+    Content-addressed: each distinct Markdown body is stored once, zlib-compressed,
+    under its sha256 digest, and (normalized role, level, prompt version) entries
+    point at a digest. The digest doubles as the ETag, so a conditional request
+    is answered from the entry row alone. Unlike RoadmapCache the key has no
+    model, so a server without an API key still serves pre-generated roadmaps;
+    the generating model is kept per entry for refreshes. SQLite in WAL mode,
+    so all workers and a running pre-generation job share one file.
+    """
+
+    def __init__(self, path: str = DEFAULT_STORE_PATH, compress_level: int = 9):
+        self.path = path
+        self.compress_level = compress_level
+        self.metrics = {"hits": 0, "misses": 0, "stores": 0, "errors": 0}
+        self._lock = threading.Lock()
+        if self.path:
+            self._init_db()
+
+    @classmethod
+    def from_env(cls):
+        """
+        ROADMAP_STORE_PATH ("" disables the store).
+        """
+        return cls(path=os.getenv("ROADMAP_STORE_PATH", DEFAULT_STORE_PATH) or None)
+
+    @staticmethod
+    def make_key(role: str, level: str, prompt_version) -> str:
+        role = " ".join(str(role).lower().split())
+        level = " ".join(str(level).lower().split())
+        return f"{role}|{level}|v{prompt_version}"
+
+    # --- Storage ---
+
+    @contextmanager
+    def _connect(self):
+        # A short-lived connection per operation is fork- and thread-safe
+        conn = sqlite3.connect(self.path, timeout=5)
+        try:
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with conn: # commit on success, rollback on error
+                yield conn
+        finally:
+            conn.close()
+
+    def _init_db(self):
+        try:
+            with self._connect() as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS objects (
+                        digest TEXT PRIMARY KEY,
+                        body BLOB NOT NULL,
+                        size INTEGER NOT NULL
+                    )
+                """)
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS entries (
+                        key TEXT PRIMARY KEY,
+                        digest TEXT NOT NULL REFERENCES objects (digest),
+                        model TEXT NOT NULL,
+                        generated_at REAL NOT NULL
+                    )
+                """)
+                conn.execute("CREATE INDEX IF NOT EXISTS entries_generated ON entries (generated_at)")
+        except sqlite3.Error as e:
+            logger.warning(f"Roadmap store disabled, could not open {self.path}: {e}")
+            self.path = None
+
+    def get(self, role: str, level: str, prompt_version):
+        """
+        (digest, compressed body) of the stored roadmap, or None. The body is
+        only decompressed (decode) when it is actually sent.
+        """
+        if not self.path:
+            return None
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT e.digest, o.body FROM entries e JOIN objects o ON o.digest = e.digest WHERE e.key = ?",
+                    (self.make_key(role, level, prompt_version),)
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Roadmap store read failed: {e}")
+            self._count("errors")
+            return None
+
+        self._count("hits" if row else "misses")
+        return row
+
+    @staticmethod
+    def decode(blob: bytes) -> str:
+        return zlib.decompress(blob).decode("utf-8")
+
+    def put(self, role: str, level: str, prompt_version, model: str, body: str) -> str:
+        """
+        Stores `body` (once per distinct content) and points the key at it. Returns the digest.
+        """
+        if not self.path or not body:
+            return None
+        digest = content_digest(body)
+        raw = body.encode("utf-8")
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR IGNORE INTO objects (digest, body, size) VALUES (?, ?, ?)",
+                    (digest, zlib.compress(raw, self.compress_level), len(raw))
+                )
+                conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, digest, model, generated_at) VALUES (?, ?, ?, ?)",
+                    (self.make_key(role, level, prompt_version), digest, model or "", time.time())
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"Roadmap store write failed: {e}")
+            self._count("errors")
+            return None
+
+        self._count("stores")
+        return digest
+
+    def generated(self, prompt_version) -> dict:
+        """
+        key -> (model, generated_at) of every entry for `prompt_version`, for planning refreshes.
+        """
+        if not self.path:
+            return {}
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT key, model, generated_at FROM entries WHERE key LIKE ?", (f"%|v{prompt_version}",)
+            ).fetchall()
+        return {key: (model, generated_at) for key, model, generated_at in rows}
+
+    def prune(self) -> int:
+        """
+        Deletes bodies no entry points at any more (after refreshes). Returns the number removed.
+        """
+        if not self.path:
+            return 0
+        with self._connect() as conn:
+            return conn.execute(
+                "DELETE FROM objects WHERE digest NOT IN (SELECT digest FROM entries)"
+            ).rowcount
+
+    # --- Metrics ---
+
+    def _count(self, name: str):
+        with self._lock:
+            self.metrics[name] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.metrics)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["hits"] / lookups) if lookups else 0.0
+        if self.path:
+            try:
+                with self._connect() as conn:
+                    stats["entries"] = conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+                    objects, stored, raw = conn.execute(
+                        "SELECT COUNT(*), COALESCE(SUM(LENGTH(body)), 0), COALESCE(SUM(size), 0) FROM objects"
+                    ).fetchone()
+                    stats.update(objects=objects, stored_bytes=stored, raw_bytes=raw)
+            except sqlite3.Error:
+                pass
+        return stats
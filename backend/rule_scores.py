@@ -0,0 +1,133 @@
+import os
+import json
+import hashlib
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(__file__), "rule_vectors.npz")
+
+# Bump when the meaning of the stored vectors changes
+FORMAT_VERSION = 1
+
+
+class FacetRuleScores:
+    """
+    Per-job keyword hit counts for every discrete profile facet value (MBTI
+    code, RIASEC code, life goal, cognitive bucket), precomputed from the
+    keyword index.
+
+    A request's rule counts are the sum of its facets' vectors, corrected for
+    keywords that several facets share, instead of one bitmap pass per keyword.
+    The vectors are persisted under a fingerprint of the mappings and the
+    occupation data, so a change to either rebuilds them.
+    """
+
+    MAX_MEMO_ENTRIES = 4096
+
+    def __init__(self, keyword_index, mappings: dict, data_hash: str, path: str = None):
+        self.keyword_index = keyword_index
+        self.path = path
+        self.fingerprint = self.make_fingerprint(mappings, data_hash)
+        self.keywords = {
+            (group, value): frozenset(str(k).lower() for k in keywords)
+            for group, values in mappings.items()
+            for value, keywords in values.items()
+        }
+        self.vectors = {} # (group, value) -> int16 counts per job
+        self._overlap_memo = {} # facet combination -> shared keywords
+
+        if not (self.path and self._load()):
+            self._build()
+            if self.path:
+                self._save()
+
+    @classmethod
+    def from_env(cls, keyword_index, mappings: dict, data_hash: str):
+        """
+        RULE_VECTOR_CACHE_PATH ("" keeps the vectors in memory only).
+        """
+        return cls(keyword_index, mappings, data_hash,
+                   path=os.getenv("RULE_VECTOR_CACHE_PATH", DEFAULT_CACHE_PATH) or None)
+
+    @staticmethod
+    def make_fingerprint(mappings: dict, data_hash: str) -> str:
+        payload = json.dumps({"version": FORMAT_VERSION, "data": data_hash, "mappings": mappings}, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _build(self):
+        for facet, keywords in self.keywords.items():
+            self.vectors[facet] = self.keyword_index.count(keywords).astype(np.int16)
+
+    def _load(self) -> bool:
+        if not os.path.exists(self.path):
+            return False
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                if str(data["fingerprint"]) != self.fingerprint:
+                    logger.info("Mappings or occupation data changed; rebuilding rule score vectors.")
+                    return False
+                facets = [tuple(f.split("\t", 1)) for f in data["facets"].tolist()]
+                counts = data["counts"]
+        except Exception as e:
+            logger.warning(f"Failed to load rule score vectors: {e}")
+            return False
+
+        if set(facets) != set(self.keywords) or counts.shape[1:] != (self.keyword_index.size,):
+            return False
+        self.vectors = dict(zip(facets, counts))
+        return True
+
+    def _save(self):
+        facets = list(self.vectors)
+        tmp_path = f"{self.path}.tmp.{os.getpid()}"
+        try:
+            with open(tmp_path, "wb") as f:
+                np.savez(
+                    f,
+                    fingerprint=np.array(self.fingerprint),
+                    facets=np.array(["\t".join(facet) for facet in facets]),
+                    counts=np.stack([self.vectors[facet] for facet in facets]) if facets
+                    else np.zeros((0, self.keyword_index.size), dtype=np.int16)
+                )
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.warning(f"Could not save rule score vectors: {e}")
+
+    def count(self, facets, exclude=()) -> np.ndarray:
+        """
+        Number of distinct keywords of `facets` ((group, value) pairs) found in
+        each job, leaving out `exclude`. Same as keyword_index.count() over the
+        union of the facets' keywords minus `exclude`.
+        """
+        facets = tuple(f for f in dict.fromkeys(facets) if f in self.vectors)
+        counts = np.zeros(self.keyword_index.size, dtype=np.int32)
+        for facet in facets:
+            counts += self.vectors[facet]
+
+        # Keywords counted by several facets are taken back out, as are excluded ones
+        corrections = dict(self._overlaps(facets))
+        for kw in {str(k).lower() for k in exclude}:
+            if any(kw in self.keywords[f] for f in facets):
+                corrections[kw] = corrections.get(kw, 0) + 1
+        for kw, extra in corrections.items():
+            counts -= extra * self.keyword_index.mask(kw)
+        return counts
+
+    def _overlaps(self, facets: tuple) -> tuple:
+        """
+        (keyword, times counted - 1) for keywords shared by several of `facets`, memoized per combination.
+        """
+        overlaps = self._overlap_memo.get(facets)
+        if overlaps is None:
+            seen = {}
+            for facet in facets:
+                for kw in self.keywords[facet]:
+                    seen[kw] = seen.get(kw, 0) + 1
+            overlaps = tuple((kw, times - 1) for kw, times in seen.items() if times > 1)
+            if len(self._overlap_memo) >= self.MAX_MEMO_ENTRIES:
+                self._overlap_memo.clear()
+            self._overlap_memo[facets] = overlaps
+        return overlaps
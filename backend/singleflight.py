@@ -0,0 +1,161 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+
+
+class SharedStream:
+    """
+    The chunks of one in-flight stream, kept so that every consumer can replay
+    them from the first one at its own pace. The producer only appends and never
+    waits for a consumer.
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.producer = None # the task filling the stream (kept referenced while it runs)
+        self._changed = asyncio.Event()
+
+    def _notify(self):
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    def append(self, chunk):
+        self.chunks.append(chunk)
+        self._notify()
+
+    def finish(self, error: BaseException = None):
+        self.done, self.error = True, error
+        self._notify()
+
+    async def follow(self):
+        position = 0
+        while True:
+            changed = self._changed # taken before checking, so no append is missed
+            while position < len(self.chunks):
+                yield self.chunks[position]
+                position += 1
+            if self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            await changed.wait()
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into one execution.
+
+    The first caller for a key (the leader) runs the call; callers that arrive
+    while it is in flight wait for the same result or exception. In-flight calls
+    are tracked as concurrent.futures.Future objects, so sync callers (threads)
+    and async callers (event loop) can join each other's calls.
+    """
+
+    def __init__(self):
+        self._calls = {} # key -> Future
+        self._streams = {} # (event loop, key) -> SharedStream
+        self._lock = threading.Lock()
+        self.coalesced = 0 # callers that joined an in-flight call
+
+    def _join(self, key):
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future, False
+            future = Future()
+            # RUNNING futures cannot be cancelled, so one impatient waiter cannot cancel it for everyone
+            future.set_running_or_notify_cancel()
+            self._calls[key] = future
+            return future, True
+
+    def _finish(self, key, future: Future, result=None, error: BaseException = None):
+        with self._lock:
+            self._calls.pop(key, None)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def in_flight(self) -> int:
+        return len(self._calls) + len(self._streams)
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        Runs fn(*args, **kwargs) unless a call for `key` is already in flight,
+        in which case this blocks until that call completes and shares its outcome.
+        """
+        future, leader = self._join(key)
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, result=result)
+        return result
+
+    async def do_async(self, key, coro_fn, *args, **kwargs):
+        """
+        Async counterpart of do(). The leader's coroutine runs as its own task, so
+        cancelling any single waiter (including the leader) does not cancel the
+        shared call for the others.
+        """
+        future, leader = self._join(key)
+        if leader:
+            task = asyncio.ensure_future(coro_fn(*args, **kwargs))
+
+            def on_done(t):
+                if t.cancelled():
+                    self._finish(key, future, error=asyncio.CancelledError())
+                elif t.exception() is not None:
+                    self._finish(key, future, error=t.exception())
+                else:
+                    self._finish(key, future, result=t.result())
+
+            task.add_done_callback(on_done)
+
+        return await asyncio.wrap_future(future)
+
+    async def stream_async(self, key, produce, *args, **kwargs):
+        """
+        Async generator counterpart of do_async() for streamed results. The first
+        caller for `key` starts `produce(emit, *args, **kwargs)` as its own task;
+        it passes each chunk to `emit`. Every caller, leader included, iterates
+        all chunks from the first one and then gets the producer's exception, if
+        any. The producer never waits for a consumer, so a slow or abandoned
+        reader neither slows it down nor keeps what it holds while streaming.
+        """
+        stream_key = (asyncio.get_running_loop(), key)
+        with self._lock:
+            stream = self._streams.get(stream_key)
+            leader = stream is None
+            if leader:
+                stream = self._streams[stream_key] = SharedStream()
+            else:
+                self.coalesced += 1
+
+        if leader:
+            async def run():
+                try:
+                    await produce(stream.append, *args, **kwargs)
+                except BaseException as e:
+                    self._end_stream(stream_key, stream, e)
+                    raise
+                self._end_stream(stream_key, stream)
+
+            stream.producer = asyncio.ensure_future(run())
+            # Retrieve the exception so a failed producer is not reported as "never retrieved"
+            stream.producer.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+        async for chunk in stream.follow():
+            yield chunk
+
+    def _end_stream(self, stream_key, stream: SharedStream, error: BaseException = None):
+        with self._lock:
+            self._streams.pop(stream_key, None)
+        stream.finish(error)
@@ -0,0 +1,45 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, "benchmarks"))
+
+# Every cache in a throwaway directory and no API key, set before the app modules read them
+_CACHE_DIR = tempfile.mkdtemp(prefix="careernexus-tests-")
+os.environ.update({
+    "GEMINI_API_KEY": "",
+    "EMBEDDINGS_CACHE_PATH": os.path.join(_CACHE_DIR, "job_embeddings.bin"),
+    "QUERY_CACHE_PATH": "",
+    "QUERY_CACHE_WARMUP": "0",
+    "RULE_VECTOR_CACHE_PATH": "",
+    "RECOMMENDATION_TABLE_PATH": "",
+    "ROADMAP_CACHE_PATH": os.path.join(_CACHE_DIR, "roadmap_cache.sqlite3"),
+    "ROADMAP_STORE_PATH": ""
+})
+
+DATA_PATH = os.path.join(BACKEND_DIR, "data", "Occupation Data.txt")
+
+
+@pytest.fixture(scope="session")
+def catalog():
+    from occupation_catalog import OccupationCatalog
+    return OccupationCatalog.from_file(DATA_PATH)
+
+
+@pytest.fixture
+def fake_genai(monkeypatch):
+    """
+    The in-process fake Gemini SDK (benchmarks/fake_gemini.py) with zero latency;
+    services created inside the test are configured against it.
+    """
+    import fake_gemini
+    import gemini_service
+
+    fake = fake_gemini.FakeGenAI(generate_ms=0, embed_ms=0, jitter=0, error_rate=0, rate_limit=0)
+    monkeypatch.setenv("GEMINI_API_KEY", "fake")
+    monkeypatch.setattr(gemini_service, "_genai", lambda: fake)
+    return fake
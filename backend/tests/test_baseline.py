@@ -0,0 +1,24 @@
+import baseline
+
+
+def _results(**benchmarks):
+    return {"results": benchmarks}
+
+
+def test_change_within_noise_floor_is_not_a_regression():
+    base = _results(fast={"p50_us": 1.0, "ops_per_s": 1e6}, slow={"p50_us": 100.0})
+    current = _results(fast={"p50_us": 1.6, "ops_per_s": 6e5}, slow={"p50_us": 160.0})
+
+    _, regressions = baseline.compare(current, base, tolerance=0.25, min_noise_us=1.0)
+    assert regressions == ["slow.p50_us: 160 vs baseline 100 (+60%)"]
+
+    _, regressions = baseline.compare(current, base, tolerance=0.25)
+    assert len(regressions) == 3
+
+
+def test_recorded_p50_range_widens_the_floor():
+    base = _results(noisy={"p50_us": 100.0, "p50_range": 10.0})
+    _, regressions = baseline.compare(_results(noisy={"p50_us": 130.0, "p50_range": 40.0}), base, min_noise_us=1.0)
+    assert regressions == []
+    _, regressions = baseline.compare(_results(noisy={"p50_us": 150.0, "p50_range": 5.0}), base, min_noise_us=1.0)
+    assert len(regressions) == 1
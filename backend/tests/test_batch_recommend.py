@@ -0,0 +1,74 @@
+import json
+import os
+
+import pytest
+
+import batch_recommend
+import fake_gemini
+
+PROFILES = [
+    {"id": "a", "life_goal": "Money", "mbti_code": "INTJ", "riasec_code": "I", "education_level": "12th"},
+    {"id": "b", "life_goal": "Power", "mbti_code": "ENFP", "riasec_code": "A", "education_level": "Undergrad",
+     "domain_interest": "Graphic Design", "cognitive_scores": {"reaction_time": 200}},
+    {"id": "c", "life_goal": "Money", "mbti_code": "INTJ"}
+]
+
+
+@pytest.fixture
+def embeddings_on_disk(tmp_path, monkeypatch, catalog):
+    # A ready embedding cache is what made the store report ready without a service
+    path = str(tmp_path / "job_embeddings.bin")
+    fake_gemini.write_job_embeddings(path, catalog, fake_gemini.FakeGenAI(generate_ms=0, embed_ms=0, jitter=0))
+    monkeypatch.setenv("EMBEDDINGS_CACHE_PATH", path)
+    return path
+
+
+def _run(tmp_path, **kwargs):
+    source, output = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    source.write_text("".join(json.dumps(p) + "\n" for p in PROFILES))
+    stats = batch_recommend.run(str(source), str(output), processes=0, **kwargs)
+    return stats, [json.loads(line) for line in output.read_text().splitlines()]
+
+
+def test_no_ai_with_embedding_cache_is_rule_based(tmp_path, embeddings_on_disk):
+    stats, results = _run(tmp_path, use_ai=False)
+
+    assert [r["id"] for r in results] == ["a", "b", "c"]
+    assert results[0]["recommendations"] and results[1]["recommendations"]
+    assert "error" in results[2]
+    assert stats["queries_embedded"] == 0
+    assert stats["semantic"] == 0 and stats["rule_only"] == 2
+
+
+def test_no_ai_matches_live_rule_scoring(tmp_path, embeddings_on_disk, catalog):
+    from job_matcher import JobMatcher
+
+    _, results = _run(tmp_path, use_ai=False)
+    matcher = JobMatcher(catalog)
+    profile = batch_recommend.parse_profile(PROFILES[0])
+    assert results[0]["recommendations"] == json.loads(json.dumps(matcher._rank(profile, None, [])))
+
+
+def test_worker_processes_reuse_the_parents_matcher(tmp_path, monkeypatch, catalog):
+    from job_matcher import JobMatcher
+
+    # Matchers built in any process, recorded where forked workers' writes are visible too
+    built = tmp_path / "matchers.txt"
+    original = JobMatcher.__init__
+
+    def recording_init(self, *args, **kwargs):
+        with open(built, "a") as f:
+            f.write(f"{os.getpid()}\n")
+        original(self, *args, **kwargs)
+    monkeypatch.setattr(JobMatcher, "__init__", recording_init)
+
+    recommender = batch_recommend.BatchRecommender(catalog, processes=2)
+    try:
+        records = PROFILES[:2] * 20
+        pooled = recommender.process_chunk(records)
+    finally:
+        recommender.close()
+    in_process = batch_recommend.BatchRecommender(catalog, processes=0).process_chunk(records)
+
+    assert pooled == in_process
+    assert built.read_text().split() == [str(os.getpid())] * 2
@@ -0,0 +1,141 @@
+import time
+import types
+
+import pytest
+
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+import gemini_service
+from gemini_service import GeminiService, _past_deadline
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _fail(breaker):
+    with pytest.raises(ValueError):
+        with breaker.guard():
+            raise ValueError("upstream failed")
+
+
+def _succeed(breaker):
+    with breaker.guard():
+        pass
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def breaker(clock):
+    return CircuitBreaker("test", failure_rate=0.5, min_calls=4, window=10, reset_timeout=30, clock=clock)
+
+
+def test_opens_at_failure_rate_once_window_has_min_calls(breaker):
+    for _ in range(3):
+        _fail(breaker)
+    assert breaker.state == CLOSED # below min_calls
+    _succeed(breaker)
+    assert breaker.state == OPEN # 3 of 4 failed
+    assert breaker.opened == 1
+
+    with pytest.raises(CircuitOpenError):
+        with breaker.guard():
+            raise AssertionError("must not run while open")
+    assert breaker.rejecting() and breaker.rejected == 2
+    assert breaker.stats()["retry_in_s"] == 30
+
+
+def test_stays_closed_below_failure_rate(breaker):
+    for _ in range(10):
+        _succeed(breaker)
+        _succeed(breaker)
+        _fail(breaker)
+    assert breaker.state == CLOSED and breaker.opened == 0
+
+
+def test_half_open_admits_one_probe_and_a_failed_probe_reopens(breaker, clock):
+    for _ in range(4):
+        _fail(breaker)
+    clock.now += 29
+    assert breaker.state == OPEN
+    clock.now += 1
+    assert breaker.state == HALF_OPEN
+
+    assert breaker.acquire() # the probe
+    assert not breaker.acquire() and breaker.rejecting()
+    breaker.record(False)
+    assert breaker.state == OPEN and breaker.opened == 2
+
+    clock.now += 30
+    assert breaker.state == HALF_OPEN
+
+
+def test_successful_probe_closes_with_a_fresh_window(breaker, clock):
+    for _ in range(4):
+        _fail(breaker)
+    clock.now += 30
+    _succeed(breaker)
+    assert breaker.state == CLOSED
+    assert breaker.stats()["window_calls"] == 0
+    for _ in range(3):
+        _fail(breaker)
+    assert breaker.state == CLOSED # old failures do not count toward reopening
+
+
+def test_cancelled_probe_gives_its_slot_back(breaker, clock):
+    for _ in range(4):
+        _fail(breaker)
+    clock.now += 30
+    with pytest.raises(KeyboardInterrupt):
+        with breaker.guard():
+            raise KeyboardInterrupt
+    assert breaker.state == HALF_OPEN and breaker.acquire()
+
+
+def test_past_deadline_stops_when_the_backoff_would_overrun():
+    now = time.monotonic()
+    state = lambda deadline, sleep: types.SimpleNamespace(kwargs={"deadline": deadline}, upcoming_sleep=sleep)
+    assert _past_deadline(state(now + 1, 2))
+    assert not _past_deadline(state(now + 10, 2))
+    assert _past_deadline(state(now - 1, 0))
+    assert not _past_deadline(types.SimpleNamespace(kwargs={}, upcoming_sleep=60))
+
+
+@pytest.mark.parametrize("deadline, attempts", [(0.5, 1), (3.0, 2), (60.0, 3)])
+def test_retries_stop_at_the_deadline(monkeypatch, fake_genai, deadline, attempts):
+    # Backoff sleeps (2s each) advance a virtual clock instead of waiting
+    slept = [0.0]
+    monkeypatch.setattr(gemini_service, "time", types.SimpleNamespace(monotonic=lambda: time.monotonic() + slept[0]))
+    monkeypatch.setattr(GeminiService._call_ai.retry, "sleep", lambda seconds: slept.__setitem__(0, slept[0] + seconds))
+    fake_genai.error_rate = 1.0 # every call is a retryable 503
+    service = GeminiService()
+    service.deadlines["generate"] = deadline
+    calls = fake_genai.stats["calls"]
+
+    with pytest.raises(Exception):
+        service.generate_roadmap_text("Data Scientists", "12th")
+    assert fake_genai.stats["calls"] - calls == attempts
+
+
+def test_open_circuit_serves_the_fallback_without_upstream_calls(monkeypatch, fake_genai):
+    monkeypatch.setenv("CIRCUIT_MIN_CALLS", "2")
+    fake_genai.error_rate = 1.0
+    service = GeminiService()
+    service.deadlines["generate"] = 0.5 # no retries
+
+    for level in ("10th", "12th"):
+        assert service.generate_roadmap("Data Scientists", level) # static fallback
+    assert service.breakers["generate"].state == OPEN
+
+    calls = fake_genai.stats["calls"]
+    assert service.generate_roadmap("Data Scientists", "Undergrad")
+    with pytest.raises(CircuitOpenError):
+        service.generate_roadmap_text("Data Scientists", "Undergrad")
+    assert fake_genai.stats["calls"] == calls
@@ -0,0 +1,54 @@
+import multiprocessing
+import os
+
+import pytest
+
+from file_lock import exclusive_lock, fcntl
+
+pytestmark = pytest.mark.skipif(fcntl is None or "fork" not in multiprocessing.get_all_start_methods(),
+                                reason="needs flock and fork")
+
+
+def _hold(path, locked, release):
+    with exclusive_lock(path) as owner:
+        assert owner
+        locked.set()
+        release.wait(5)
+
+
+def _hold_and_die(path, locked):
+    with exclusive_lock(path):
+        locked.set()
+        os._exit(1) # no cleanup: the kernel drops the lock with the process
+
+
+def test_only_one_process_holds_the_lock(tmp_path):
+    path = str(tmp_path / "cache.lock")
+    context = multiprocessing.get_context("fork")
+    locked, release = context.Event(), context.Event()
+    holder = context.Process(target=_hold, args=(path, locked, release))
+    holder.start()
+    try:
+        assert locked.wait(5)
+        with exclusive_lock(path, blocking=False) as owner:
+            assert owner is False
+    finally:
+        release.set()
+        holder.join(5)
+
+    assert holder.exitcode == 0
+    with exclusive_lock(path, blocking=False) as owner:
+        assert owner is True
+
+
+def test_lock_of_a_crashed_holder_is_released(tmp_path):
+    path = str(tmp_path / "cache.lock")
+    context = multiprocessing.get_context("fork")
+    locked = context.Event()
+    holder = context.Process(target=_hold_and_die, args=(path, locked))
+    holder.start()
+    holder.join(5)
+
+    assert locked.is_set() and holder.exitcode == 1
+    with exclusive_lock(path, blocking=False) as owner:
+        assert owner is True
@@ -0,0 +1,156 @@
+import asyncio
+import threading
+import types
+
+import pytest
+
+from gemini_service import GeminiService
+from roadmap_generator import RoadmapGenerator
+
+
+def _record_threads(monkeypatch, obj, names, threads):
+    for name in names:
+        original = getattr(obj, name)
+
+        def recorded(*args, _original=original, **kwargs):
+            threads.append(threading.current_thread())
+            return _original(*args, **kwargs)
+        monkeypatch.setattr(obj, name, recorded)
+
+
+class StreamingModel:
+    """
+    Streams `chunks`. With `release` set to an asyncio.Event, waits for it after
+    the first chunk; with `stall`, stops responding after the last chunk.
+    """
+
+    model_name = "streaming-model"
+
+    def __init__(self, chunks, stall=False):
+        self.chunks, self.stall = chunks, stall
+        self.release = None
+        self.calls = 0
+
+    async def generate_content_async(self, prompt, safety_settings=None, request_options=None, stream=False):
+        self.calls += 1
+        return self._stream()
+
+    async def _stream(self):
+        for i, text in enumerate(self.chunks):
+            if i == 1 and self.release is not None:
+                await self.release.wait()
+            yield types.SimpleNamespace(text=text)
+        if self.stall:
+            await asyncio.sleep(3600)
+
+
+@pytest.fixture
+def streaming_service(tmp_path, monkeypatch, fake_genai):
+    monkeypatch.setenv("ROADMAP_CACHE_PATH", str(tmp_path / "cache.sqlite3"))
+    service = GeminiService()
+    service.deadlines["generate"] = 0.2
+    return service
+
+
+async def _collect(stream):
+    return [chunk async for chunk in stream]
+
+
+def test_async_roadmap_paths_keep_sqlite_off_the_event_loop(tmp_path, monkeypatch, fake_genai):
+    monkeypatch.setenv("ROADMAP_CACHE_PATH", str(tmp_path / "cache.sqlite3"))
+    monkeypatch.setenv("ROADMAP_STORE_PATH", str(tmp_path / "store.sqlite3"))
+    service = GeminiService()
+    threads = []
+    _record_threads(monkeypatch, service.roadmap_cache, ("get", "put"), threads)
+    _record_threads(monkeypatch, service.roadmap_store, ("get",), threads)
+
+    async def run():
+        loop_thread = threading.current_thread()
+        assert await service.stored_roadmap_async("Data Scientists", "12th") is None
+        first = await service.generate_roadmap_async("Data Scientists", "12th")
+        again = await service.generate_roadmap_async("Data Scientists", "12th")
+        streamed = [chunk async for chunk in service.stream_roadmap_async("Data Scientists", "Undergrad")]
+        return loop_thread, first, again, streamed
+
+    loop_thread, first, again, streamed = asyncio.run(run())
+    assert first and again == first and "".join(streamed)
+    assert len(threads) == 7 and loop_thread not in threads
+
+
+def test_sync_and_async_roadmap_requests_share_one_generation(tmp_path, monkeypatch, fake_genai):
+    monkeypatch.setenv("ROADMAP_CACHE_PATH", str(tmp_path / "cache.sqlite3"))
+    fake_genai.generate_ms = 200 # long enough for both callers to overlap
+    service = GeminiService()
+    calls = fake_genai.stats["calls"] # model discovery
+
+    async def run():
+        sync_call = asyncio.ensure_future(asyncio.to_thread(service.generate_roadmap, "Data Scientists", "12th"))
+        while service.flights.in_flight() == 0:
+            await asyncio.sleep(0.001)
+        async_result = await service.generate_roadmap_async("Data Scientists", "12th")
+        return await sync_call, async_result
+
+    sync_result, async_result = asyncio.run(run())
+    assert sync_result == async_result
+    assert fake_genai.stats["calls"] - calls == 1 and service.flights.coalesced == 1
+
+
+def test_identical_streams_share_one_model_call_and_a_slow_reader_holds_no_slot(streaming_service):
+    service = streaming_service
+    service.model = model = StreamingModel(["# Roadmap\n", "## Phase 1\n", "## Phase 2\n"])
+
+    async def run():
+        model.release = asyncio.Event()
+        fast = service.stream_roadmap_async("Data Scientists", "12th")
+        slow = service.stream_roadmap_async("Data Scientists", "12th")
+        first = [await fast.__anext__(), await slow.__anext__()]
+        model.release.set()
+        rest = await _collect(fast)
+        # The model is done although `slow` has not read on: nothing is held for it
+        held = service.max_concurrency - service._semaphore()._value, service.flights.in_flight()
+        return first, rest, held, await _collect(slow)
+
+    first, rest, held, slow_rest = asyncio.run(run())
+    assert first == ["# Roadmap\n"] * 2 and rest == slow_rest == ["## Phase 1\n", "## Phase 2\n"]
+    assert held == (0, 0)
+    assert model.calls == 1 and service.flights.coalesced == 1
+    assert service.roadmap_cache.get(*service._roadmap_key("Data Scientists", "12th")) == "".join(first[:1] + rest)
+
+
+def test_stalled_stream_times_out_at_the_deadline(streaming_service):
+    service = streaming_service
+    service.model = StreamingModel(["# Roadmap\n"], stall=True)
+
+    async def run():
+        received = []
+        with pytest.raises(asyncio.TimeoutError):
+            async for chunk in service.stream_roadmap_async("Data Scientists", "12th"):
+                received.append(chunk)
+        return received, service.max_concurrency - service._semaphore()._value
+
+    assert asyncio.run(run()) == (["# Roadmap\n"], 0)
+    assert service.roadmap_cache.recently_failed(*service._roadmap_key("Data Scientists", "12th"))
+
+
+def test_stream_stalled_before_its_first_chunk_falls_back_to_the_static_roadmap(streaming_service):
+    service = streaming_service
+    service.model = model = StreamingModel([], stall=True)
+    static = RoadmapGenerator.generate("00-0000", "Data Scientists", "12th")
+
+    assert "".join(asyncio.run(_collect(service.stream_roadmap_async("Data Scientists", "12th")))) == static
+    # Marked as failed: the next request does not wait for the model again
+    assert "".join(asyncio.run(_collect(service.stream_roadmap_async("Data Scientists", "12th")))) == static
+    assert model.calls == 1
+
+
+@pytest.mark.parametrize("texts", [["Data  Science"], ["Data Science", "data science", "Cooking"]])
+def test_query_embedding_misses_are_counted_and_cached_once(monkeypatch, fake_genai, texts):
+    service = GeminiService()
+    puts = []
+    monkeypatch.setattr(service.query_cache, "put", lambda text, embedding: puts.append(text))
+
+    embeddings = asyncio.run(service.get_query_embeddings_async(texts + texts[:1]))
+    assert all(len(e) for e in embeddings)
+    distinct = {service.query_cache.normalize(t) for t in texts}
+    assert service.query_cache.misses == len(texts) + 1 and service.query_cache.hits == 0
+    assert sorted(service.query_cache.normalize(t) for t in puts) == sorted(distinct)
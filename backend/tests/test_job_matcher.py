@@ -0,0 +1,35 @@
+import asyncio
+
+import pytest
+
+import fake_gemini
+from gemini_service import GeminiService
+from job_matcher import JobMatcher
+
+
+@pytest.fixture
+def ai_matcher(tmp_path, monkeypatch, catalog, fake_genai):
+    path = str(tmp_path / "job_embeddings.bin")
+    fake_gemini.write_job_embeddings(path, catalog, fake_genai)
+    monkeypatch.setenv("EMBEDDINGS_CACHE_PATH", path)
+    matcher = JobMatcher(catalog, gemini_service=GeminiService())
+    matcher.vector_store.init_thread.join()
+    assert matcher.vector_store.is_ready
+    return matcher
+
+
+def test_cached_query_skips_the_micro_batcher(ai_matcher):
+    cached_text, new_text = "Money INTJ Investigative", "Power ENFP Artistic"
+    cache = ai_matcher.gemini_service.query_cache
+    ai_matcher.gemini_service.get_query_embedding(cached_text)
+    hits = cache.hits
+
+    async def run():
+        return (await ai_matcher._semantic_search_async(cached_text),
+                await ai_matcher._semantic_search_async(new_text))
+
+    cached_results, new_results = asyncio.run(run())
+    assert ai_matcher.search_batcher.items == 1 # only the miss was batched
+    assert cache.hits - hits == 1
+    assert cached_results == ai_matcher.vector_store.search_embeddings([cache.get(cached_text)], top_k=100)[0]
+    assert len(new_results) == 100 and new_text in cache
@@ -0,0 +1,193 @@
+import numpy as np
+import pytest
+
+from embedding_file import open_embeddings, read_header, write_embeddings
+from job_vector_store import JobVectorStore
+from vector_index import ExactIndex, IVFIndex, QuantizedIndex, l2_normalize
+
+
+def _store(catalog, path, service=None):
+    store = JobVectorStore(catalog, service, cache_path=path)
+    store.init_thread.join()
+    assert store.is_ready
+    return store
+
+
+def _matrix(catalog, dim=32):
+    return np.random.default_rng(0).standard_normal((len(catalog), dim)).astype(np.float32) * 3
+
+
+def test_normalized_file_is_scored_from_the_mapping(tmp_path, catalog, monkeypatch):
+    monkeypatch.delenv("VECTOR_STORAGE", raising=False)
+    path = str(tmp_path / "emb.bin")
+    write_embeddings(path, l2_normalize(_matrix(catalog)), None, catalog.content_hash, normalized=True)
+
+    store = _store(catalog, path)
+    assert isinstance(store.normalized, np.memmap)
+    assert isinstance(store.index, ExactIndex) and store.index.vectors is store.normalized
+
+
+def test_unnormalized_file_is_rewritten_once(tmp_path, catalog):
+    path = str(tmp_path / "emb.bin")
+    raw = _matrix(catalog)
+    write_embeddings(path, raw, None, catalog.content_hash, row_hashes=[str(i) for i in range(len(raw))])
+
+    store = _store(catalog, path)
+    header, _ = read_header(path)
+    assert header["normalized"] and header["row_hashes"][:2] == ["0", "1"]
+    assert isinstance(store.normalized, np.memmap)
+    np.testing.assert_allclose(store.normalized, l2_normalize(raw), atol=1e-6)
+
+    # The next worker maps the upgraded file without touching it
+    mtime = (tmp_path / "emb.bin").stat().st_mtime_ns
+    assert isinstance(_store(catalog, path).normalized, np.memmap)
+    assert (tmp_path / "emb.bin").stat().st_mtime_ns == mtime
+
+
+def test_float16_file_uses_int8_first_pass(tmp_path, catalog):
+    path = str(tmp_path / "emb.bin")
+    vectors = l2_normalize(_matrix(catalog))
+    write_embeddings(path, vectors, None, catalog.content_hash, dtype="float16", normalized=True)
+
+    store = _store(catalog, path)
+    assert store.normalized.dtype == np.float16 and isinstance(store.normalized, np.memmap)
+    assert isinstance(store.index, QuantizedIndex)
+
+    mapped, _ = open_embeddings(path)
+    scores, indices = store.index.search(vectors[:3], 5)
+    assert list(indices[:, 0]) == [0, 1, 2]
+    np.testing.assert_allclose(scores[:, 0], (np.asarray(mapped[:3], dtype=np.float32) * vectors[:3]).sum(axis=1),
+                               rtol=1e-5)
+
+
+def test_index_is_rebuilt_when_the_embedding_file_is_rewritten(tmp_path, catalog, monkeypatch):
+    monkeypatch.setenv("VECTOR_STORAGE", "int8")
+    path = str(tmp_path / "emb.bin")
+    first = l2_normalize(_matrix(catalog))
+    write_embeddings(path, first, None, catalog.content_hash, normalized=True)
+    _store(catalog, path)
+    assert (tmp_path / "emb.bin.int8.npz").exists()
+
+    # Same data hash, model and row count, other rows (e.g. refilled failed rows or --full)
+    second = l2_normalize(np.random.default_rng(1).standard_normal(first.shape).astype(np.float32))
+    write_embeddings(path, second, None, catalog.content_hash, normalized=True)
+    store = _store(catalog, path)
+    np.testing.assert_array_equal(store.index.codes, QuantizedIndex.build(second).codes)
+    assert list(store.index.search(second[:5], 1)[1][:, 0]) == [0, 1, 2, 3, 4]
+
+    # An unchanged file reuses the rebuilt index
+    monkeypatch.setattr(QuantizedIndex, "build", classmethod(lambda cls, *a, **k: pytest.fail("index rebuilt")))
+    assert _store(catalog, path).index.search(second[:1], 1)[1][0, 0] == 0
+
+
+def test_ivf_index_is_saved_and_rebuilt_for_a_rewritten_file(tmp_path, catalog, monkeypatch):
+    monkeypatch.setenv("VECTOR_INDEX", "ivf")
+    monkeypatch.setenv("IVF_NLISTS", "8")
+    path = str(tmp_path / "emb.bin")
+    first = l2_normalize(_matrix(catalog))
+    write_embeddings(path, first, None, catalog.content_hash, normalized=True)
+    assert isinstance(_store(catalog, path).index, IVFIndex)
+    saved = (tmp_path / "emb.bin.ivf.npz").stat().st_mtime_ns
+
+    assert _store(catalog, path).index.n_lists == 8 # loaded, not rebuilt
+    assert (tmp_path / "emb.bin.ivf.npz").stat().st_mtime_ns == saved
+
+    second = l2_normalize(np.random.default_rng(1).standard_normal(first.shape).astype(np.float32))
+    write_embeddings(path, second, None, catalog.content_hash, normalized=True)
+    store = _store(catalog, path)
+    assert (tmp_path / "emb.bin.ivf.npz").stat().st_mtime_ns != saved
+    # Every row sits in the list of its closest centroid for the *current* matrix
+    assignments = np.argmax(second @ store.index.centroids.T, axis=1)
+    for l in range(store.index.n_lists):
+        rows = store.index.list_ids[store.index.list_offsets[l]:store.index.list_offsets[l + 1]]
+        assert (assignments[rows] == l).all()
+
+
+class EmbeddingBackend:
+    """embed_batch() stand-in that fails every batch containing one of `fail`."""
+
+    is_configured = True
+    embedding_model = "test-embedding"
+
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.embedded = []
+
+    def embed_batch(self, texts):
+        if self.fail & set(texts):
+            raise RuntimeError("503 Service Unavailable")
+        self.embedded += texts
+        return [np.random.default_rng(len(t)).standard_normal(8) for t in texts]
+
+
+class Clock:
+    """Virtual time for the builder's rate limiter and retry backoff."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def test_partial_build_is_not_cached_and_resumes_from_the_checkpoint(tmp_path, catalog, monkeypatch):
+    import embedding_builder
+    monkeypatch.setattr(embedding_builder, "time", Clock())
+    path = str(tmp_path / "emb.bin")
+    texts = catalog.embedding_texts()
+
+    failing = EmbeddingBackend(fail=texts[:1])
+    store = _store(catalog, path, failing)
+    assert not (tmp_path / "emb.bin").exists() and (tmp_path / "emb.bin.ckpt.npz").exists()
+    done, total = store.progress
+    assert total - done == 50 # the first batch
+    assert not np.any(store.normalized[:50]) and np.all(np.any(store.normalized[50:], axis=1))
+
+    healthy = EmbeddingBackend()
+    resumed = _store(catalog, path, healthy)
+    assert healthy.embedded == texts[:50] # only the failed rows
+    assert isinstance(resumed.normalized, np.memmap) and np.all(np.any(resumed.normalized, axis=1))
+    assert not (tmp_path / "emb.bin.ckpt.npz").exists()
+
+
+def _waiting_store(catalog, backend, path):
+    store = JobVectorStore(catalog, backend, cache_path=path)
+    for _ in range(500):
+        if store.status == "waiting":
+            return store
+        store.init_thread.join(0.01)
+    raise AssertionError(f"store is {store.status}, not waiting for the lock")
+
+
+def test_waiting_worker_loads_the_cache_another_process_built(tmp_path, catalog):
+    from file_lock import exclusive_lock
+
+    path = str(tmp_path / "emb.bin")
+    backend = EmbeddingBackend()
+    with exclusive_lock(path + ".lock") as owner: # another worker is building
+        assert owner
+        store = _waiting_store(catalog, backend, path)
+        assert not store.is_ready
+        write_embeddings(path, l2_normalize(_matrix(catalog)), "test-embedding", catalog.content_hash, normalized=True)
+
+    store.init_thread.join()
+    assert store.is_ready and isinstance(store.normalized, np.memmap)
+    assert backend.embedded == [] # loaded, not rebuilt
+
+
+def test_waiting_worker_takes_over_when_the_builder_gives_up(tmp_path, catalog, monkeypatch):
+    import embedding_builder
+    from file_lock import exclusive_lock
+    monkeypatch.setattr(embedding_builder, "time", Clock())
+
+    path = str(tmp_path / "emb.bin")
+    backend = EmbeddingBackend()
+    with exclusive_lock(path + ".lock"):
+        store = _waiting_store(catalog, backend, path)
+    # Released without a cache file (the builder failed or died)
+    store.init_thread.join()
+    assert store.is_ready and len(backend.embedded) == len(catalog)
+    assert (tmp_path / "emb.bin").exists()
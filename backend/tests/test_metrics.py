@@ -0,0 +1,99 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+import metrics
+from gemini_service import GeminiService
+
+
+def _samples(text: str) -> dict:
+    """{'name{labels}': value} for every sample line of a text exposition."""
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            samples[name] = float(value)
+    return samples
+
+
+def test_render_counters_histograms_and_callbacks():
+    registry = metrics.Registry()
+    requests = registry.counter("requests_total", "Requests.", ("route",))
+    latency = registry.histogram("latency_seconds", "Latency.", ("route",), buckets=(0.1, 1.0))
+    registry.callback("queue_depth", "Depth.", lambda: {("a",): 3, ("b",): None}, labelnames=("queue",))
+    registry.callback("broken", "Fails at scrape time.", lambda: 1 / 0)
+
+    requests.inc(route='/say "hi"\n')
+    for value in (0.05, 0.5, 5.0):
+        latency.observe(value, route="/x")
+    text = registry.render()
+    samples = _samples(text)
+
+    assert "# TYPE latency_seconds histogram" in text and "# TYPE broken gauge" in text
+    assert samples['requests_total{route="/say \\"hi\\"\\n"}'] == 1
+    assert [samples[f'latency_seconds_bucket{{route="/x",le="{le}"}}'] for le in ("0.1", "1.0", "+Inf")] == [1, 2, 3]
+    assert samples['latency_seconds_count{route="/x"}'] == 3 and samples['latency_seconds_sum{route="/x"}'] == 5.55
+    assert samples['queue_depth{queue="a"}'] == 3 and not any(k.startswith("broken") for k in samples)
+
+
+def test_labels_and_registration_are_checked():
+    registry = metrics.Registry()
+    counter = registry.counter("calls_total", "Calls.", ("operation",))
+    assert registry.counter("calls_total", "Calls.", ("operation",)) is counter
+    with pytest.raises(ValueError):
+        registry.counter("calls_total", "Calls.", ("operation", "outcome"))
+    with pytest.raises(ValueError):
+        counter.inc(route="/x")
+
+    histogram = registry.histogram("span_seconds", "Spans.", ("stage", "outcome"))
+    with pytest.raises(RuntimeError):
+        with metrics._timed(histogram, stage="rank"):
+            raise RuntimeError("failed stage")
+    with metrics._timed(histogram, stage="rank"):
+        pass
+    samples = _samples(registry.render())
+    assert samples['span_seconds_count{stage="rank",outcome="error"}'] == 1
+    assert samples['span_seconds_count{stage="rank",outcome="ok"}'] == 1
+
+
+@pytest.fixture
+def client(monkeypatch, catalog, fake_genai):
+    monkeypatch.setattr(main, "catalog", catalog)
+    monkeypatch.setattr(main, "warmup", None)
+    monkeypatch.setattr(main, "gemini_service", GeminiService())
+    monkeypatch.setattr(main, "job_matcher", None)
+    return TestClient(main.app)
+
+
+def test_metrics_endpoint_labels_requests_by_route_template(client):
+    before = _samples(client.get("/metrics").text)
+    assert client.get("/roadmap/15-1252.00", params={"level": "12th"}).status_code == 200
+    assert client.get("/roadmap/15-1252.00", params={"level": "10th"}).status_code == 200
+    assert client.get("/no/such/page").status_code == 404
+
+    response = client.get("/metrics")
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    after = _samples(response.text)
+
+    def delta(key):
+        return after.get(key, 0) - before.get(key, 0)
+
+    # One series per route template, not per SOC code
+    assert delta('careernexus_http_request_seconds_count{method="GET",route="/roadmap/{onet_code}",status="200"}') == 2
+    assert delta('careernexus_http_request_seconds_count{method="GET",route="unmatched",status="404"}') == 1
+    assert not any("15-1252.00" in key for key in after)
+    assert delta('careernexus_stage_seconds_count{stage="roadmap",outcome="ok"}') == 2
+    assert delta('careernexus_upstream_call_seconds_count{operation="generate",outcome="ok"}') == 2
+
+
+def test_metrics_endpoint_reports_circuits_and_caches(client):
+    samples = _samples(client.get("/metrics").text)
+    for operation in ("generate", "embed", "list_models"):
+        assert samples[f'careernexus_circuit_state{{operation="{operation}",state="closed"}}'] == 1
+        assert samples[f'careernexus_circuit_state{{operation="{operation}",state="open"}}'] == 0
+        assert samples[f'careernexus_circuit_opened_total{{operation="{operation}"}}'] == 0
+    for cache in ("query_embeddings", "roadmaps"):
+        assert f'careernexus_cache_entries{{cache="{cache}"}}' in samples
+    assert 'careernexus_cache_hit_rate{cache="query_embeddings"}' in samples
+    # No matcher yet: vector store gauges are left out rather than reported as zero
+    assert not any(key.startswith("careernexus_vector_store_ready") for key in samples)
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from conftest import DATA_PATH
+from embedding_file import dataset_hash
+from occupation_catalog import OccupationCatalog, StringColumn
+
+
+@pytest.fixture(scope="module")
+def frame():
+    # The DataFrame the catalog replaced, loaded the way main.py used to
+    pd = pytest.importorskip("pandas")
+    return pd.read_csv(DATA_PATH, sep="\t")
+
+
+def test_columns_match_the_pandas_load(catalog, frame):
+    assert len(catalog) == len(frame)
+    assert list(catalog.codes) == frame["O*NET-SOC Code"].astype(str).tolist()
+    assert list(catalog.titles) == frame["Title"].astype(str).tolist()
+    assert list(catalog.descriptions) == frame["Description"].astype(str).tolist()
+
+
+def test_derived_text_and_hash_match_the_pandas_pipeline(catalog, frame):
+    texts = ("Title: " + frame["Title"].astype(str) + "; Description: " + frame["Description"].astype(str)).tolist()
+    assert catalog.embedding_texts() == texts
+    assert catalog.content_hash == dataset_hash(texts) # existing embedding caches stay valid
+
+    search_text = (frame["Title"].astype(str).str.lower() + " " + frame["Description"].astype(str).str.lower())
+    assert list(catalog.search_text) == search_text.tolist()
+    for keyword in ("engineer", "data", "nurse", "art", "x-ray", "zzz-not-there"):
+        np.testing.assert_array_equal(catalog.search_text.contains(keyword),
+                                      search_text.str.contains(keyword, regex=False).to_numpy())
+
+
+def test_lookups(catalog):
+    i = catalog.index_of("15-1252.00")
+    assert catalog.record(i)["title"] == "Software Developers" and catalog.get_index("00-0000.00") is None
+    assert catalog.find_title("  software   DEVELOPERS ") == i
+    assert catalog.major_groups[i] == 15 and OccupationCatalog.major_group("15-1252.00") == "15"
+    with pytest.raises(KeyError):
+        catalog.index_of("00-0000.00")
+
+
+def test_string_column_rows_never_match_across_boundaries():
+    column = StringColumn(["alpha", "beta", "", "gamma ray", "été"])
+    assert list(column) == ["alpha", "beta", "", "gamma ray", "été"] and column[-1] == "été"
+    assert column.contains("a").tolist() == [True, True, False, True, False]
+    assert not column.contains("ab").any() # "alpha" + "beta" are separated
+    assert column.contains("été").tolist() == [False, False, False, False, True]
+    assert not column.contains("").any()
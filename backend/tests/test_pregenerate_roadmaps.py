@@ -0,0 +1,123 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+import pregenerate_roadmaps
+from gemini_service import GeminiService, ROADMAP_PROMPT_VERSION
+from roadmap_store import RoadmapStore, content_digest
+
+
+@pytest.fixture
+def store_path(tmp_path, monkeypatch):
+    path = str(tmp_path / "roadmaps.sqlite3")
+    monkeypatch.setenv("ROADMAP_STORE_PATH", path)
+    return path
+
+
+def test_store_keeps_each_distinct_body_once(store_path):
+    store = RoadmapStore(store_path)
+    digest = store.put("Data Scientists", "12th", ROADMAP_PROMPT_VERSION, "model-a", "# Same plan")
+    assert store.put("Statisticians", "12th", ROADMAP_PROMPT_VERSION, "model-a", "# Same plan") == digest
+    assert digest == content_digest("# Same plan")
+
+    stored_digest, blob = store.get("  data SCIENTISTS ", "12th", ROADMAP_PROMPT_VERSION)
+    assert stored_digest == digest and RoadmapStore.decode(blob) == "# Same plan"
+    assert store.get("Data Scientists", "12th", ROADMAP_PROMPT_VERSION + 1) is None
+
+    store.put("Data Scientists", "12th", ROADMAP_PROMPT_VERSION, "model-a", "# Refreshed plan")
+    assert store.prune() == 0 # still used by Statisticians
+    store.put("Statisticians", "12th", ROADMAP_PROMPT_VERSION, "model-a", "# Refreshed plan")
+    assert store.prune() == 1
+    stats = store.stats()
+    assert stats["entries"] == 2 and stats["objects"] == 1
+
+
+def test_plan_lists_missing_entries_and_refreshes_old_or_other_model_ones(catalog, store_path):
+    store = RoadmapStore(store_path)
+    todo = pregenerate_roadmaps.plan(catalog, store, "model-a", ("10th", "12th"), limit=4)
+    titles = [str(catalog.titles[i]) for i in range(2)]
+    assert todo == [(titles[0], "10th"), (titles[0], "12th"), (titles[1], "10th"), (titles[1], "12th")]
+
+    store.put(titles[0], "10th", ROADMAP_PROMPT_VERSION, "model-a", "# A")
+    store.put(titles[0], "12th", ROADMAP_PROMPT_VERSION, "model-b", "# B")
+    assert pregenerate_roadmaps.plan(catalog, store, "model-a", ("10th", "12th"), limit=1) == [(titles[1], "10th")]
+
+    # Entries made by another model are refreshed; recent ones by this model are kept
+    refresh = pregenerate_roadmaps.plan(catalog, store, "model-a", ("10th", "12th"), refresh_days=1, limit=2)
+    assert refresh == [(titles[0], "12th"), (titles[1], "10th")]
+    # A negative window makes every entry due, even one just made by this model
+    refresh = pregenerate_roadmaps.plan(catalog, store, "model-a", ("10th",), refresh_days=-1, limit=1)
+    assert refresh == [(titles[0], "10th")]
+
+
+def test_generate_stores_roadmaps_and_a_rerun_resumes(catalog, store_path, fake_genai):
+    service = GeminiService()
+    store = RoadmapStore(store_path)
+    todo = pregenerate_roadmaps.plan(catalog, store, service.model_name, ("12th",), limit=3)
+    calls = fake_genai.stats["calls"]
+
+    counts = pregenerate_roadmaps.generate(service, store, todo, rate=1000, workers=2)
+    assert counts == {"stored": 3, "failed": 0, "skipped": 0}
+    assert fake_genai.stats["calls"] - calls == 3
+    for title, level in todo:
+        digest, blob = store.get(title, level, ROADMAP_PROMPT_VERSION)
+        assert digest == content_digest(RoadmapStore.decode(blob))
+
+    rerun = pregenerate_roadmaps.plan(catalog, store, service.model_name, ("12th",), limit=3)
+    assert not set(rerun) & set(todo)
+
+
+class BrokenModel:
+    model_name = "broken"
+
+    def generate_content(self, prompt, **kwargs):
+        raise RuntimeError("bad request") # not retried, counted by the breaker
+
+
+def test_generate_stops_once_the_circuit_opens(catalog, store_path, fake_genai, monkeypatch):
+    monkeypatch.setenv("CIRCUIT_MIN_CALLS", "2")
+    service = GeminiService()
+    service.model = BrokenModel()
+    store = RoadmapStore(store_path)
+    todo = pregenerate_roadmaps.plan(catalog, store, service.model_name, ("12th",), limit=6)
+
+    counts = pregenerate_roadmaps.generate(service, store, todo, rate=1000, workers=1)
+    assert counts["stored"] == 0 and counts["failed"] == 2 and counts["skipped"] == 4
+    assert store.stats()["entries"] == 0
+
+
+def test_pregenerated_roadmap_is_served_with_etag_and_revalidated(catalog, store_path, fake_genai, monkeypatch):
+    code = "15-1252.00"
+    title = str(catalog.titles[catalog.index_of(code)])
+    store = RoadmapStore(store_path)
+    counts = pregenerate_roadmaps.generate(GeminiService(), store, [(title, "12th")], rate=1000, workers=1)
+    assert counts["stored"] == 1
+    digest, blob = store.get(title, "12th", ROADMAP_PROMPT_VERSION)
+
+    # Served by a server without an API key: the stored roadmap, not the static fallback
+    monkeypatch.setenv("GEMINI_API_KEY", "")
+    monkeypatch.setattr(main, "catalog", catalog)
+    monkeypatch.setattr(main, "warmup", None)
+    monkeypatch.setattr(main, "gemini_service", GeminiService())
+    client = TestClient(main.app)
+    calls = fake_genai.stats["calls"]
+
+    response = client.get(f"/roadmap/{code}", params={"level": "12th"})
+    assert response.status_code == 200
+    assert response.json() == {"roadmap": RoadmapStore.decode(blob)}
+    assert response.headers["etag"] == f'"{digest}"'
+    assert response.headers["cache-control"] == "public, no-cache"
+
+    for tag in (f'"{digest}"', f'W/"{digest}"', f'"other", "{digest}"', "*"):
+        revalidated = client.get(f"/roadmap/{code}", params={"level": "12th"}, headers={"If-None-Match": tag})
+        assert revalidated.status_code == 304 and revalidated.content == b""
+        assert revalidated.headers["etag"] == f'"{digest}"'
+    stale = client.get(f"/roadmap/{code}", params={"level": "12th"}, headers={"If-None-Match": '"other"'})
+    assert stale.status_code == 200 and stale.json()["roadmap"] == RoadmapStore.decode(blob)
+    assert fake_genai.stats["calls"] == calls # nothing generated while serving
+
+    # Another level was not pre-generated: generated (here: the static roadmap) with its own digest
+    live = client.get(f"/roadmap/{code}", params={"level": "10th"})
+    assert live.status_code == 200
+    assert live.headers["etag"] == f'"{content_digest(live.json()["roadmap"])}"' != f'"{digest}"'
+    assert client.get("/roadmap/00-0000.00", params={"level": "12th"}).status_code == 404
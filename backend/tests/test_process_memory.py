@@ -0,0 +1,28 @@
+import os
+
+import numpy as np
+import pytest
+
+import process_memory as memory
+
+
+def test_reports_pid_and_private_growth():
+    before = memory.process_memory()
+    assert before["pid"] == os.getpid()
+    if not os.path.exists(memory.SMAPS_ROLLUP):
+        pytest.skip("smaps_rollup is Linux-only")
+
+    assert set(memory._FIELDS.values()) <= set(before)
+    assert before["pss_mb"] <= before["rss_mb"]
+    block = np.ones(64 * 2**20, dtype=np.uint8) # 64 MiB written by this process alone
+    after = memory.process_memory()
+    assert after["private_dirty_mb"] - before["private_dirty_mb"] >= 60
+    del block
+
+
+def test_falls_back_to_peak_rss_without_smaps(monkeypatch):
+    monkeypatch.setattr(memory, "SMAPS_ROLLUP", "/nonexistent/smaps_rollup")
+    stats = memory.process_memory()
+    assert "rss_mb" not in stats
+    if os.name == "posix":
+        assert stats["peak_rss_mb"] > 0
@@ -0,0 +1,49 @@
+import time
+import types
+
+import numpy as np
+
+import query_cache
+from query_cache import QueryEmbeddingCache
+
+
+def test_keys_collapse_whitespace_but_keep_case():
+    cache = QueryEmbeddingCache()
+    cache.put("Skills:  IT\tsupport ", [1.0, 0.0])
+
+    np.testing.assert_array_equal(cache.get("Skills: IT support"), [1.0, 0.0])
+    assert cache.get("skills: it support") is None
+    assert "Skills: IT support" in cache and cache.stats() == {"entries": 1, "hits": 1, "misses": 1, "hit_rate": 0.5}
+
+
+def test_lru_evicts_and_ttl_expires(monkeypatch):
+    cache = QueryEmbeddingCache(max_entries=2, ttl_seconds=60)
+    cache.put("a", [1.0])
+    cache.put("b", [2.0])
+    assert cache.get("a") is not None # "b" is now least recently used
+    cache.put("c", [3.0])
+    assert "b" not in cache and "a" in cache and "c" in cache
+
+    cache.put("", []) # failed embeddings are not cached
+    assert len(cache) == 2
+    later = time.time() + 61
+    monkeypatch.setattr(query_cache, "time", types.SimpleNamespace(time=lambda: later))
+    assert cache.get("a") is None and len(cache) == 1
+
+
+def test_persisted_entries_survive_a_restart_for_the_same_model(tmp_path):
+    path = str(tmp_path / "query_embeddings.npz")
+    cache = QueryEmbeddingCache(path=path, model="model-a")
+    cache.put("Data Science", [0.5, 0.5])
+    cache.save()
+
+    np.testing.assert_array_equal(QueryEmbeddingCache(path=path, model="model-a").get("Data Science"), [0.5, 0.5])
+    assert len(QueryEmbeddingCache(path=path, model="model-b")) == 0
+
+
+def test_files_with_case_folded_keys_are_discarded(tmp_path):
+    path = str(tmp_path / "query_embeddings.npz")
+    # Written before keys kept their case: "data science" may hold the embedding of "Data Science"
+    np.savez(path, model=np.array("model-a"), keys=np.array(["data science"]),
+             created_at=np.array([1e12]), vectors=np.ones((1, 2), dtype=np.float32))
+    assert len(QueryEmbeddingCache(path=path, model="model-a")) == 0
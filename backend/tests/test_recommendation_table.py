@@ -0,0 +1,91 @@
+import json
+import types
+
+import numpy as np
+import pytest
+
+from job_matcher import JobMatcher, ScoringConfig
+from recommendation_table import RecommendationTable
+
+
+def _profile(goal="Money", mbti="INTJ", riasec="I", cognitive=None, domain=None, education="12th"):
+    return types.SimpleNamespace(life_goal=goal, mbti_code=mbti, riasec_code=riasec, education_level=education,
+                                 domain_interest=domain, cognitive_scores=cognitive)
+
+
+@pytest.fixture(scope="module")
+def matcher(catalog):
+    return JobMatcher(catalog)
+
+
+@pytest.fixture(scope="module")
+def table(matcher):
+    return RecommendationTable.build(matcher, semantic=False)
+
+
+def test_lookup_equals_live_rank(matcher, table):
+    rng = np.random.default_rng(0)
+    axes = table.axes
+    for _ in range(150):
+        cognitive = None if rng.random() < 0.3 else {
+            "reaction_time": int(rng.integers(120, 420)),
+            "number_memory": int(rng.integers(2, 16)),
+            "verbal_memory": int(rng.integers(5, 95))
+        }
+        profile = _profile(str(rng.choice(axes["goals"])), str(rng.choice(axes["mbti"])),
+                           str(rng.choice(axes["riasec"])), cognitive, education=str(rng.choice(["10th", "Undergrad"])))
+        live = json.loads(json.dumps(matcher._rank(profile, None, [])))
+        assert table.lookup(profile, matcher._cognitive_buckets) == live
+
+
+def test_uncovered_profiles_are_scored_live(matcher, table, monkeypatch):
+    monkeypatch.setattr(matcher, "table", table)
+    assert table.lookup(_profile(mbti="intj"), matcher._cognitive_buckets) is None # not canonical
+    assert table.lookup(_profile(goal="Wealth"), matcher._cognitive_buckets) is None
+    assert table.lookup(_profile(cognitive={"reaction_time": "fast"}), matcher._cognitive_buckets) is None
+
+    assert matcher._table_lookup(_profile(), None) is not None
+    assert matcher._table_lookup(_profile(domain="Data Science", education="Undergrad"), None) is None
+    assert matcher._table_lookup(_profile(), ["python"]) is None
+    # A rule-based table must not answer once semantic search is available
+    monkeypatch.setattr(matcher, "_semantic_available", lambda: True)
+    assert matcher._table_lookup(_profile(), None) is None
+
+
+def test_fingerprint_tracks_scoring_and_rules(matcher, table, monkeypatch):
+    assert RecommendationTable.make_fingerprint(matcher, False) == table.fingerprint
+    monkeypatch.setattr(matcher, "scoring", ScoringConfig(keyword_weight=0.75))
+    assert RecommendationTable.make_fingerprint(matcher, False) != table.fingerprint
+    monkeypatch.undo()
+
+    monkeypatch.setattr(matcher.facet_scores, "fingerprint", "other-mappings")
+    assert RecommendationTable.make_fingerprint(matcher, False) != table.fingerprint
+
+
+def test_saved_table_is_reused_until_stale(tmp_path, matcher, table, monkeypatch):
+    path = str(tmp_path / "recommendation_table.npz")
+    table.save(path)
+
+    def no_build(*args, **kwargs):
+        raise AssertionError("rebuilt although the saved table is current")
+    with monkeypatch.context() as m:
+        m.setattr(RecommendationTable, "build", no_build)
+        loaded = RecommendationTable.for_matcher(matcher, False, path)
+    np.testing.assert_array_equal(loaded.indices, table.indices)
+    assert loaded.lookup(_profile(), matcher._cognitive_buckets) == table.lookup(_profile(), matcher._cognitive_buckets)
+
+    # Another fingerprint (changed scoring, mappings, data or embeddings): not loaded, rebuilt
+    assert RecommendationTable.load(path, matcher.catalog, "stale") is None
+    monkeypatch.setattr(matcher, "scoring", ScoringConfig(limit=5))
+    rebuilt = RecommendationTable.for_matcher(matcher, False, path)
+    assert rebuilt.indices.shape[1] == 5
+    assert RecommendationTable.load(path, matcher.catalog, rebuilt.fingerprint) is not None
+
+
+def test_materialize_failure_falls_back_to_live_scoring(matcher, monkeypatch):
+    def broken(*args, **kwargs):
+        raise RuntimeError("query embeddings unavailable")
+    monkeypatch.setattr(RecommendationTable, "for_matcher", broken)
+    monkeypatch.setattr(matcher, "table", None)
+    assert matcher.materialize_table() is None
+    assert matcher.recommend(_profile()) == matcher._rank(_profile(), None, [])
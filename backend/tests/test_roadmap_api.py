@@ -0,0 +1,106 @@
+import json
+import types
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from gemini_service import GeminiService, ROADMAP_PROMPT_VERSION
+from roadmap_generator import RoadmapGenerator
+
+CODE = "15-1252.00"
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch, catalog):
+    monkeypatch.setenv("ROADMAP_STORE_PATH", str(tmp_path / "roadmap_store.sqlite3"))
+    service = GeminiService() # no API key: static roadmaps unless pre-generated
+    monkeypatch.setattr(main, "catalog", catalog)
+    monkeypatch.setattr(main, "warmup", None)
+    monkeypatch.setattr(main, "gemini_service", service)
+    return TestClient(main.app), service
+
+
+def test_get_roadmap_revalidates_with_304(client):
+    client, _ = client
+    first = client.get(f"/roadmap/{CODE}", params={"level": "12th"})
+    assert first.status_code == 200 and first.json()["roadmap"]
+    etag = first.headers["etag"]
+    assert "no-cache" in first.headers["cache-control"]
+
+    again = client.get(f"/roadmap/{CODE}", params={"level": "12th"}, headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.content == b""
+    assert again.headers["etag"] == etag
+
+    other = client.get(f"/roadmap/{CODE}", params={"level": "12th"}, headers={"If-None-Match": '"stale"'})
+    assert other.status_code == 200 and other.headers["etag"] == etag
+
+
+def test_get_serves_pre_generated_roadmap(client, catalog):
+    client, service = client
+    title = str(catalog.titles[catalog.index_of(CODE)])
+    digest = service.roadmap_store.put(title, "Undergrad", ROADMAP_PROMPT_VERSION, "test-model", "# Stored roadmap")
+
+    response = client.get(f"/roadmap/{CODE}", params={"level": "Undergrad"})
+    assert response.json() == {"roadmap": "# Stored roadmap"}
+    assert response.headers["etag"] == f'"{digest}"'
+    revalidated = client.get(f"/roadmap/{CODE}", params={"level": "Undergrad"},
+                             headers={"If-None-Match": f'W/"{digest}"'})
+    assert revalidated.status_code == 304
+
+
+def test_post_roadmap_is_never_conditional(client):
+    client, _ = client
+    etag = client.get(f"/roadmap/{CODE}", params={"level": "12th"}).headers["etag"]
+    response = client.post("/roadmap", json={"onet_code": CODE, "title": "Software Developers", "education_level": "12th"},
+                           headers={"If-None-Match": etag})
+    assert response.status_code == 200 and response.json()["roadmap"]
+    assert "etag" not in response.headers
+
+
+def test_get_unknown_code_is_404(client):
+    client, _ = client
+    assert client.get("/roadmap/00-0000.99", params={"level": "12th"}).status_code == 404
+
+
+class FailingStreamModel:
+    """Streams `chunks`, then the connection breaks."""
+
+    model_name = "failing-stream-model"
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    async def generate_content_async(self, prompt, safety_settings=None, request_options=None, stream=False):
+        async def stream():
+            for text in self.chunks:
+                yield types.SimpleNamespace(text=text)
+            raise ConnectionResetError("stream reset")
+        return stream()
+
+
+def _events(response) -> list[tuple]:
+    events = []
+    for block in response.text.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((fields.get("event", "message"), json.loads(fields["data"])))
+    return events
+
+
+@pytest.mark.parametrize("chunks", [["# Roadmap\n", "## Phase 1\n"], []])
+def test_stream_failure_is_an_error_event_or_the_static_roadmap(client, monkeypatch, fake_genai, chunks):
+    client, _ = client
+    service = GeminiService()
+    service.model = FailingStreamModel(chunks)
+    monkeypatch.setattr(main, "gemini_service", service)
+
+    body = {"onet_code": CODE, "title": "Software Developers", "education_level": "12th"}
+    events = _events(client.post("/roadmap/stream", json=body))
+    if chunks:
+        # Part of the roadmap was sent: the client is told it is incomplete
+        assert events == [("message", {"text": text}) for text in chunks] + [("error", {"detail": "stream reset"})]
+    else:
+        # Failed before the first chunk: the static roadmap is streamed instead
+        assert events[-1] == ("done", {})
+        assert "".join(data["text"] for _, data in events[:-1]) == RoadmapGenerator.generate(
+            CODE, "Software Developers", "12th")
@@ -0,0 +1,75 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from job_matcher import JobMatcher
+from rule_scores import FacetRuleScores
+
+
+@pytest.fixture(scope="module")
+def index_and_mappings(catalog):
+    return JobMatcher.build_keyword_index(catalog), JobMatcher._initialize_mappings()
+
+
+def _live_count(scores, facets, exclude=()):
+    keywords = set().union(*(scores.keywords[f] for f in facets)) - {k.lower() for k in exclude}
+    return scores.keyword_index.count(keywords)
+
+
+def test_shared_keywords_are_counted_once(index_and_mappings, catalog):
+    keyword_index, mappings = index_and_mappings
+    scores = FacetRuleScores(keyword_index, mappings, catalog.content_hash)
+
+    overlapping = [
+        (a, b) for a, b in itertools.combinations(scores.keywords, 2)
+        if a[0] != b[0] and scores.keywords[a] & scores.keywords[b]
+        and keyword_index.count(scores.keywords[a] & scores.keywords[b]).any()
+    ]
+    assert overlapping, "mappings no longer share keywords between facets"
+    for facets in overlapping[:25]:
+        np.testing.assert_array_equal(scores.count(facets), _live_count(scores, facets))
+        np.testing.assert_array_equal(scores.count(facets + facets[:1]), _live_count(scores, facets))
+
+    # Excluded keywords (domain keywords) are removed once, however many facets carry them
+    facets = overlapping[0]
+    shared = sorted(scores.keywords[facets[0]] & scores.keywords[facets[1]])
+    exclude = shared[:1] + ["not-a-rule-keyword"]
+    np.testing.assert_array_equal(scores.count(facets, exclude=exclude), _live_count(scores, facets, exclude))
+
+
+def test_profile_counts_match_keyword_scan(index_and_mappings, catalog):
+    keyword_index, mappings = index_and_mappings
+    scores = FacetRuleScores(keyword_index, mappings, catalog.content_hash)
+    for goal, mbti, riasec in itertools.islice(
+            itertools.product(mappings["goals"], mappings["mbti"], mappings["riasec"]), 0, None, 37):
+        facets = (("mbti", mbti), ("riasec", riasec), ("goals", goal), ("cognitive", "fast_reaction"))
+        np.testing.assert_array_equal(scores.count(facets), _live_count(scores, facets))
+
+
+def test_vectors_are_cached_under_a_fingerprint(tmp_path, monkeypatch, index_and_mappings, catalog):
+    keyword_index, mappings = index_and_mappings
+    path = str(tmp_path / "rule_vectors.npz")
+    built = FacetRuleScores(keyword_index, mappings, catalog.content_hash, path=path)
+    assert (tmp_path / "rule_vectors.npz").exists()
+
+    def no_build(self):
+        raise AssertionError("rebuilt although the cache matches")
+    with monkeypatch.context() as m:
+        m.setattr(FacetRuleScores, "_build", no_build)
+        loaded = FacetRuleScores(keyword_index, mappings, catalog.content_hash, path=path)
+    assert set(loaded.vectors) == set(built.vectors)
+    for facet, vector in built.vectors.items():
+        np.testing.assert_array_equal(loaded.vectors[facet], vector)
+
+    # Changed mappings or data: a different fingerprint, so the vectors are rebuilt and re-saved
+    changed = dict(mappings, goals=dict(mappings["goals"], Money=["finance"]))
+    rebuilt = FacetRuleScores(keyword_index, changed, catalog.content_hash, path=path)
+    assert rebuilt.fingerprint != built.fingerprint
+    np.testing.assert_array_equal(rebuilt.vectors[("goals", "Money")], keyword_index.count(["finance"]))
+    assert FacetRuleScores(keyword_index, mappings, "other-data", path=path).fingerprint != rebuilt.fingerprint
+
+    # An unreadable file is rebuilt rather than trusted
+    (tmp_path / "rule_vectors.npz").write_bytes(b"garbage")
+    recovered = FacetRuleScores(keyword_index, mappings, catalog.content_hash, path=path)
+    np.testing.assert_array_equal(recovered.vectors[("goals", "Money")], built.vectors[("goals", "Money")])
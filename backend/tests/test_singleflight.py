@@ -0,0 +1,159 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from singleflight import SingleFlight
+
+
+class Upstream:
+    """A call that blocks until released, counting how often it really runs."""
+
+    def __init__(self, result="value", error=None):
+        self.result, self.error = result, error
+        self.calls = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        self.started.set()
+        assert self.release.wait(5)
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+    async def run_async(self):
+        self.calls += 1
+        self.started.set()
+        while not self.release.is_set():
+            await asyncio.sleep(0.001)
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+def _wait_for_joiners(flights: SingleFlight, count: int):
+    for _ in range(5000):
+        if flights.coalesced >= count:
+            return
+        threading.Event().wait(0.001)
+    raise AssertionError(f"only {flights.coalesced} of {count} callers joined")
+
+
+def test_sync_callers_share_one_call():
+    flights, upstream = SingleFlight(), Upstream()
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        futures = [pool.submit(flights.do, "key", upstream) for _ in range(4)]
+        _wait_for_joiners(flights, 3)
+        upstream.release.set()
+        assert [f.result() for f in futures] == ["value"] * 4
+    assert upstream.calls == 1 and flights.in_flight() == 0
+
+
+def test_sync_error_reaches_every_caller_and_is_not_cached():
+    flights, upstream = SingleFlight(), Upstream(error=ValueError("upstream failed"))
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        futures = [pool.submit(flights.do, "key", upstream) for _ in range(3)]
+        _wait_for_joiners(flights, 2)
+        upstream.release.set()
+        for future in futures:
+            with pytest.raises(ValueError, match="upstream failed"):
+                future.result()
+    assert upstream.calls == 1 and flights.in_flight() == 0
+    assert flights.do("key", lambda: "retried") == "retried"
+
+
+def test_async_callers_share_one_call_and_its_error():
+    async def run(upstream):
+        flights = SingleFlight()
+        tasks = [asyncio.ensure_future(flights.do_async("key", upstream.run_async)) for _ in range(5)]
+        await asyncio.sleep(0.01)
+        assert flights.coalesced == 4
+        upstream.release.set()
+        return await asyncio.gather(*tasks, return_exceptions=True)
+
+    upstream = Upstream()
+    assert asyncio.run(run(upstream)) == ["value"] * 5 and upstream.calls == 1
+
+    upstream = Upstream(error=RuntimeError("boom"))
+    results = asyncio.run(run(upstream))
+    assert upstream.calls == 1 and all(isinstance(r, RuntimeError) for r in results)
+
+
+def test_cancelled_waiter_does_not_cancel_the_shared_call():
+    async def run():
+        flights, upstream = SingleFlight(), Upstream()
+        leader = asyncio.ensure_future(flights.do_async("key", upstream.run_async))
+        follower = asyncio.ensure_future(flights.do_async("key", upstream.run_async))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        upstream.release.set()
+        return await follower, upstream.calls
+
+    assert asyncio.run(run()) == ("value", 1)
+
+
+def test_sync_caller_joins_async_call():
+    flights, upstream = SingleFlight(), Upstream()
+
+    async def run():
+        leader = asyncio.ensure_future(flights.do_async("key", upstream.run_async))
+        await asyncio.sleep(0.01)
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            joiner = pool.submit(flights.do, "key", upstream)
+            while flights.coalesced < 1:
+                await asyncio.sleep(0.001)
+            upstream.release.set()
+            return await leader, joiner.result(timeout=5)
+
+    assert asyncio.run(run()) == ("value", "value")
+    assert upstream.calls == 1
+
+
+def test_async_caller_joins_sync_call_and_its_error():
+    flights, upstream = SingleFlight(), Upstream(error=KeyError("missing"))
+
+    async def run():
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            leader = pool.submit(flights.do, "key", upstream)
+            assert await asyncio.to_thread(upstream.started.wait, 5)
+            joiner = asyncio.ensure_future(flights.do_async("key", upstream.run_async))
+            await asyncio.sleep(0.01)
+            upstream.release.set()
+            with pytest.raises(KeyError):
+                await joiner
+            with pytest.raises(KeyError):
+                leader.result(timeout=5)
+
+    asyncio.run(run())
+    assert upstream.calls == 1 and flights.coalesced == 1
+
+
+def test_stream_is_shared_and_outlives_an_abandoned_reader():
+    produced = []
+
+    async def produce(emit, release):
+        for chunk in ("a", "b", "c"):
+            produced.append(chunk)
+            emit(chunk)
+            await release.wait()
+        raise RuntimeError("reset")
+
+    async def run():
+        flights, release = SingleFlight(), asyncio.Event()
+        leader = flights.stream_async("key", produce, release)
+        assert await leader.__anext__() == "a"
+        await leader.aclose() # the first client disconnects
+        follower = flights.stream_async("key", produce, release)
+        assert await follower.__anext__() == "a" # replayed from the start
+        release.set()
+        rest = []
+        with pytest.raises(RuntimeError, match="reset"):
+            async for chunk in follower:
+                rest.append(chunk)
+        return rest, flights.coalesced, flights.in_flight()
+
+    assert asyncio.run(run()) == (["b", "c"], 1, 0)
+    assert produced == ["a", "b", "c"]
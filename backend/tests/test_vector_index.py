@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from embedding_file import matrix_digest
+from vector_index import ExactIndex, IVFIndex, IndexFileError, QuantizedIndex, l2_normalize, recall_at_k
+
+
+def _clustered(rows=4000, dim=64, seed=0):
+    """Normalized rows around a few hundred centres, like job embeddings; plus nearby queries."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((rows // 20, dim)).astype(np.float32)
+    vectors = l2_normalize(centers[rng.integers(0, len(centers), rows)] + 0.5 * rng.standard_normal((rows, dim)))
+    queries = l2_normalize(vectors[rng.choice(rows, 64, replace=False)] + 0.3 * rng.standard_normal((64, dim)))
+    return vectors, queries
+
+
+def test_quantized_rerank_matches_exact_search():
+    vectors, queries = _clustered()
+    exact_scores, exact_indices = ExactIndex(vectors).search(queries, 10)
+    index = QuantizedIndex.build(vectors, rerank_factor=4)
+    scores, indices = index.search(queries, 10)
+
+    assert recall_at_k(indices, exact_indices) >= 0.99
+    # Re-ranked scores are exact, not int8 approximations
+    np.testing.assert_allclose(scores, np.take_along_axis(queries @ vectors.T, indices, axis=1), rtol=1e-5)
+    np.testing.assert_allclose(scores[:, 0], exact_scores[:, 0], rtol=1e-5)
+    # Without re-ranking room the int8 first pass alone decides, and recall drops
+    assert recall_at_k(QuantizedIndex.build(vectors, rerank_factor=1).search(queries, 10)[1], exact_indices) < 1.0
+
+
+def test_saved_quantized_index_is_bound_to_its_matrix(tmp_path):
+    vectors, _ = _clustered(rows=500)
+    path = str(tmp_path / "emb.bin.int8.npz")
+    QuantizedIndex.build(vectors).save(path, data_hash="data", model="model", embeddings_digest=matrix_digest(vectors))
+
+    loaded = QuantizedIndex.load(path, vectors, data_hash="data", model="model", embeddings_digest=matrix_digest(vectors))
+    np.testing.assert_array_equal(loaded.codes, QuantizedIndex.build(vectors).codes)
+
+    # Same data, model and row count but other rows (a rewritten embedding file)
+    refilled = l2_normalize(vectors[::-1].copy())
+    with pytest.raises(IndexFileError, match="different embedding matrix"):
+        QuantizedIndex.load(path, refilled, data_hash="data", model="model", embeddings_digest=matrix_digest(refilled))
+    with pytest.raises(IndexFileError, match="different job data"):
+        QuantizedIndex.load(path, vectors, data_hash="other", model="model", embeddings_digest=matrix_digest(vectors))
+
+
+def test_ivf_recall_grows_with_nprobe_and_full_probe_is_exact():
+    vectors, queries = _clustered()
+    exact_scores, exact_indices = ExactIndex(vectors).search(queries, 10)
+    index = IVFIndex.build(vectors, n_lists=64, nprobe=8)
+
+    assert np.diff(index.list_offsets).sum() == len(vectors)
+    assert np.array_equal(np.sort(index.list_ids), np.arange(len(vectors)))
+    recalls = [recall_at_k(index.search(queries, 10, nprobe=n)[1], exact_indices) for n in (1, 16, 64)]
+    assert recalls[0] <= recalls[1] <= recalls[2] == 1.0
+    assert recalls[1] >= 0.9
+    np.testing.assert_allclose(index.search(queries, 10, nprobe=64)[0], exact_scores, rtol=1e-5)
+
+
+def test_saved_ivf_index_is_bound_to_its_matrix(tmp_path):
+    vectors, queries = _clustered(rows=1000)
+    path = str(tmp_path / "emb.bin.ivf.npz")
+    built = IVFIndex.build(vectors, n_lists=16)
+    built.save(path, data_hash="data", model="model", embeddings_digest=matrix_digest(vectors))
+
+    loaded = IVFIndex.load(path, vectors, data_hash="data", model="model", embeddings_digest=matrix_digest(vectors),
+                           nprobe=4)
+    assert loaded.nprobe == 4
+    np.testing.assert_array_equal(loaded.search(queries, 5)[1], built.search(queries, 5, nprobe=4)[1])
+
+    refilled = l2_normalize(vectors[::-1].copy())
+    with pytest.raises(IndexFileError, match="different embedding matrix"):
+        IVFIndex.load(path, refilled, data_hash="data", model="model", embeddings_digest=matrix_digest(refilled))
+    with pytest.raises(IndexFileError, match="rows"):
+        IVFIndex.load(path, vectors[:10], data_hash="data", model="model")
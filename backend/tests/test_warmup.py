@@ -0,0 +1,119 @@
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from warmup import Warmup
+
+
+def _recorder(events, name, seconds=0.0, error=None):
+    def run():
+        events.append(("start", name))
+        time.sleep(seconds)
+        events.append(("end", name))
+        if error is not None:
+            raise error
+    return run
+
+
+def test_components_start_once_their_dependencies_are_ready():
+    events = []
+    plan = (
+        Warmup(max_workers=4)
+        .add("catalog", _recorder(events, "catalog", 0.05))
+        .add("ai_client", _recorder(events, "ai_client", 0.05))
+        .add("matcher", _recorder(events, "matcher"), deps=("catalog", "ai_client"))
+        .add("embeddings", _recorder(events, "embeddings"), deps=("matcher",), required=False)
+    )
+    assert not plan.is_ready # not started
+    assert plan.start().wait(5) and plan.is_ready
+
+    # Independent components overlap; dependants start after all their dependencies ended
+    assert {events[0], events[1]} == {("start", "catalog"), ("start", "ai_client")}
+    assert events.index(("start", "matcher")) > max(events.index(("end", "catalog")), events.index(("end", "ai_client")))
+    assert events.index(("start", "embeddings")) > events.index(("end", "matcher"))
+    assert plan.summary() == dict.fromkeys(("catalog", "ai_client", "matcher", "embeddings"), "ready")
+
+
+def test_failures_skip_dependants_and_only_required_components_gate_readiness():
+    plan = (
+        Warmup()
+        .add("catalog", lambda: None)
+        .add("query_cache", _recorder([], "query_cache", error=RuntimeError("quota")), required=False)
+        .add("table", lambda: None, deps=("query_cache",), required=False)
+        .add("orphan", lambda: None, deps=("missing",), required=False)
+    )
+    plan.start().wait(5)
+    assert plan.is_ready
+    status = plan.status()["components"]
+    assert status["query_cache"]["status"] == "failed" and status["query_cache"]["error"] == "quota"
+    assert status["table"] == {"status": "skipped", "required": False, "duration": None, "error": "dependency failed"}
+    assert status["orphan"]["error"] == "unknown dependency"
+
+    failing = Warmup().add("catalog", _recorder([], "catalog", error=RuntimeError("no data"))).start()
+    assert not failing.wait_required(5) and not failing.is_ready
+
+
+def test_wait_for_returns_when_that_component_is_done():
+    release = threading.Event()
+    plan = Warmup().add("fast", lambda: None).add("slow", lambda: release.wait(5)).start()
+    assert plan.wait_for("fast", 5)
+    assert not plan.wait_for("slow", 0.05) # still running
+    release.set()
+    assert plan.wait_for("slow", 5) and plan.wait(5)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(main, "warmup", None)
+    return TestClient(main.app)
+
+
+def test_ready_is_503_with_progress_until_required_components_are_ready(client, monkeypatch):
+    release = threading.Event()
+    plan = (
+        Warmup()
+        .add("catalog", lambda: None)
+        .add("matcher", lambda: release.wait(5), deps=("catalog",))
+        .add("embeddings", lambda: None, deps=("matcher",), required=False,
+             progress=lambda: {"done": 10, "total": 20})
+    )
+    monkeypatch.setattr(main, "warmup", plan.start())
+    plan.wait_for("catalog", 5)
+
+    response = client.get("/ready")
+    assert response.status_code == 503
+    body = response.json()
+    assert body["ready"] is False and body["mode"] == main.WARMUP_MODE
+    assert body["components"]["matcher"]["status"] == "running"
+    assert body["components"]["embeddings"] == {"status": "pending", "required": False, "duration": None,
+                                                 "done": 10, "total": 20}
+
+    release.set()
+    plan.wait(5)
+    response = client.get("/ready")
+    assert response.status_code == 200 and response.json()["ready"] is True
+
+
+def test_ready_without_warm_up_reflects_the_catalog(client, monkeypatch, catalog):
+    monkeypatch.setattr(main, "catalog", catalog)
+    assert client.get("/ready").status_code == 200
+    monkeypatch.setattr(main, "catalog", None)
+    assert client.get("/ready").status_code == 503
+
+
+def test_preload_builds_shared_state_without_threads_or_clients(monkeypatch):
+    for name in ("catalog", "shared_keyword_index", "gemini_service", "job_matcher"):
+        monkeypatch.setattr(main, name, None)
+    threads = threading.active_count()
+
+    main.preload()
+    # Threads and API clients would not survive the fork into workers
+    assert threading.active_count() == threads and main.gemini_service is None
+    assert len(main.catalog) and main.shared_keyword_index is not None
+
+    main._init_job_matcher() # in a worker, after the fork
+    assert main.job_matcher.keyword_index is main.shared_keyword_index
+    main.job_matcher.vector_store.init_thread.join()
@@ -0,0 +1,348 @@
+"""
+Nearest-neighbour indexes over the L2-normalized job embedding matrix.
+
+Every index answers `search(queries, top_k)` with (scores, indices) arrays of
+shape (n_queries, top_k), best first, scored by cosine similarity (dot product
+of normalized vectors). Slots without a candidate hold index -1 and score -inf.
+
+    ExactIndex     - brute-force GEMM over all rows (exact, the default)
+    QuantizedIndex - brute force over int8 codes, exact re-rank of the shortlist
+                     from the full-precision matrix (4x less memory per process)
+    IVFIndex   - inverted file: spherical k-means coarse quantizer, only the
+                 `nprobe` closest lists are scanned (approximate, sub-linear)
+"""
+
+import json
+import logging
+import os
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+INDEX_FORMAT_VERSION = 1
+
+
+def l2_normalize(matrix) -> np.ndarray:
+    """
+    Row-wise L2 normalization to float32. All-zero rows (failed embeddings) stay zero.
+    """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def top_k_indices(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """
+    Indices of the `top_k` highest scores along the last axis, best first.
+    Uses argpartition so only the shortlist is sorted.
+    """
+    n = scores.shape[-1]
+    if top_k >= n:
+        return np.argsort(-scores, axis=-1)
+    part = np.argpartition(-scores, top_k - 1, axis=-1)[..., :top_k]
+    order = np.argsort(-np.take_along_axis(scores, part, axis=-1), axis=-1)
+    return np.take_along_axis(part, order, axis=-1)
+
+
+def recall_at_k(approx_indices: np.ndarray, exact_indices: np.ndarray) -> float:
+    """
+    Mean fraction of the exact top-k that the approximate top-k recovered.
+    """
+    hits = [
+        len(set(a[a >= 0].tolist()) & set(e[e >= 0].tolist())) / max(1, int((e >= 0).sum()))
+        for a, e in zip(approx_indices, exact_indices)
+    ]
+    return float(np.mean(hits)) if hits else 0.0
+
+
+def block_scores(queries: np.ndarray, matrix: np.ndarray, scales: np.ndarray = None,
+                 block_rows: int = 256) -> np.ndarray:
+    """
+    queries @ matrix.T (times a per-row scale) for a matrix in a compact dtype.
+    numpy has no int8/float16 GEMM, so rows are widened `block_rows` at a time
+    into one small float32 buffer that stays in cache and scored with float32
+    BLAS; a widened copy of the whole matrix never exists.
+    """
+    n = len(matrix)
+    scores = np.empty((len(queries), n), dtype=np.float32)
+    buffer = np.empty((min(block_rows, n), matrix.shape[1]), dtype=np.float32)
+    for start in range(0, n, block_rows):
+        block = buffer[:min(block_rows, n - start)]
+        np.copyto(block, matrix[start:start + len(block)], casting="unsafe")
+        np.matmul(queries, block.T, out=scores[:, start:start + len(block)])
+    if scales is not None:
+        scores *= scales
+    return scores
+
+
+class IndexFileError(ValueError):
+    """Raised when a saved index does not match the current embeddings."""
+
+
+def _write_index(path: str, kind: str, rows: int, data_hash: str, model: str, embeddings_digest: str, **arrays):
+    meta = {
+        "format_version": INDEX_FORMAT_VERSION, "kind": kind, "rows": rows, "data_hash": data_hash,
+        "model": model, "embeddings_digest": embeddings_digest, "created_at": time.time()
+    }
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        np.savez(f, meta=np.array(json.dumps(meta)), **arrays)
+    os.replace(tmp_path, path)
+
+
+def _read_index(path: str, kind: str, vectors: np.ndarray, data_hash: str, model: str, embeddings_digest: str,
+                names: tuple) -> dict:
+    """
+    The arrays `names` of a saved index. Raises IndexFileError if the file was built
+    for other data, another model, another row count or another embedding matrix
+    (`embeddings_digest`, see embedding_file.matrix_digest).
+    """
+    with np.load(path, allow_pickle=False) as data:
+        meta = json.loads(str(data["meta"]))
+        if meta.get("format_version") != INDEX_FORMAT_VERSION or meta.get("kind") != kind:
+            raise IndexFileError(f"Unsupported index file {path}")
+        if meta.get("rows") != len(vectors):
+            raise IndexFileError(f"Index has {meta.get('rows')} rows, embeddings have {len(vectors)}")
+        if data_hash and meta.get("data_hash") != data_hash:
+            raise IndexFileError("Index was built for different job data")
+        if model and meta.get("model") != model:
+            raise IndexFileError(f"Index was built for model {meta.get('model')}")
+        if embeddings_digest and meta.get("embeddings_digest") != embeddings_digest:
+            raise IndexFileError("Index was built from a different embedding matrix")
+        return {name: data[name] for name in names}
+
+
+class ExactIndex:
+    kind = "exact"
+
+    def __init__(self, vectors: np.ndarray):
+        self.vectors = vectors
+
+    def __len__(self):
+        return len(self.vectors)
+
+    def search(self, queries: np.ndarray, top_k: int):
+        scores = queries @ self.vectors.T
+        indices = top_k_indices(scores, top_k)
+        return np.take_along_axis(scores, indices, axis=-1), indices
+
+    def params(self) -> dict:
+        return {"kind": self.kind, "rows": len(self)}
+
+
+class IVFIndex:
+    """
+    Inverted-file index. Rows are assigned to the closest of `n_lists` centroids
+    (spherical k-means); a query scans only the rows of its `nprobe` closest
+    lists. Raising `nprobe` trades latency for recall (nprobe == n_lists is exact).
+
+    Only centroids and the list layout (row ids grouped by list) are stored;
+    candidate rows are read from the shared embedding matrix.
+    """
+
+    kind = "ivf"
+
+    def __init__(self, vectors: np.ndarray, centroids: np.ndarray, list_ids: np.ndarray,
+                 list_offsets: np.ndarray, nprobe: int = 16):
+        self.vectors = vectors
+        self.centroids = centroids
+        self.list_ids = list_ids # row ids, grouped by list
+        self.list_offsets = list_offsets # list i is list_ids[offsets[i]:offsets[i + 1]]
+        self.nprobe = nprobe
+
+    def __len__(self):
+        return len(self.vectors)
+
+    @property
+    def n_lists(self) -> int:
+        return len(self.centroids)
+
+    @classmethod
+    def build(cls, vectors: np.ndarray, n_lists: int = None, nprobe: int = 16, iterations: int = 20,
+              train_size: int = 256, seed: int = 0):
+        """
+        Trains the coarse quantizer on a sample of at most `train_size` rows per list.
+        `n_lists` defaults to ~sqrt(rows).
+        """
+        n = len(vectors)
+        if n == 0:
+            raise ValueError("Cannot build an IVF index over an empty matrix")
+        n_lists = max(1, min(n, n_lists or int(np.sqrt(n))))
+        rng = np.random.default_rng(seed)
+
+        sample_size = min(n, n_lists * train_size)
+        sample = np.asarray(vectors[np.sort(rng.choice(n, sample_size, replace=False))], dtype=np.float32)
+        centroids = cls._kmeans(sample, n_lists, iterations, rng)
+
+        assignments = cls._assign(vectors, centroids)
+        list_ids = np.argsort(assignments, kind="stable").astype(np.int64)
+        counts = np.bincount(assignments, minlength=n_lists)
+        list_offsets = np.zeros(n_lists + 1, dtype=np.int64)
+        list_offsets[1:] = np.cumsum(counts)
+        return cls(vectors, centroids, list_ids, list_offsets, nprobe=nprobe)
+
+    @staticmethod
+    def _assign(vectors: np.ndarray, centroids: np.ndarray, chunk: int = 65536) -> np.ndarray:
+        assignments = np.empty(len(vectors), dtype=np.int64)
+        for start in range(0, len(vectors), chunk):
+            block = np.asarray(vectors[start:start + chunk], dtype=np.float32)
+            assignments[start:start + chunk] = np.argmax(block @ centroids.T, axis=1)
+        return assignments
+
+    @classmethod
+    def _kmeans(cls, sample: np.ndarray, k: int, iterations: int, rng) -> np.ndarray:
+        centroids = sample[rng.choice(len(sample), k, replace=False)].copy()
+        for _ in range(iterations):
+            assignments = cls._assign(sample, centroids)
+            counts = np.bincount(assignments, minlength=k)
+            sums = np.zeros_like(centroids)
+            order = np.argsort(assignments, kind="stable")
+            starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+            nonempty = counts > 0
+            sums[nonempty] = np.add.reduceat(sample[order], starts[nonempty], axis=0)
+            empty = counts == 0
+            if empty.any(): # reseed empty lists with random rows
+                sums[empty] = sample[rng.choice(len(sample), int(empty.sum()), replace=False)]
+            new_centroids = l2_normalize(sums)
+            if np.allclose(new_centroids, centroids, atol=1e-6):
+                break
+            centroids = new_centroids
+        return centroids
+
+    def search(self, queries: np.ndarray, top_k: int, nprobe: int = None):
+        nprobe = max(1, min(self.n_lists, nprobe or self.nprobe))
+        probes = top_k_indices(queries @ self.centroids.T, nprobe)
+
+        all_scores = np.full((len(queries), top_k), -np.inf, dtype=np.float32)
+        all_indices = np.full((len(queries), top_k), -1, dtype=np.int64)
+        for q, (query, lists) in enumerate(zip(queries, probes)):
+            candidates = np.concatenate([
+                self.list_ids[self.list_offsets[l]:self.list_offsets[l + 1]] for l in lists
+            ])
+            if not len(candidates):
+                continue
+            candidates.sort() # sequential reads from the (memory-mapped) matrix
+            scores = self.vectors[candidates] @ query
+            best = top_k_indices(scores, top_k)
+            all_scores[q, :len(best)] = scores[best]
+            all_indices[q, :len(best)] = candidates[best]
+        return all_scores, all_indices
+
+    def params(self) -> dict:
+        sizes = np.diff(self.list_offsets)
+        return {
+            "kind": self.kind, "rows": len(self), "n_lists": self.n_lists, "nprobe": self.nprobe,
+            "mean_list_size": round(float(sizes.mean()), 1) if len(sizes) else 0.0, "max_list_size": int(sizes.max(initial=0))
+        }
+
+    # --- Persistence ---
+
+    def save(self, path: str, data_hash: str = None, model: str = None, embeddings_digest: str = None):
+        _write_index(path, self.kind, len(self), data_hash, model, embeddings_digest, centroids=self.centroids,
+                     list_ids=self.list_ids, list_offsets=self.list_offsets)
+
+    @classmethod
+    def load(cls, path: str, vectors: np.ndarray, data_hash: str = None, model: str = None,
+             embeddings_digest: str = None, nprobe: int = 16):
+        """
+        Raises IndexFileError if the file was built for other data, another model,
+        another row count or another embedding matrix.
+        """
+        data = _read_index(path, cls.kind, vectors, data_hash, model, embeddings_digest,
+                           ("centroids", "list_ids", "list_offsets"))
+        if data["centroids"].shape[1] != vectors.shape[1]:
+            raise IndexFileError("Index dimension does not match the embeddings")
+        return cls(vectors, data["centroids"], data["list_ids"], data["list_offsets"], nprobe=nprobe)
+
+
+def quantize_int8(vectors: np.ndarray, chunk_rows: int = 65536):
+    """
+    int8 codes with a float32 scale per row (row ~= codes * scale). Returns (codes, scales).
+    """
+    codes = np.empty(vectors.shape, dtype=np.int8)
+    scales = np.empty(len(vectors), dtype=np.float32)
+    for start in range(0, len(vectors), chunk_rows):
+        block = np.asarray(vectors[start:start + chunk_rows], dtype=np.float32)
+        scale = np.abs(block).max(axis=1) / 127.0
+        scale[scale == 0] = 1.0 # all-zero (failed) rows stay zero
+        codes[start:start + chunk_rows] = np.rint(block / scale[:, None])
+        scales[start:start + chunk_rows] = scale
+    return codes, scales
+
+
+class QuantizedIndex:
+    """
+    Two-pass search. The first pass scores int8 codes (a quarter of float32)
+    with block_scores; the best `top_k * rerank_factor` rows are then re-scored
+    exactly from the full-precision matrix, so the returned scores are exact and
+    only shortlist misses can change the ranking. The full-precision matrix is
+    the shared memory-mapped file and only shortlisted rows of it are read, so
+    a process holds the codes and little else.
+    """
+
+    kind = "quantized"
+    storage = "int8"
+
+    def __init__(self, vectors: np.ndarray, codes: np.ndarray, scales: np.ndarray, rerank_factor: int = 4):
+        self.vectors = vectors
+        self.codes = codes
+        self.scales = scales
+        self.rerank_factor = max(1, rerank_factor)
+
+    def __len__(self):
+        return len(self.vectors)
+
+    @classmethod
+    def build(cls, vectors: np.ndarray, rerank_factor: int = 4):
+        codes, scales = quantize_int8(vectors)
+        return cls(vectors, codes, scales, rerank_factor=rerank_factor)
+
+    def approximate_scores(self, queries: np.ndarray) -> np.ndarray:
+        return block_scores(queries, self.codes, self.scales)
+
+    def search(self, queries: np.ndarray, top_k: int):
+        top_k = min(top_k, len(self))
+        shortlists = top_k_indices(self.approximate_scores(queries), min(len(self), top_k * self.rerank_factor))
+
+        # One query at a time: its gathered shortlist stays in cache, which beats
+        # one multiply over the union of a batch's shortlists
+        all_scores = np.empty((len(queries), top_k), dtype=np.float32)
+        all_indices = np.empty((len(queries), top_k), dtype=np.int64)
+        for q, (query, shortlist) in enumerate(zip(queries, shortlists)):
+            candidates = np.sort(shortlist) # sequential reads from the (memory-mapped) matrix
+            exact = np.asarray(self.vectors[candidates], dtype=np.float32) @ query
+            best = top_k_indices(exact, top_k)
+            all_scores[q] = exact[best]
+            all_indices[q] = candidates[best]
+        return all_scores, all_indices
+
+    def params(self) -> dict:
+        return {
+            "kind": self.kind, "rows": len(self), "storage": self.storage, "rerank_factor": self.rerank_factor,
+            "compact_mb": round((self.codes.nbytes + self.scales.nbytes) / 2**20, 2),
+            "full_mb": round(len(self) * self.vectors.shape[1] * self.vectors.dtype.itemsize / 2**20, 2)
+        }
+
+    # --- Persistence ---
+
+    def save(self, path: str, data_hash: str = None, model: str = None, embeddings_digest: str = None):
+        _write_index(path, self.kind, len(self), data_hash, model, embeddings_digest,
+                     codes=self.codes, scales=self.scales)
+
+    @classmethod
+    def load(cls, path: str, vectors: np.ndarray, data_hash: str = None, model: str = None,
+             embeddings_digest: str = None, rerank_factor: int = 4):
+        """
+        Raises IndexFileError if the file was built for other data, another model,
+        another row count or another embedding matrix.
+        """
+        data = _read_index(path, cls.kind, vectors, data_hash, model, embeddings_digest, ("codes", "scales"))
+        if data["codes"].shape != tuple(vectors.shape):
+            raise IndexFileError("Index dimension does not match the embeddings")
+        return cls(vectors, data["codes"], data["scales"], rerank_factor=rerank_factor)
+
+
+INDEX_KINDS = {"exact": ExactIndex, "ivf": IVFIndex, "quantized": QuantizedIndex}
@@ -0,0 +1,159 @@
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class Warmup:
+    """
+    Runs startup components in parallel, respecting their dependencies, and
+    records per-component status for the readiness endpoint.
+
+    A component is a function plus the names of the components it needs. It
+    starts as soon as all of them are ready. Components whose dependencies
+    failed are marked "skipped".
+    """
+
+    def __init__(self, max_workers: int = 4):
+        self.max_workers = max_workers
+        self._components = {} # name -> dict(fn, deps, required, status, ...)
+        self._done = threading.Event()
+        self._changed = threading.Condition()
+        self.started_at = None
+        self.finished_at = None
+
+    def add(self, name: str, fn, deps=(), required: bool = True, progress=None):
+        """
+        `progress` is an optional callable returning extra live details for the status report.
+        `required` components gate readiness; optional ones are only reported.
+        """
+        self._components[name] = {
+            "fn": fn, "deps": tuple(deps), "required": required, "progress": progress,
+            "status": "pending", "error": None, "started_at": None, "duration": None
+        }
+        return self
+
+    # --- Running ---
+
+    def start(self):
+        """
+        Starts warm-up in a background thread and returns immediately.
+        """
+        self.started_at = time.time()
+        threading.Thread(target=self._run, name="warmup", daemon=True).start()
+        return self
+
+    def _run(self):
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="warmup") as pool:
+            while True:
+                with self._changed:
+                    runnable = []
+                    for name, c in self._components.items():
+                        if c["status"] != "pending":
+                            continue
+                        dep_states = [self._components.get(d, {}).get("status", "unknown") for d in c["deps"]]
+                        if any(s in ("failed", "skipped") for s in dep_states):
+                            c["status"] = "skipped"
+                            c["error"] = "dependency failed"
+                            self._changed.notify_all()
+                        elif all(s == "ready" for s in dep_states):
+                            c["status"] = "running"
+                            c["started_at"] = time.time()
+                            runnable.append(name)
+
+                    if not runnable:
+                        if all(c["status"] not in ("pending", "running") for c in self._components.values()):
+                            break
+                        if not any(c["status"] == "running" for c in self._components.values()):
+                            # Nothing running and nothing runnable: unknown dependency names
+                            for c in self._components.values():
+                                if c["status"] == "pending":
+                                    c["status"] = "skipped"
+                                    c["error"] = "unknown dependency"
+                            break
+                        self._changed.wait()
+                        continue
+
+                for name in runnable:
+                    pool.submit(self._run_component, name)
+
+        self.finished_at = time.time()
+        self._done.set()
+        with self._changed:
+            self._changed.notify_all()
+        logger.info(f"Warm-up finished in {self.finished_at - self.started_at:.2f}s: {self.summary()}")
+
+    def _run_component(self, name: str):
+        c = self._components[name]
+        try:
+            c["fn"]()
+            status, error = "ready", None
+        except Exception as e:
+            logger.error(f"Warm-up component '{name}' failed: {e}")
+            status, error = "failed", str(e)
+        with self._changed:
+            c["status"] = status
+            c["error"] = error
+            c["duration"] = round(time.time() - c["started_at"], 3)
+            self._changed.notify_all()
+
+    # --- Waiting / reporting ---
+
+    def wait(self, timeout: float = None) -> bool:
+        return self._done.wait(timeout)
+
+    def wait_for(self, name: str, timeout: float = None) -> bool:
+        """
+        Blocks until component `name` has finished (in any state). True if it is ready.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._changed:
+            while self._components.get(name, {}).get("status") in ("pending", "running") and not self._done.is_set():
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    break
+                self._changed.wait(remaining)
+            return self._components.get(name, {}).get("status") == "ready"
+
+    def wait_required(self, timeout: float = None) -> bool:
+        """
+        Blocks until every required component has finished. True if all are ready.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for name, c in self._components.items():
+            if c["required"]:
+                remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+                self.wait_for(name, remaining)
+        return self.is_ready
+
+    @property
+    def is_started(self) -> bool:
+        return self.started_at is not None
+
+    @property
+    def is_ready(self) -> bool:
+        required = [c for c in self._components.values() if c["required"]]
+        return self.is_started and all(c["status"] == "ready" for c in required)
+
+    def summary(self) -> dict:
+        return {name: c["status"] for name, c in self._components.items()}
+
+    def status(self) -> dict:
+        components = {}
+        for name, c in self._components.items():
+            entry = {"status": c["status"], "required": c["required"], "duration": c["duration"]}
+            if c["error"]:
+                entry["error"] = c["error"]
+            if c["progress"] is not None:
+                try:
+                    entry.update(c["progress"]() or {})
+                except Exception:
+                    pass
+            components[name] = entry
+        return {
+            "ready": self.is_ready,
+            "elapsed": round((self.finished_at or time.time()) - self.started_at, 3) if self.started_at else None,
+            "components": components
+        }